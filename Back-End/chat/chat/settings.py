@@ -312,6 +312,12 @@ REDIS_PORT = os.getenv('REDIS_PORT', '6379')
 REDIS_CACHE_DB = os.getenv('REDIS_CACHE_DB', '0')  # Chat: DB 0
 REDIS_CHANNEL_DB = os.getenv('REDIS_CHANNEL_DB', '8')  # Chat: Channel DB 8
 
+# Chat messages wait for their batched INSERT in a Redis stream, surviving restarts; in process otherwise
+CHAT_MESSAGE_STREAM = os.getenv('CHAT_MESSAGE_STREAM', 'true').lower() == 'true' and 'test' not in sys.argv
+
+# Latest messages of each room kept in Redis, so opening a chat needs no query
+CHAT_RECENT_CACHE = os.getenv('CHAT_RECENT_CACHE', 'true').lower() == 'true' and 'test' not in sys.argv
+
 CACHES = {
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
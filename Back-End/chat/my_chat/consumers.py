@@ -4,7 +4,7 @@ from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from my_chat.models import ChatRoom, ChatMessage, ChatMember, UserProfile
-from asgiref.sync import sync_to_async
+from my_chat.message_writer import message_writer
 
 logger = logging.getLogger('django')
 
@@ -19,6 +19,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
 		
 		self.room_id = query_string['room_id'][0]
 		self.room_group_name = f'chat_{self.room_id}'
+		self.known_rooms = set()
 		
 		# Controlla connessione Redis
 		await self.log_redis_connection()
@@ -90,40 +91,25 @@ class ChatConsumer(AsyncWebsocketConsumer):
 			self.channel_name
 		)
 
+	@database_sync_to_async
+	def room_exists(self, room_id):
+		return ChatRoom.objects.filter(room_id=room_id).exists()
+
 	async def save_message(self, room_id, message, sender_username, timestamp, message_type='text'):
+		"""Hand the message to the batched writer; the room is looked up once per socket"""
 		try:
-			room = await sync_to_async(ChatRoom.objects.get)(room_id=room_id)
-			
-			sender_profile = await sync_to_async(UserProfile.objects.get)(username=sender_username)
-			
-			await sync_to_async(ChatMessage.objects.create)(
-				room=room,
-				message=message,
-				sender=sender_profile,
-				timestamp=timestamp,
-				message_type=message_type
-			)
-			logger.info(f"Message saved: {message_type} message from {sender_username} in room {room_id}")
+			if room_id not in self.known_rooms:
+				if not await self.room_exists(room_id):
+					return {'error': 'Room does not exist'}
+				self.known_rooms.add(room_id)
+
+			sender_id = self.scope['user'].user_id if hasattr(self.scope['user'], 'user_id') else None
+			if not await message_writer.enqueue(room_id, sender_username, sender_id, message, message_type, timestamp):
+				return {'error': 'Chat is busy, message not saved'}
+			logger.debug(f"Message queued: {message_type} message from {sender_username} in room {room_id}")
 			return None
-		except ChatRoom.DoesNotExist:
+		except (ValueError, TypeError):
 			return {'error': 'Room does not exist'}
-		except UserProfile.DoesNotExist:
-			logger.error(f"User profile not found for username: {sender_username}")
-			if hasattr(self.scope['user'], 'user_id'):
-				try:
-					sender_profile = await sync_to_async(UserProfile.objects.get)(user_id=self.scope['user'].user_id)
-					await sync_to_async(ChatMessage.objects.create)(
-						room=room,
-						message=message,
-						sender=sender_profile,
-						timestamp=timestamp,
-						message_type=message_type
-					)
-					return None
-				except Exception as e:
-					logger.error(f"Fallback failed: {str(e)}")
-					
-			return {'error': 'User profile not found'}
 		except Exception as e:
 			logger.error(f"Error saving message: {str(e)}")
 			return {'error': f'Error saving message: {str(e)}'}
@@ -0,0 +1,267 @@
+"""
+Write-behind persistence of chat messages
+
+Consumers broadcast a message and hand it to the writer instead of saving it
+themselves. The writer of each process flushes what was handed over with one
+bulk INSERT every FLUSH_INTERVAL, or as soon as BATCH_SIZE messages wait.
+
+    chat:messages   STREAM of accepted messages not written yet, read by the
+                    consumer group 'writers' (one consumer per process)
+
+An entry is acknowledged and deleted only after its INSERT committed; the
+entries a crashed process read but never acknowledged are claimed by another
+writer after CLAIM_IDLE_MS. Messages are written at least once: the stream id
+is stored in ChatMessage.stream_id, so a redelivered entry is not written twice.
+A batch the database refuses is written again row by row; the rows it still
+refuses are logged as dead letters and acknowledged, so one bad message does
+not hold back the others. Only an unreachable database leaves a batch pending.
+Written messages are pushed onto the recent rings of their rooms (recent_messages.py).
+Once MAX_BACKLOG messages wait, enqueue() waits for the writers to catch up
+and gives up after BACKPRESSURE_TIMEOUT.
+
+Without Redis (or with CHAT_MESSAGE_STREAM off) the messages wait in this
+process and are lost if it dies before the next flush; so do the messages
+handed over while the stream is unreachable.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from collections import deque
+from datetime import datetime
+
+import redis.asyncio as redis
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from redis.exceptions import ConnectionError as RedisConnectionError, ResponseError, TimeoutError as RedisTimeoutError
+
+from .models import ChatMessage, ChatRoom, UserProfile
+from .recent_messages import recent_messages
+
+logger = logging.getLogger('django')
+
+# KEYS: stream  ARGV: max backlog, field, value, ...
+# Returns the entry id, or false when the backlog is full
+ENQUEUE_SCRIPT = """
+if redis.call('xlen', KEYS[1]) >= tonumber(ARGV[1]) then
+	return false
+end
+return redis.call('xadd', KEYS[1], '*', unpack(ARGV, 2))
+"""
+
+
+def sent_at(timestamp):
+	"""The sender's ISO 8601 timestamp, or now if it is missing or invalid"""
+	try:
+		parsed = parse_datetime(timestamp) if isinstance(timestamp, str) else None
+	except ValueError:
+		parsed = None
+	if parsed is None:
+		return timezone.now()
+	return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+class MessageWriter:
+	def __init__(self, worker=True):
+		self.enabled = getattr(settings, 'CHAT_MESSAGE_STREAM', True)
+		self.redis_client = None
+		self.worker = worker
+		self.buffer = deque()  # (None, entry) waiting in this process
+		self._flusher = None
+		self._group_ready = False
+		self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+
+		# Redis keys
+		self.STREAM_KEY = "chat:messages"
+		self.GROUP = "writers"
+
+		# Batching
+		self.FLUSH_INTERVAL = 0.2  # seconds between flushes
+		self.BATCH_SIZE = 500  # messages per INSERT
+		self.MAX_BACKLOG = 20000  # messages waiting before senders are held back
+		self.BACKPRESSURE_TIMEOUT = 2  # seconds a sender is held back before the message is refused
+		self.CLAIM_IDLE_MS = 30000  # unacknowledged entries older than this belong to a dead writer
+
+		if self.enabled:
+			self._init_redis()
+
+	def _init_redis(self):
+		try:
+			self.redis_client = redis.Redis(
+				host=getattr(settings, 'REDIS_HOST', 'localhost'),
+				port=int(getattr(settings, 'REDIS_PORT', '6379')),
+				db=int(getattr(settings, 'REDIS_CACHE_DB', '0')),
+				decode_responses=True,
+				socket_connect_timeout=5,
+				socket_timeout=5
+			)
+			self._enqueue = self.redis_client.register_script(ENQUEUE_SCRIPT)
+		except Exception as e:
+			logger.error(f"Chat messages are buffered in process, Redis unavailable: {e}")
+			self.enabled = False
+
+	async def enqueue(self, room_id, sender, sender_id, message, message_type='text', timestamp=None):
+		"""Hand a message over for writing; False if the writers are too far behind"""
+		entry = {
+			'room_id': str(room_id),
+			'sender': sender or '',
+			'sender_id': '' if sender_id is None else str(sender_id),
+			'message': message or '',
+			'message_type': message_type,
+			'timestamp': sent_at(timestamp).isoformat(),
+		}
+		self._start_flusher()
+		deadline = time.monotonic() + self.BACKPRESSURE_TIMEOUT
+		while True:
+			stream_down = False
+			if self.enabled:
+				fields = [value for item in entry.items() for value in item]
+				try:
+					if await self._enqueue(keys=[self.STREAM_KEY], args=[self.MAX_BACKLOG, *fields]):
+						return True
+				except (RedisConnectionError, RedisTimeoutError) as e:
+					logger.error(f"Chat message of {sender} in room {room_id} waits in this process, Redis unavailable: {e}")
+					stream_down = True
+			if (not self.enabled or stream_down) and len(self.buffer) < self.MAX_BACKLOG:
+				self.buffer.append((None, entry))
+				return True
+			if time.monotonic() >= deadline:
+				logger.warning(f"Chat message of {sender} in room {room_id} refused, {self.MAX_BACKLOG} messages waiting")
+				return False
+			await asyncio.sleep(self.FLUSH_INTERVAL)
+
+	def _start_flusher(self):
+		if self.worker and (self._flusher is None or self._flusher.done()):
+			self._flusher = asyncio.create_task(self._flush_loop())
+
+	async def _flush_loop(self):
+		"""Flush for the life of the process, without waiting while full batches are pending"""
+		while True:
+			try:
+				written = await self.flush()
+			except asyncio.CancelledError:
+				raise
+			except Exception as e:
+				logger.error(f"Chat message flush failed: {e}")
+				written = 0
+			if written < self.BATCH_SIZE:
+				await asyncio.sleep(self.FLUSH_INTERVAL)
+
+	async def flush(self):
+		"""Write one batch of waiting messages; returns how many were written"""
+		# All messages without the stream, those handed over while it was unreachable with it
+		written = await self._flush_buffer() if self.buffer else 0
+		if not self.enabled:
+			return written
+
+		await self._ensure_group()
+		# Entries a dead writer read but never acknowledged come first
+		claimed = await self.redis_client.xautoclaim(
+			self.STREAM_KEY, self.GROUP, self.consumer,
+			min_idle_time=self.CLAIM_IDLE_MS, start_id='0-0', count=self.BATCH_SIZE
+		)
+		batch = [(stream_id, entry) for stream_id, entry in claimed[1] if entry]
+		if len(batch) < self.BATCH_SIZE:
+			for _, entries in await self.redis_client.xreadgroup(
+				self.GROUP, self.consumer, {self.STREAM_KEY: '>'}, count=self.BATCH_SIZE - len(batch)
+			):
+				batch += entries
+		if not batch:
+			return written
+
+		await database_sync_to_async(self._write)(batch)
+		stream_ids = [stream_id for stream_id, _ in batch]
+		pipe = self.redis_client.pipeline(transaction=False)
+		pipe.xack(self.STREAM_KEY, self.GROUP, *stream_ids)
+		pipe.xdel(self.STREAM_KEY, *stream_ids)
+		await pipe.execute()
+		return written + len(batch)
+
+	async def _flush_buffer(self):
+		batch = [self.buffer.popleft() for _ in range(min(self.BATCH_SIZE, len(self.buffer)))]
+		try:
+			await database_sync_to_async(self._write)(batch)
+		except Exception:
+			# The database is unreachable: rows it refuses are dead-lettered by _write
+			self.buffer.extendleft(reversed(batch))
+			raise
+		return len(batch)
+
+	async def _ensure_group(self):
+		if self._group_ready:
+			return
+		try:
+			await self.redis_client.xgroup_create(self.STREAM_KEY, self.GROUP, id='0', mkstream=True)
+		except ResponseError as e:
+			if 'BUSYGROUP' not in str(e):
+				raise
+		self._group_ready = True
+
+	def _write(self, batch):
+		"""Insert a batch, row by row if the batch is refused, and push it onto the recent rings"""
+		try:
+			messages = self._insert(batch)
+		except (OperationalError, InterfaceError):
+			raise
+		except Exception as e:
+			logger.error(f"Batch of {len(batch)} chat messages refused, writing it row by row: {e}")
+			messages = []
+			for stream_id, entry in batch:
+				try:
+					with transaction.atomic():
+						messages += self._insert([(stream_id, entry)])
+				except (OperationalError, InterfaceError):
+					raise
+				except Exception as e:
+					logger.error(f"Dead letter chat message {stream_id}: {e}: {json.dumps(entry)}")
+		recent_messages.push(messages)
+		logger.info(f"Saved {len(messages)} chat messages")
+
+	def _insert(self, batch):
+		"""Insert a batch with one query per table it refers to and one INSERT; returns the messages"""
+		room_ids, usernames, user_ids = set(), set(), set()
+		for _, entry in batch:
+			if entry['room_id'].isdigit():
+				room_ids.add(int(entry['room_id']))
+			usernames.add(entry['sender'])
+			if entry['sender_id']:
+				user_ids.add(int(entry['sender_id']))
+
+		rooms = set(ChatRoom.objects.filter(room_id__in=room_ids).values_list('room_id', flat=True))
+		profiles = UserProfile.objects.filter(Q(username__in=usernames) | Q(user_id__in=user_ids)).only('user_id', 'username').in_bulk()
+		by_username = {profile.username: profile for profile in profiles.values()}
+		# Entries redelivered after their INSERT committed
+		stream_ids = [stream_id for stream_id, _ in batch if stream_id]
+		written = set(ChatMessage.objects.filter(stream_id__in=stream_ids).values_list('stream_id', flat=True)) if stream_ids else set()
+
+		messages = []
+		for stream_id, entry in batch:
+			if stream_id in written:
+				continue
+			room_id = int(entry['room_id']) if entry['room_id'].isdigit() else None
+			# The sender named in the message, or the authenticated user of the socket
+			sender = by_username.get(entry['sender'])
+			if sender is None and entry['sender_id']:
+				sender = profiles.get(int(entry['sender_id']))
+			if room_id not in rooms or sender is None:
+				logger.error(f"Dropped chat message from {entry['sender']} in room {entry['room_id']}: unknown room or sender")
+				continue
+			messages.append(ChatMessage(
+				room_id=room_id,
+				sender=sender,
+				message=entry['message'],
+				message_type=entry['message_type'],
+				timestamp=datetime.fromisoformat(entry['timestamp']),
+				stream_id=stream_id,
+			))
+		return ChatMessage.objects.bulk_create(messages)
+
+# Global message writer
+message_writer = MessageWriter()
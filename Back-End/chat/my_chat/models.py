@@ -154,9 +154,9 @@ class ChatMessage(models.Model):
     ]
     
     message_id = models.AutoField(primary_key=True)
-    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE)
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, db_index=False)  # Led by chatmessage_room_recent_idx
     sender = models.ForeignKey(UserProfile, on_delete=models.SET_DEFAULT, default=1)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)  # When it was sent (or accepted by a consumer), not when it was written
     
     # Message type and content
     message_type = models.CharField(max_length=20, choices=MESSAGE_TYPES, default='text')
@@ -169,6 +169,15 @@ class ChatMessage(models.Model):
     
     # Metadata for any message type (flexible JSON field for future extensions)
     metadata = models.JSONField(default=dict, blank=True)
+
+    # Redis stream entry the message was written from (message_writer.py), so redeliveries are skipped
+    stream_id = models.CharField(max_length=32, unique=True, null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # History pages: a room's messages before / after a message id (GetChatMessage)
+            models.Index(fields=['room', '-message_id'], name='chatmessage_room_recent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_message_type_display()} {self.message_id} in {self.room}"
@@ -0,0 +1,205 @@
+"""
+Redis ring of each room's latest messages, for opening a chat without a query
+
+    chat:recent:{room}           LIST the room's last RECENT_MESSAGES messages, newest first,
+                                 serialized as GetChatMessage returns them
+    chat:recent:{room}:version   STRING bumped by every write to the room
+    chat:members:{room}          STRING JSON ids of the room's members
+    chat:blocked:{user}          STRING JSON ids of the users a user blocked
+
+The message writer and ChatMediaUpload push new messages onto the ring. A
+ring is only extended if it exists: a missing one is loaded from the database
+by the next open, which gives up if the room was written meanwhile (its
+version changed) rather than cache a stale history. A message committed
+after the version was read is both loaded and pushed: pages drop the copy.
+Deleting a message drops the ring. Membership and block lists are dropped by the ChatMember and
+BlockedUser signals.
+
+The first history page is cut from the ring after filtering the reader's
+blocked users; deeper pages, and first pages longer than what the ring holds,
+are read from the database (ChatHistoryPagination).
+
+Without Redis (or with CHAT_RECENT_CACHE off) every page is read from the database.
+"""
+
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+import redis
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import BlockedUser, ChatMember, ChatMessage
+from .serializers import chat_messageSerializer
+
+logger = logging.getLogger('django')
+
+# KEYS: ring, version  ARGV: ring length, ttl, message, ... (oldest first)
+PUSH_SCRIPT = """
+redis.call('incr', KEYS[2])
+redis.call('expire', KEYS[2], ARGV[2])
+if redis.call('exists', KEYS[1]) == 0 then
+	return 0
+end
+redis.call('lpush', KEYS[1], unpack(ARGV, 3))
+redis.call('ltrim', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+redis.call('expire', KEYS[1], ARGV[2])
+return 1
+"""
+
+# KEYS: ring, version  ARGV: version read before the query, ttl, message, ... (newest first)
+LOAD_SCRIPT = """
+if (redis.call('get', KEYS[2]) or '') ~= ARGV[1] then
+	return 0
+end
+redis.call('del', KEYS[1])
+if #ARGV > 2 then
+	redis.call('rpush', KEYS[1], unpack(ARGV, 3))
+	redis.call('expire', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+
+def serialize(message: ChatMessage) -> str:
+	"""A message as GetChatMessage renders it; the sender must be loaded"""
+	return json.dumps(chat_messageSerializer(message).data, cls=JSONEncoder)
+
+
+class RecentMessages:
+	def __init__(self):
+		self.enabled = getattr(settings, 'CHAT_RECENT_CACHE', True)
+		self.redis_client = None
+
+		# Redis keys
+		self.RECENT_KEY = "chat:recent:{room}"
+		self.VERSION_KEY = "chat:recent:{room}:version"
+		self.MEMBERS_KEY = "chat:members:{room}"
+		self.BLOCKED_KEY = "chat:blocked:{user}"
+
+		self.RECENT_MESSAGES = 100  # ring length, the largest history page
+		self.RECENT_TTL = 24 * 3600  # rings of idle rooms expire
+		self.ACCESS_TTL = 600  # bounds a stale membership or block list if a signal was missed
+
+		if self.enabled:
+			self._init_redis()
+
+	def _init_redis(self):
+		try:
+			self.redis_client = redis.Redis(
+				host=getattr(settings, 'REDIS_HOST', 'localhost'),
+				port=int(getattr(settings, 'REDIS_PORT', '6379')),
+				db=int(getattr(settings, 'REDIS_CACHE_DB', '0')),
+				decode_responses=True,
+				socket_connect_timeout=5,
+				socket_timeout=5
+			)
+			self._push = self.redis_client.register_script(PUSH_SCRIPT)
+			self._load = self.redis_client.register_script(LOAD_SCRIPT)
+		except Exception as e:
+			logger.error(f"Chat history is read from the database, Redis unavailable: {e}")
+			self.enabled = False
+
+	def _keys(self, room_id):
+		return [self.RECENT_KEY.format(room=room_id), self.VERSION_KEY.format(room=room_id)]
+
+	def push(self, messages: Iterable[ChatMessage]):
+		"""Add written messages (senders loaded) to the rings of their rooms"""
+		if not self.enabled:
+			return
+		by_room = defaultdict(list)
+		for message in sorted(messages, key=lambda message: message.message_id):
+			by_room[message.room_id].append(serialize(message))
+		if not by_room:
+			return
+		try:
+			pipe = self.redis_client.pipeline(transaction=False)
+			for room_id, serialized in by_room.items():
+				self._push(keys=self._keys(room_id), args=[self.RECENT_MESSAGES, self.RECENT_TTL, *serialized], client=pipe)
+			pipe.execute()
+		except Exception as e:
+			logger.error(f"Failed to add messages to the recent rings of rooms {list(by_room)}: {e}")
+
+	def forget_room(self, room_id):
+		"""Drop a room's ring, after a message was deleted"""
+		self._forget(room_id, self.RECENT_KEY.format(room=room_id), version=True)
+
+	def forget_members(self, room_id):
+		self._forget(room_id, self.MEMBERS_KEY.format(room=room_id))
+
+	def forget_blocked(self, user_id):
+		self._forget(user_id, self.BLOCKED_KEY.format(user=user_id))
+
+	def _forget(self, owner, key, version=False):
+		if not self.enabled:
+			return
+		try:
+			pipe = self.redis_client.pipeline(transaction=False)
+			pipe.delete(key)
+			if version:
+				pipe.incr(self.VERSION_KEY.format(room=owner))
+			pipe.execute()
+		except Exception as e:
+			logger.error(f"Failed to drop {key}: {e}")
+
+	def latest_page(self, room_id, user_id, limit) -> Optional[Dict]:
+		"""
+		The latest `limit` messages of a room a user may read, in the
+		ChatHistoryPagination response format; None when the database must
+		answer (ring disabled or too short for the page).
+		"""
+		if not self.enabled:
+			return None
+		try:
+			pipe = self.redis_client.pipeline(transaction=False)
+			pipe.lrange(self.RECENT_KEY.format(room=room_id), 0, -1)
+			pipe.get(self.VERSION_KEY.format(room=room_id))
+			pipe.get(self.MEMBERS_KEY.format(room=room_id))
+			pipe.get(self.BLOCKED_KEY.format(user=user_id))
+			ring, version, members, blocked = pipe.execute()
+
+			members = json.loads(members) if members is not None else self._load_members(room_id)
+			if user_id not in members:
+				return {'results': [], 'before': None, 'after': None, 'has_more': False}
+			blocked = set(json.loads(blocked) if blocked is not None else self._load_blocked(user_id))
+			messages = [json.loads(message) for message in ring] if ring else self._load_ring(room_id, version)
+		except Exception as e:
+			logger.error(f"Recent messages of room {room_id} unavailable, reading the database: {e}")
+			return None
+
+		# A ring shorter than its length holds the room's whole history
+		complete = len(messages) < self.RECENT_MESSAGES
+		messages = sorted({message['message_id']: message for message in messages}.values(), key=lambda message: message['message_id'])
+		visible = [message for message in messages if message['sender_id'] not in blocked]
+		if len(visible) < limit and not complete:
+			return None
+		page = visible[-limit:]
+		has_more = len(visible) > limit or not complete
+		return {
+			'results': page,
+			'before': page[0]['message_id'] if page and has_more else None,
+			'after': page[-1]['message_id'] if page else None,
+			'has_more': has_more,
+		}
+
+	def _load_ring(self, room_id, version) -> List[Dict]:
+		latest = ChatMessage.objects.filter(room_id=room_id).select_related('sender').order_by('-message_id')[:self.RECENT_MESSAGES]
+		serialized = [serialize(message) for message in latest]
+		self._load(keys=self._keys(room_id), args=[version or '', self.RECENT_TTL, *serialized])
+		return [json.loads(message) for message in serialized]
+
+	def _load_members(self, room_id) -> List[int]:
+		members = list(ChatMember.objects.filter(chat_room_id=room_id).values_list('user_id', flat=True))
+		self.redis_client.set(self.MEMBERS_KEY.format(room=room_id), json.dumps(members), ex=self.ACCESS_TTL)
+		return members
+
+	def _load_blocked(self, user_id) -> List[int]:
+		blocked = list(BlockedUser.objects.filter(blocker_id=user_id).values_list('blocked_id', flat=True))
+		self.redis_client.set(self.BLOCKED_KEY.format(user=user_id), json.dumps(blocked), ex=self.ACCESS_TTL)
+		return blocked
+
+
+# Global recent message rings
+recent_messages = RecentMessages()
@@ -111,7 +111,7 @@ class chat_messageSerializer(serializers.ModelSerializer):
                 'message': instance.message,
                 'timestamp': instance.timestamp,
                 'sender': getattr(instance.sender, 'username', 'Unknown User'),
-								'sender_id': instance.sender.user_id if instance.sender else None,
+                'sender_id': instance.sender_id,
                 'message_type': instance.message_type
             }
             return data
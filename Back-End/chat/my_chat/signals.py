@@ -1,7 +1,8 @@
 import signal
 from django.dispatch import receiver
-from django.db.models.signals import post_save
-from .models import ChatMember, UserProfile, ChatRoom, ChatMessage
+from django.db.models.signals import post_save, post_delete
+from .models import ChatMember, UserProfile, ChatRoom, ChatMessage, BlockedUser
+from .recent_messages import recent_messages
 from .notification import ImmediateNotification, SendNotificationSync
 from django.db.models.signals import m2m_changed
 import logging
@@ -62,6 +63,21 @@ def chat_member_added(sender, instance, created, **kwargs):
 				print(f"❌ Error in chat_member_added signal: {str(e)}")
 
 
+
+@receiver([post_save, post_delete], sender=ChatMember)
+def chat_members_changed(sender, instance, **kwargs):
+	recent_messages.forget_members(instance.chat_room_id)
+
+
+@receiver([post_save, post_delete], sender=BlockedUser)
+def blocked_users_changed(sender, instance, **kwargs):
+	recent_messages.forget_blocked(instance.blocker_id)
+
+
+@receiver(post_delete, sender=ChatMessage)
+def chat_message_deleted(sender, instance, **kwargs):
+	recent_messages.forget_room(instance.room_id)
+
 # @receiver(m2m_changed, sender=ChatRoom.users.through)
 # def chat_room_users_changed(sender, instance, action, pk_set, **kwargs):
 # 	"""
@@ -56,4 +56,246 @@ class MyChatURLTests(TestCase):
 
     def test_chat_media_manager(self):
         response = self.client.get('/chat/media/manage/')
-        self.assertIn(response.status_code, [200, 401, 403])
\ No newline at end of file
+        self.assertIn(response.status_code, [200, 401, 403])
+
+class MessageWriterTests(TestCase):
+    def setUp(self):
+        from my_chat.models import ChatRoom, UserProfile
+        self.alice = UserProfile.objects.create(user_id=1, username='alice', email='alice@chat.it')
+        self.bob = UserProfile.objects.create(user_id=2, username='bob', email='bob@chat.it')
+        self.room = ChatRoom.objects.create(room_name='Room', room_description='', creator=self.alice)
+
+    def test_messages_are_written_in_one_batch(self):
+        from asgiref.sync import async_to_sync
+        from my_chat.message_writer import MessageWriter
+        from my_chat.models import ChatMessage
+
+        writer = MessageWriter(worker=False)
+        self.assertFalse(writer.enabled)  # CHAT_MESSAGE_STREAM is off under test: messages wait in process
+        for sender, sender_id, text in [('alice', 1, 'hi'), ('bob', 2, 'hello'), ('renamed', 2, 'bye'), ('ghost', None, 'boo')]:
+            self.assertTrue(async_to_sync(writer.enqueue)(self.room.room_id, sender, sender_id, text))
+        self.assertFalse(ChatMessage.objects.exists())
+
+        # Rooms, senders, INSERT
+        with self.assertNumQueries(3):
+            self.assertEqual(async_to_sync(writer.flush)(), 4)
+        messages = ChatMessage.objects.order_by('message_id')
+        self.assertEqual([(m.sender_id, m.message) for m in messages], [(1, 'hi'), (2, 'hello'), (2, 'bye')])
+        self.assertLess(messages[0].timestamp, messages[2].timestamp)
+        self.assertEqual(async_to_sync(writer.flush)(), 0)
+
+    def test_bad_message_does_not_block_its_batch(self):
+        from asgiref.sync import async_to_sync
+        from my_chat.message_writer import MessageWriter
+        from my_chat.models import ChatMessage
+
+        writer = MessageWriter(worker=False)
+        for text in ('one', 'two', 'three'):
+            async_to_sync(writer.enqueue)(self.room.room_id, 'alice', 1, text)
+        writer.buffer[1][1]['timestamp'] = '\u0000'
+
+        with self.assertLogs('django', 'ERROR') as logs:
+            self.assertEqual(async_to_sync(writer.flush)(), 3)
+        self.assertEqual(list(ChatMessage.objects.order_by('message_id').values_list('message', flat=True)), ['one', 'three'])
+        self.assertIn('Dead letter', logs.output[-1])
+        self.assertIn('"message": "two"', logs.output[-1])
+        self.assertFalse(writer.buffer)  # The bad message is not retried
+
+    def test_bad_message_is_acknowledged_on_the_stream(self):
+        from asgiref.sync import async_to_sync
+        from django.test import override_settings
+        from my_chat.message_writer import MessageWriter
+        from my_chat.models import ChatMessage
+
+        with override_settings(CHAT_MESSAGE_STREAM=True):
+            writer = MessageWriter(worker=False)
+        writer.STREAM_KEY = 'chat:messages:test'
+
+        async def write():
+            try:
+                await writer.redis_client.ping()
+            except Exception:
+                return None
+            await writer.redis_client.delete(writer.STREAM_KEY)
+            try:
+                for text in ('one', 'two', 'three'):
+                    await writer.enqueue(self.room.room_id, 'alice', 1, text)
+                await writer.redis_client.xadd(writer.STREAM_KEY, {'room_id': str(self.room.room_id), 'sender': 'alice'})
+                written = await writer.flush()
+                pending = await writer.redis_client.xpending(writer.STREAM_KEY, writer.GROUP)
+                return written, pending['pending'], await writer.redis_client.xlen(writer.STREAM_KEY)
+            finally:
+                await writer.redis_client.delete(writer.STREAM_KEY)
+
+        with self.assertLogs('django', 'ERROR'):
+            result = async_to_sync(write)()
+        if result is None:
+            self.skipTest('Redis unavailable')
+        self.assertEqual(result, (4, 0, 0))
+        self.assertEqual(ChatMessage.objects.count(), 3)
+
+    def test_messages_wait_in_process_while_the_stream_is_down(self):
+        from asgiref.sync import async_to_sync
+        from django.test import override_settings
+        from redis.exceptions import ConnectionError
+        from my_chat.message_writer import MessageWriter
+        from my_chat.models import ChatMessage
+
+        with override_settings(CHAT_MESSAGE_STREAM=True, REDIS_HOST='localhost', REDIS_PORT='1'):
+            writer = MessageWriter(worker=False)
+        self.assertTrue(writer.enabled)
+        with self.assertLogs('django', 'ERROR'):
+            self.assertTrue(async_to_sync(writer.enqueue)(self.room.room_id, 'alice', 1, 'hi'))
+        self.assertEqual(len(writer.buffer), 1)
+
+        # Written before the flush reaches the stream
+        with self.assertRaises(ConnectionError):
+            async_to_sync(writer.flush)()
+        self.assertEqual(ChatMessage.objects.get().message, 'hi')
+        self.assertFalse(writer.buffer)
+
+    def test_sender_timestamp_is_kept(self):
+        from datetime import datetime, timezone
+        from asgiref.sync import async_to_sync
+        from my_chat.message_writer import MessageWriter
+        from my_chat.models import ChatMessage
+
+        writer = MessageWriter(worker=False)
+        async_to_sync(writer.enqueue)(self.room.room_id, 'alice', 1, 'sent', timestamp='2026-01-02T03:04:05.000Z')
+        async_to_sync(writer.enqueue)(self.room.room_id, 'alice', 1, 'forged', timestamp='2026-13-45T00:00:00Z')
+        async_to_sync(writer.flush)()
+        sent, forged = ChatMessage.objects.order_by('message_id')
+        self.assertEqual(sent.timestamp, datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc))
+        self.assertGreater(forged.timestamp, sent.timestamp)  # Accepted now
+
+    def test_full_backlog_refuses_messages(self):
+        from asgiref.sync import async_to_sync
+        from my_chat.message_writer import MessageWriter
+
+        writer = MessageWriter(worker=False)
+        writer.MAX_BACKLOG = 2
+        writer.BACKPRESSURE_TIMEOUT = 0
+        self.assertTrue(async_to_sync(writer.enqueue)(self.room.room_id, 'alice', 1, 'one'))
+        self.assertTrue(async_to_sync(writer.enqueue)(self.room.room_id, 'alice', 1, 'two'))
+        self.assertFalse(async_to_sync(writer.enqueue)(self.room.room_id, 'alice', 1, 'three'))
+        self.assertEqual(len(writer.buffer), 2)
+
+
+class ChatHistoryMixin:
+    def setUp(self):
+        from my_chat.models import BlockedUser, ChatMember, ChatMessage, ChatRoom, UserProfile
+        self.alice = UserProfile.objects.create(user_id=1, username='alice', email='alice@chat.it')
+        bob = UserProfile.objects.create(user_id=2, username='bob', email='bob@chat.it')
+        troll = UserProfile.objects.create(user_id=3, username='troll', email='troll@chat.it')
+        self.room = ChatRoom.objects.create(room_name='Room', room_description='', creator=self.alice)
+        for user in (self.alice, bob, troll):
+            ChatMember.objects.create(user=user, chat_room=self.room)
+        BlockedUser.objects.create(blocker=self.alice, blocked=troll)
+        self.messages = ChatMessage.objects.bulk_create([
+            ChatMessage(room=self.room, sender=troll if index == 5 else bob, message=f'm{index}') for index in range(8)
+        ])
+
+    def get(self, **params):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from my_chat.views import GetChatMessage
+
+        request = APIRequestFactory().get(f'/chat/chat_rooms/{self.room.room_id}/get_message/', params)
+        force_authenticate(request, user=self.alice)
+        return GetChatMessage.as_view()(request, room_id=self.room.room_id)
+
+
+class ChatHistoryTests(ChatHistoryMixin, TestCase):
+    def test_pages_by_message_id(self):
+        ids = [message.message_id for message in self.messages]
+
+        # Membership, page
+        with self.assertNumQueries(2):
+            latest = self.get(page_size=3).data
+        self.assertEqual([m['message'] for m in latest['results']], ['m4', 'm6', 'm7'])  # m5 is from a blocked user
+        self.assertEqual((latest['before'], latest['after'], latest['has_more']), (ids[4], ids[7], True))
+
+        older = self.get(page_size=3, before=latest['before']).data
+        self.assertEqual([m['message'] for m in older['results']], ['m1', 'm2', 'm3'])
+        oldest = self.get(page_size=3, before=older['before']).data
+        self.assertEqual(([m['message'] for m in oldest['results']], oldest['before'], oldest['has_more']), (['m0'], None, False))
+
+        newer = self.get(after=ids[2]).data
+        self.assertEqual([m['message'] for m in newer['results']], ['m3', 'm4', 'm6', 'm7'])
+        self.assertEqual(self.get(after=ids[7]).data['results'], [])
+
+    def test_page_size_is_capped(self):
+        self.assertEqual(self.get(page_size=1000).status_code, 200)
+        self.assertEqual(self.get(before='latest').status_code, 400)
+
+
+
+class RecentMessagesTests(ChatHistoryMixin, TestCase):
+    def setUp(self):
+        from unittest import mock
+        from django.test import override_settings
+        from my_chat.recent_messages import RecentMessages
+
+        super().setUp()
+        with override_settings(CHAT_RECENT_CACHE=True):
+            self.recent = RecentMessages()
+        try:
+            self.recent.redis_client.ping()
+        except Exception:
+            self.skipTest('Redis unavailable')
+        room, user = self.room.room_id, self.alice.user_id
+        self.addCleanup(self.recent.redis_client.delete, *self.recent._keys(room),
+                        self.recent.MEMBERS_KEY.format(room=room), self.recent.BLOCKED_KEY.format(user=user))
+        self.recent.redis_client.delete(*self.recent._keys(room), self.recent.MEMBERS_KEY.format(room=room), self.recent.BLOCKED_KEY.format(user=user))
+        for module in ('views', 'signals', 'message_writer'):
+            patcher = mock.patch(f'my_chat.{module}.recent_messages', self.recent)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def render(self, response):
+        import json
+        response.render()
+        return json.loads(response.content)
+
+    def test_open_from_the_ring(self):
+        from unittest import mock
+
+        with mock.patch('my_chat.views.recent_messages.enabled', False):
+            from_database = self.render(self.get(page_size=3))
+        # Membership, block list, ring
+        with self.assertNumQueries(3):
+            self.assertEqual(self.render(self.get(page_size=3)), from_database)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.render(self.get(page_size=3)), from_database)
+        # Deeper pages read the database
+        self.assertEqual([m['message'] for m in self.get(page_size=3, before=from_database['before']).data['results']], ['m1', 'm2', 'm3'])
+
+    def test_writes_update_the_ring(self):
+        from asgiref.sync import async_to_sync
+        from my_chat.message_writer import MessageWriter
+        from my_chat.models import BlockedUser
+
+        self.get()
+        writer = MessageWriter(worker=False)
+        async_to_sync(writer.enqueue)(self.room.room_id, 'bob', 2, 'new')
+        async_to_sync(writer.flush)()
+        with self.assertNumQueries(0):
+            self.assertEqual([m['message'] for m in self.get(page_size=2).data['results']], ['m7', 'new'])
+
+        BlockedUser.objects.filter(blocker=self.alice).delete()
+        with self.assertNumQueries(1):
+            self.assertIn('m5', [m['message'] for m in self.get().data['results']])
+
+        self.messages[7].delete()
+        self.assertEqual([m['message'] for m in self.get(page_size=2).data['results']], ['m6', 'new'])
+
+    def test_message_loaded_and_pushed_is_read_once(self):
+        self.get()
+        # Written after the open read the version, so loaded with the ring and pushed onto it
+        self.recent.push([self.messages[7]])
+        self.assertEqual([m['message'] for m in self.get(page_size=3).data['results']], ['m4', 'm6', 'm7'])
+        self.assertEqual(len(self.get().data['results']), 7)
+
+    def test_short_ring_falls_back_to_the_database(self):
+        self.recent.RECENT_MESSAGES = 4
+        self.assertIsNone(self.recent.latest_page(self.room.room_id, self.alice.user_id, 10))
+        self.assertEqual(len(self.get(page_size=10).data['results']), 7)
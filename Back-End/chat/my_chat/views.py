@@ -5,10 +5,13 @@ from django.http import HttpResponse, JsonResponse
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.pagination import BasePagination
+from rest_framework.exceptions import ValidationError
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from .models import ChatRoom, UserProfile, ChatMessage, ChatMember, BlockedUser
 from django.contrib.auth.models import AnonymousUser
+from .recent_messages import recent_messages
 from .serializers import chat_roomSerializer, chat_messageSerializer, userSerializer, userBlockedSerializer, userCreateSerializer
 from .middleware import ServiceAuthentication, JWTAuthMiddleware , JWTAuth
 from drf_yasg.utils import swagger_auto_schema
@@ -32,21 +35,73 @@ def post_api_view(func):
 		return func(self, request, *args, **kwargs)
 	return wrapper
 
+class ChatHistoryPagination(BasePagination):
+	"""
+	Keyset pages of a room's history, oldest message first: the latest
+	messages, the ones before a message id (scrolling back) or the ones
+	after it (catching up). Each page is one range read of
+	chatmessage_room_recent_idx, however old the room is.
+	"""
+	page_size = 50
+	max_page_size = 100
+
+	def get_params(self, request):
+		"""Page size and before / after cursors of a request"""
+		try:
+			limit = min(max(int(request.query_params.get('page_size', self.page_size)), 1), self.max_page_size)
+			before = request.query_params.get('before')
+			after = request.query_params.get('after')
+			return limit, int(before) if before else None, int(after) if after else None
+		except ValueError:
+			raise ValidationError({'error': 'before, after and page_size must be integers'})
+
+	def paginate_queryset(self, queryset, request, view=None):
+		limit, before, after = self.get_params(request)
+
+		if after is not None:
+			messages = list(queryset.filter(message_id__gt=after).order_by('message_id')[:limit + 1])
+		else:
+			if before is not None:
+				queryset = queryset.filter(message_id__lt=before)
+			messages = list(queryset.order_by('-message_id')[:limit + 1])
+		self.has_more = len(messages) > limit
+		messages = messages[:limit]
+		if after is None:
+			messages.reverse()
+		self.after = after
+		self.messages = messages
+		return messages
+
+	def get_paginated_response(self, data):
+		return Response({
+			'results': data,
+			# Cursors of the next pages: older than the first message, newer than the last one
+			'before': self.messages[0].message_id if self.messages and (self.has_more or self.after is not None) else None,
+			'after': self.messages[-1].message_id if self.messages else self.after,
+			'has_more': self.has_more,
+		})
+
+
 class GetChatMessage(generics.ListAPIView):
 	"""
-	API endpoint that allows users to be viewed or edited.
+	API endpoint that returns the history of a chat room, a page at a time.
 
 	get:
-	Return a list of all messages in a chat room.
+	Return the latest messages of a chat room, oldest first. The latest page
+	of a room is served from its Redis ring (recent_messages.py) when it can be.
 
 	Parameters:
 	- room_id: the id of the chat room
+	- before: optional, return the messages older than this message id
+	- after: optional, return the messages newer than this message id
+	- page_size: optional, 50 by default (at most 100)
 
 	Response:
-	- 200 OK: if the request is successful
+	- 200 OK: {'results': [...], 'before': cursor of older messages, 'after': cursor of newer messages, 'has_more': bool}
 	- 400 Bad Request: if the request is invalid
 	"""
 	serializer_class = chat_messageSerializer
+	pagination_class = ChatHistoryPagination
 	lookup_url_kwarg = 'room_id'
 	authentication_classes = [JWTAuth]
 	# permission_classes = [ChatRoomPermissions] TODO: samu fai le permissioni
@@ -68,34 +123,37 @@ class GetChatMessage(generics.ListAPIView):
 				return ChatMessage.objects.none()
 				
 			# Check membership directly in the view
-			room_exists = ChatRoom.objects.filter(
-				room_id=room_id,
-				users__user_id=user.user_id
+			room_exists = ChatMember.objects.filter(
+				chat_room_id=room_id,
+				user_id=user.user_id
 			).exists()
 			
 			if not room_exists:
 				logger.warning(f"User {user} attempted to access messages in room {room_id} but is not a member")
 				return ChatMessage.objects.none()
 				
-			# Get user's blocked users using the new BlockedUser model
-			try:
-				user_profile = UserProfile.objects.get(user_id=user.user_id)
-				# Get all users blocked by this user
-				blocked_relationships = BlockedUser.objects.filter(blocker=user_profile).select_related('blocked')
-				blocked_user_ids = [relationship.blocked.user_id for relationship in blocked_relationships]
-			except UserProfile.DoesNotExist:
-				blocked_user_ids = []
+			# Users blocked by this user, as a subquery of the page query
+			blocked_user_ids = BlockedUser.objects.filter(blocker_id=user.user_id).values('blocked_id')
 			
 			# User is a member, return messages excluding blocked users
-			messages = ChatMessage.objects.filter(room__room_id=room_id).exclude(sender__user_id__in=blocked_user_ids)
-			logger.info(f"Found {messages.count()} messages in room {room_id} (excluding blocked users)")
-			return messages
+			return (ChatMessage.objects
+				.filter(room_id=room_id)
+				.exclude(sender_id__in=blocked_user_ids)
+				.select_related('sender'))
 			
 		except Exception as e:
 			import traceback
 			logger.error(f"ERROR in get_queryset: {str(e)}\n{traceback.format_exc()}")
 			return ChatMessage.objects.none()
 			
+	def list(self, request, *args, **kwargs):
+		limit, before, after = self.paginator.get_params(request)
+		if before is None and after is None and hasattr(request.user, 'user_id'):
+			page = recent_messages.latest_page(self.kwargs.get(self.lookup_url_kwarg), request.user.user_id, limit)
+			if page is not None:
+				return Response(page)
+		return super().list(request, *args, **kwargs)
+
 	# def list(self, request, *args, **kwargs):
 	# 	try:
 	# 		# Use parent implementation but catch any exceptions
@@ -558,6 +616,7 @@ class ChatMediaUpload(APIView):
 				chat_message.file = uploaded_file
 			
 			chat_message.save()
+			recent_messages.push([chat_message])
 			
 			# Send WebSocket notification to chat room members
 			channel_layer = get_channel_layer()
@@ -1,21 +1,38 @@
 """
-Physics Engine Benchmark Tool
-Compare performance and accuracy of different physics        # Set identical initial states for fair comparison
-        legacy.ball_pos = [10, 5]
-        legacy.angle = 45
-        legacy.ball_speed = 2.0
-        
-        modern.ball_pos.x = 10
-        modern.ball_pos.y = 5
-        modern.angle = 45  # Add missing angle
-        modern.ball_speed = 2.0  # Add missing ball_speed
-        modern.ball_velocity.x = 2.0 * 0.707  # cos(45°)
-        modern.ball_velocity.y = 2.0 * 0.707  # sin(45°)"""
-import time
+Physics Engine Benchmark & Regression Suite
+
+Three measurements per engine:
+- micro:      cost of one physics step per scenario (rally, wall bounce,
+              scoring, high speed). Steps are timed in blocks of --steps and
+              the block is repeated --repeats times, so perf_counter overhead
+              is paid once per block instead of once per step.
+- throughput: --matches concurrent matches stepped tick by tick the way the
+              game loop does it (paddle update, step, score check); reported
+              as matches one core can run at 30 Hz (physics only).
+- memory:     bytes allocated per match engine, measured with tracemalloc.
+
+Every scenario also records a checksum of the final state, so a change in
+behaviour shows up next to the timing.
+
+Results can be written as JSON, saved as a baseline and compared to one:
+    python benchmark_physics.py --save-baseline baseline.json
+    python benchmark_physics.py --compare baseline.json --threshold 0.10
+--compare exits with status 1 when any metric is worse than the baseline by
+more than the threshold (0.10 = 10%).
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
 import statistics
-from typing import List, Dict
 import sys
-import os
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
 
 # Add parent directory to path to import engines
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -23,189 +40,408 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from physics_engines.legacy_physics import LegacyPhysicsEngine
 from physics_engines.modern_physics import ModernPhysicsEngine
 
-class PhysicsBenchmark:
-    def __init__(self):
-        self.results = {}
-    
-    def benchmark_engine(self, engine_class, engine_name: str, iterations: int = 1000):
-        """Benchmark a physics engine"""
-        print(f"\n🔬 Benchmarking {engine_name}...")
-        
-        engine = engine_class()
-        times = []
-        collision_counts = []
-        
-        # Warm up
-        for _ in range(100):
-            engine.physics_step()
-        
-        # Actual benchmark
-        start_total = time.perf_counter()
-        
-        for i in range(iterations):
+REPORT_VERSION = 1
+TICK_RATE = 30
+DEFAULT_THRESHOLD = 0.10
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """Initial ball state and paddle behaviour, re-applied after every score"""
+    name: str
+    angle: float
+    ball_speed: float
+    track_ball: bool      # Paddles follow the ball (rally) or stay out of reach (scoring)
+
+    def reset(self, engine):
+        _set_pos(engine, 'ball_pos', 0, 0)
+        engine.angle = self.angle
+        engine.ball_speed = self.ball_speed
+        engine.wall_hit_pos = 0
+        paddle_y = 0 if self.track_ball else engine.ring_height
+        _set_pos(engine, 'player_1_pos', -60, paddle_y)
+        _set_pos(engine, 'player_2_pos', 60, -paddle_y)
+
+    def before_step(self, engine):
+        if self.track_ball:
+            ball_y = _get_pos(engine, 'ball_pos')[1]
+            _set_pos(engine, 'player_1_pos', -60, ball_y)
+            _set_pos(engine, 'player_2_pos', 60, ball_y)
+
+
+SCENARIOS = {
+    scenario.name: scenario for scenario in (
+        Scenario('rally', angle=20, ball_speed=1.0, track_ball=True),
+        Scenario('wall_bounce', angle=80, ball_speed=1.0, track_ball=True),
+        Scenario('scoring', angle=30, ball_speed=1.0, track_ball=False),
+        Scenario('high_speed', angle=20, ball_speed=8.0, track_ball=True),
+    )
+}
+
+
+def _get_pos(engine, name):
+    pos = getattr(engine, name)
+    if isinstance(pos, list):
+        return pos[0], pos[1]
+    return pos.x, pos.y
+
+
+def _set_pos(engine, name, x, y):
+    pos = getattr(engine, name)
+    if isinstance(pos, list):
+        pos[0], pos[1] = x, y
+    else:
+        pos.x, pos.y = x, y
+
+
+def _release(engine):
+    """Vectorized engines hold a row of their batch until released"""
+    if hasattr(engine, 'release'):
+        engine.release()
+
+
+def _vectorized_factory():
+    """One private batch per benchmark run, like one worker process"""
+    from physics_engines.vectorized_physics import VectorizedPhysicsEngine
+    batch = VectorizedPhysicsEngine()
+    return batch.allocate
+
+
+def engine_factories(names: List[str]) -> Dict[str, Callable]:
+    factories = {}
+    for name in names:
+        if name == 'legacy':
+            factories[name] = LegacyPhysicsEngine
+        elif name == 'modern':
+            factories[name] = ModernPhysicsEngine
+        elif name == 'ccd':
+            factories[name] = lambda: ModernPhysicsEngine(ccd=True)
+        elif name == 'vectorized':
+            try:
+                factories[name] = _vectorized_factory()
+            except ImportError as e:
+                print(f"⚠️  Skipping vectorized engine: {e}")
+        else:
+            raise ValueError(f"Unknown physics engine '{name}'")
+    return factories
+
+
+def state_checksum(engine, scores: int) -> str:
+    """Final ball state rounded to 1e-6, enough to notice a behaviour change"""
+    x, y = _get_pos(engine, 'ball_pos')
+    return f"{x:.6f}:{y:.6f}:{engine.angle:.6f}:{engine.ball_speed:.6f}:{scores}"
+
+
+def run_scenario(engine, scenario: Scenario, steps: int) -> dict:
+    """Step one engine `steps` times; returns event counts, not timings"""
+    step = engine.physics_step
+    before_step = scenario.before_step
+    scores = bounces = 0
+    for _ in range(steps):
+        before_step(engine)
+        angle = engine.angle
+        if step():
+            scores += 1
+            scenario.reset(engine)
+        elif engine.angle != angle:
+            bounces += 1
+    return {'scores': scores, 'bounces': bounces, 'checksum': state_checksum(engine, scores)}
+
+
+def timer_overhead_us(samples: int = 10000) -> float:
+    """What the old per-step timing added to every measurement"""
+    clock = time.perf_counter
+    start = clock()
+    for _ in range(samples):
+        clock()
+        clock()
+    return (clock() - start) / samples * 1e6
+
+
+def calibration_us(loops: int = 200000) -> float:
+    """Fixed pure-Python workload, used to normalize results across machines"""
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        total = 0.0
+        for i in range(loops):
+            total += math.cos(i) * 0.5
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def micro_benchmark(factory, scenario: Scenario, steps: int, repeats: int) -> dict:
+    engine = factory()
+    scenario.reset(engine)
+    run_scenario(engine, scenario, min(steps, 200))  # Warm up
+    _release(engine)
+
+    samples = []
+    events = None
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            engine = factory()
+            scenario.reset(engine)
             start = time.perf_counter()
-            result = engine.physics_step()
-            end = time.perf_counter()
-            
-            times.append((end - start) * 1000)  # Convert to milliseconds
-            
-            # Track collision checks if available
-            if hasattr(engine, 'collision_checks'):
-                collision_counts.append(engine.collision_checks)
-            
-            # Reset on score to continue testing
-            if result:
-                engine.reset_ball()
-        
-        end_total = time.perf_counter()
-        total_time = (end_total - start_total) * 1000
-        
-        # Calculate statistics
-        avg_time = statistics.mean(times)
-        min_time = min(times)
-        max_time = max(times)
-        median_time = statistics.median(times)
-        std_dev = statistics.stdev(times) if len(times) > 1 else 0
-        
-        avg_collisions = statistics.mean(collision_counts) if collision_counts else 0
-        
-        self.results[engine_name] = {
-            'total_time_ms': total_time,
-            'avg_time_ms': avg_time,
-            'min_time_ms': min_time,
-            'max_time_ms': max_time,
-            'median_time_ms': median_time,
-            'std_dev_ms': std_dev,
-            'fps_theoretical': 1000 / avg_time if avg_time > 0 else float('inf'),
-            'avg_collision_checks': avg_collisions,
-            'iterations': iterations
-        }
-        
-        print(f"✅ {engine_name} completed:")
-        print(f"   📊 Average: {avg_time:.4f}ms per step")
-        print(f"   ⚡ Theoretical FPS: {1000/avg_time:.1f}" if avg_time > 0 else "   ⚡ Theoretical FPS: ∞")
-        print(f"   🎯 Collision checks: {avg_collisions:.1f} per step" if avg_collisions > 0 else "   🎯 Collision checks: N/A")
-        print(f"   📈 Std Dev: {std_dev:.4f}ms")
-    
-    def accuracy_test(self, iterations: int = 100):
-        """Test accuracy by comparing deterministic scenarios"""
-        print(f"\n🎯 Accuracy Test ({iterations} iterations)...")
-        
-        legacy = LegacyPhysicsEngine()
-        modern = ModernPhysicsEngine()
-        
-        # Set identical initial conditions
-        legacy.ball_pos = [10, 5]
-        legacy.angle = 45
-        legacy.ball_speed = 2.0
-        
-        modern.ball_pos.x = 10
-        modern.ball_pos.y = 5
-        modern.ball_velocity.x = 2.0 * 0.707  # cos(45°)
-        modern.ball_velocity.y = 2.0 * 0.707  # sin(45°)
-        
-        legacy_positions = []
-        modern_positions = []
-        
-        for i in range(iterations):
-            # Store positions
-            legacy_positions.append((legacy.ball_pos[0], legacy.ball_pos[1]))
-            modern_positions.append((modern.ball_pos.x, modern.ball_pos.y))
-            
-            # Step physics
-            legacy_result = legacy.physics_step()
-            modern_result = modern.physics_step()
-            
-            # Reset if scored
-            if legacy_result:
-                legacy.reset_ball(45)
-            if modern_result:
-                modern.reset_ball(45)
-        
-        # Calculate position differences
-        differences = []
-        for i, (legacy_pos, modern_pos) in enumerate(zip(legacy_positions, modern_positions)):
-            diff = ((legacy_pos[0] - modern_pos[0])**2 + (legacy_pos[1] - modern_pos[1])**2)**0.5
-            differences.append(diff)
-        
-        avg_diff = statistics.mean(differences)
-        max_diff = max(differences)
-        
-        print(f"📐 Average position difference: {avg_diff:.4f} units")
-        print(f"📏 Maximum position difference: {max_diff:.4f} units")
-        
-        return avg_diff, max_diff
-    
-    def print_comparison(self):
-        """Print detailed comparison of results"""
-        if len(self.results) < 2:
-            print("❌ Need at least 2 engines to compare")
-            return
-        
-        print(f"\n📋 Detailed Comparison:")
-        print("=" * 80)
-        
-        # Find best and worst performers
-        engines = list(self.results.keys())
-        best_avg = min(self.results.values(), key=lambda x: x['avg_time_ms'])
-        worst_avg = max(self.results.values(), key=lambda x: x['avg_time_ms'])
-        
-        for name, stats in self.results.items():
-            print(f"\n🔧 {name}:")
-            print(f"   ⏱️  Avg Time: {stats['avg_time_ms']:.4f}ms")
-            print(f"   🏃 FPS: {stats['fps_theoretical']:.1f}")
-            print(f"   🔍 Collision Checks: {stats['avg_collision_checks']:.1f}")
-            print(f"   📊 Stability (StdDev): {stats['std_dev_ms']:.4f}ms")
-            
-            # Performance vs best
-            if stats == best_avg:
-                print(f"   🏆 FASTEST ENGINE")
+            result = run_scenario(engine, scenario, steps)
+            samples.append((time.perf_counter() - start) / steps * 1e6)
+            _release(engine)
+            # Every repeat starts from the same state, so the events must match
+            if events is not None and result != events:
+                raise RuntimeError(f"{scenario.name}: non-deterministic run {result} != {events}")
+            events = result
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return {
+        'median_us_per_step': statistics.median(samples),
+        'min_us_per_step': min(samples),
+        'stdev_us_per_step': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'steps': steps,
+        'repeats': repeats,
+        **events,
+    }
+
+
+def throughput_benchmark(factory, matches: int, ticks: int) -> dict:
+    """`matches` concurrent rallies stepped for `ticks` ticks"""
+    scenario = SCENARIOS['rally']
+    engines = []
+    for i in range(matches):
+        engine = factory()
+        scenario.reset(engine)
+        engine.angle = scenario.angle + i % 40   # Spread the matches over different phases
+        engines.append(engine)
+
+    batch = getattr(engines[0], 'batch', None)
+    if batch is not None:
+        rows = [engine.row for engine in engines]
+        paddles = [0.0] * matches   # Both paddles follow the ball's y
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(ticks):
+            if batch is not None:
+                # Flat inputs in, ball state out, as in GameLoopScheduler._step_all
+                states = []
+                for row, paddle_y in zip(rows, paddles):
+                    states += (row, 0.1, paddle_y, paddle_y)
+                for i, (result, _, ball_y, _) in enumerate(batch.step_synced(states)):
+                    paddles[i] = ball_y
+                    if result:
+                        scenario.reset(engines[i])
+                        paddles[i] = 0.0
             else:
-                speedup = stats['avg_time_ms'] / best_avg['avg_time_ms']
-                print(f"   📉 {speedup:.2f}x slower than fastest")
-        
-        print(f"\n🎖️  Winner: {[name for name, stats in self.results.items() if stats == best_avg][0]}")
-        
-        # Performance summary
-        legacy_fps = self.results.get('Legacy', {}).get('fps_theoretical', 0)
-        modern_fps = self.results.get('Modern', {}).get('fps_theoretical', 0)
-        
-        if legacy_fps > 0 and modern_fps > 0:
-            improvement = ((modern_fps - legacy_fps) / legacy_fps) * 100
-            print(f"🚀 Performance improvement: {improvement:+.1f}%")
-
-def main():
+                for engine in engines:
+                    scenario.before_step(engine)
+                    if engine.physics_step():
+                        scenario.reset(engine)
+        elapsed = time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+        for engine in engines:
+            _release(engine)
+
+    us_per_match_tick = elapsed / (matches * ticks) * 1e6
+    return {
+        'matches': matches,
+        'ticks': ticks,
+        'us_per_match_tick': us_per_match_tick,
+        'matches_per_core': 1e6 / (us_per_match_tick * TICK_RATE),
+    }
+
+
+def memory_benchmark(factory, matches: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        engines = [factory() for _ in range(matches)]
+        allocated = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    for engine in engines:
+        _release(engine)
+    return {
+        'matches': matches,
+        'bytes_per_match': allocated / matches,
+    }
+
+
+def run_benchmarks(engines: List[str], scenarios: List[str], steps: int, repeats: int,
+                   matches: int, ticks: int) -> dict:
+    report = {
+        'version': REPORT_VERSION,
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'tick_rate': TICK_RATE,
+            'timer_overhead_us': timer_overhead_us(),
+            'calibration_us': calibration_us(),
+        },
+        'micro': {},
+        'throughput': {},
+        'memory': {},
+    }
+
+    for name, factory in engine_factories(engines).items():
+        print(f"\n🔬 Benchmarking {name}...")
+        report['micro'][name] = {}
+        for scenario_name in scenarios:
+            result = micro_benchmark(factory, SCENARIOS[scenario_name], steps, repeats)
+            report['micro'][name][scenario_name] = result
+            print(f"   {scenario_name:<12} {result['median_us_per_step']:8.3f} µs/step "
+                  f"(±{result['stdev_us_per_step']:.3f}, {result['bounces']} bounces, {result['scores']} scores)")
+
+        result = throughput_benchmark(factory, matches, ticks)
+        report['throughput'][name] = result
+        print(f"   {'throughput':<12} {result['us_per_match_tick']:8.3f} µs/match-tick "
+              f"→ {result['matches_per_core']:,.0f} matches per core at {TICK_RATE} Hz")
+
+        result = memory_benchmark(factory, matches)
+        report['memory'][name] = result
+        print(f"   {'memory':<12} {result['bytes_per_match']:8.0f} bytes/match")
+
+    return report
+
+
+def _metrics(report: dict):
+    """(key, value, higher_is_better) for every comparable number in a report"""
+    for engine, scenarios in report.get('micro', {}).items():
+        for scenario, result in scenarios.items():
+            # Best block: the least noisy estimate of the cost of the code itself
+            yield f"micro.{engine}.{scenario}", result['min_us_per_step'], False
+    for engine, result in report.get('throughput', {}).items():
+        yield f"throughput.{engine}", result['matches_per_core'], True
+    for engine, result in report.get('memory', {}).items():
+        yield f"memory.{engine}", result['bytes_per_match'], False
+
+
+def compare_reports(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD,
+                    normalize: bool = False) -> dict:
+    """
+    Compare two reports metric by metric.
+    `change` is positive when the current run is worse (slower, fewer
+    matches per core, more memory); a change above `threshold` is a regression.
+    With `normalize`, timings are scaled by the ratio of the calibration runs
+    so baselines from another machine stay usable.
+    """
+    scale = 1.0
+    if normalize:
+        scale = current['meta']['calibration_us'] / baseline['meta']['calibration_us']
+
+    old = {key: (value, higher) for key, value, higher in _metrics(baseline)}
+    rows = []
+    for key, value, higher_is_better in _metrics(current):
+        if key not in old:
+            continue
+        reference = old[key][0]
+        if not key.startswith('memory.'):
+            reference = reference / scale if higher_is_better else reference * scale
+        if reference == 0:
+            continue
+        change = (reference / value - 1) if higher_is_better else (value / reference - 1)
+        rows.append({
+            'metric': key,
+            'baseline': reference,
+            'current': value,
+            'change': change,
+            'regression': change > threshold,
+        })
+
+    behaviour_changes = []
+    for engine, scenarios in current.get('micro', {}).items():
+        for scenario, result in scenarios.items():
+            previous = baseline.get('micro', {}).get(engine, {}).get(scenario)
+            if previous and previous.get('checksum') != result.get('checksum'):
+                behaviour_changes.append(f"{engine}.{scenario}")
+
+    return {
+        'threshold': threshold,
+        'normalized': normalize,
+        'rows': rows,
+        'regressions': [row['metric'] for row in rows if row['regression']],
+        'behaviour_changes': behaviour_changes,
+    }
+
+
+def print_comparison(comparison: dict):
+    print(f"\n📋 Comparison against baseline (threshold {comparison['threshold']:.0%}"
+          f"{', normalized' if comparison['normalized'] else ''}):")
+    print("=" * 80)
+    for row in comparison['rows']:
+        status = "❌ REGRESSION" if row['regression'] else ("✅ faster" if row['change'] < 0 else "  ok")
+        print(f"{row['metric']:<36} {row['baseline']:>12.3f} → {row['current']:>12.3f} "
+              f"{row['change']:+7.1%}  {status}")
+    for name in comparison['behaviour_changes']:
+        print(f"⚠️  {name}: final state differs from the baseline (physics behaviour changed)")
+    if comparison['regressions']:
+        print(f"\n❌ {len(comparison['regressions'])} regression(s) above {comparison['threshold']:.0%}")
+    else:
+        print("\n✅ No regressions")
+
+
+def load_report(path: str) -> dict:
+    with open(path) as f:
+        report = json.load(f)
+    if report.get('version') != REPORT_VERSION:
+        raise ValueError(f"{path} is not a version {REPORT_VERSION} benchmark report")
+    return report
+
+
+def write_report(report: dict, path: str):
+    if path == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Wrote {path}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engines', nargs='+', default=['legacy', 'modern', 'ccd', 'vectorized'])
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--steps', type=int, default=5000, help='steps per timed block (default: 5000)')
+    parser.add_argument('--repeats', type=int, default=7, help='timed blocks per scenario (default: 7)')
+    parser.add_argument('--matches', type=int, default=500, help='concurrent matches for throughput and memory (default: 500)')
+    parser.add_argument('--ticks', type=int, default=90, help='ticks for the throughput run (default: 90)')
+    parser.add_argument('--json', metavar='PATH', help="write the report as JSON ('-' for stdout)")
+    parser.add_argument('--save-baseline', metavar='PATH', help='write the report as the new baseline')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare against a saved baseline, exit 1 on regression')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'allowed slowdown before a metric counts as a regression (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--normalize', action='store_true',
+                        help='scale timings by the calibration run (baseline from another machine)')
+    args = parser.parse_args(argv)
+
     print("🎮 Pong Physics Engine Benchmark")
     print("=" * 50)
-    
-    benchmark = PhysicsBenchmark()
-    
-    # Benchmark both engines
-    benchmark.benchmark_engine(LegacyPhysicsEngine, "Legacy", 2000)
-    benchmark.benchmark_engine(ModernPhysicsEngine, "Modern", 2000)
-    
-    # Accuracy test
-    benchmark.accuracy_test(500)
-    
-    # Print comparison
-    benchmark.print_comparison()
-    
-    print(f"\n💡 Recommendations:")
-    
-    if 'Modern' in benchmark.results and 'Legacy' in benchmark.results:
-        modern_stats = benchmark.results['Modern']
-        legacy_stats = benchmark.results['Legacy']
-        
-        if modern_stats['avg_time_ms'] < legacy_stats['avg_time_ms']:
-            improvement = ((legacy_stats['avg_time_ms'] - modern_stats['avg_time_ms']) / legacy_stats['avg_time_ms']) * 100
-            print(f"✅ Use Modern Physics Engine ({improvement:.1f}% faster)")
-        else:
-            print(f"⚠️  Legacy engine is still faster, investigate Modern engine")
-    
-    print(f"\n🎯 For your multiplayer game:")
-    print(f"   - Target: 30 FPS backend = 33.33ms budget per frame")
-    print(f"   - Modern engine theoretical max: {benchmark.results.get('Modern', {}).get('fps_theoretical', 0):.0f} FPS")
-    print(f"   - Legacy engine theoretical max: {benchmark.results.get('Legacy', {}).get('fps_theoretical', 0):.0f} FPS")
+    report = run_benchmarks(args.engines, args.scenarios, args.steps, args.repeats, args.matches, args.ticks)
+    print(f"\n⏱️  perf_counter overhead: {report['meta']['timer_overhead_us']:.3f} µs per timed call "
+          f"(not included in µs/step)")
+
+    if args.json:
+        write_report(report, args.json)
+    if args.save_baseline:
+        write_report(report, args.save_baseline)
+    if args.compare:
+        comparison = compare_reports(load_report(args.compare), report, args.threshold, args.normalize)
+        print_comparison(comparison)
+        if comparison['regressions']:
+            return 1
+    return 0
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -62,7 +62,10 @@ class AABB:
         )
 
 class ModernPhysicsEngine:
-    def __init__(self, ring_length=160, ring_height=90, ring_thickness=3):
+    # Upper bound on paddle/wall hits resolved within one CCD tick
+    MAX_CCD_EVENTS = 8
+
+    def __init__(self, ring_length=160, ring_height=90, ring_thickness=3, ccd=False):
         self.ring_length = ring_length
         self.ring_height = ring_height
         self.ring_thickness = ring_thickness
@@ -88,6 +91,9 @@ class ModernPhysicsEngine:
         
         # Legacy compatibility state
         self.wall_hit_pos = 0
+
+        # Continuous collision detection for balls faster than a paddle is wide
+        self.ccd = ccd
         
     def get_paddle_aabb(self, player_pos: Vector2) -> AABB:
         """Get paddle bounding box"""
@@ -159,6 +165,8 @@ class ModernPhysicsEngine:
     
     def physics_step(self, dt: float = 1.0/30.0, ball_acc: float = 0.1):
         """Execute one physics step - legacy compatible version"""
+        if self.ccd and self.ball_speed > self.p_width:
+            return self.ccd_step(ball_acc)
         self.collision_checks = 0
         
         # Move ball using angle-based velocity (like legacy)
@@ -223,34 +231,91 @@ class ModernPhysicsEngine:
         )
     
     def check_paddle_collisions(self, start: Vector2, end: Vector2) -> Optional[Tuple[float, Vector2, Vector2]]:
-        """Check collision with paddles"""
-        # Only check paddle in direction of movement
+        """Check collision with the paddle the ball moves towards (front side only)"""
         if end.x - start.x < 0:  # Moving left
-            paddle_aabb = self.get_paddle_aabb(self.player_1_pos)
-            collision = self.swept_sphere_collision(start, end, self.ball_radius, paddle_aabb)
-            if collision:
-                return collision[0], collision[1], self.player_1_pos
+            paddle_pos = self.player_1_pos
+            if start.x < paddle_pos.x:  # Already behind the paddle
+                return None
         elif end.x - start.x > 0:  # Moving right
-            paddle_aabb = self.get_paddle_aabb(self.player_2_pos)
-            collision = self.swept_sphere_collision(start, end, self.ball_radius, paddle_aabb)
-            if collision:
-                return collision[0], collision[1], self.player_2_pos
-        
+            paddle_pos = self.player_2_pos
+            if start.x > paddle_pos.x:
+                return None
+        else:
+            return None
+
+        collision = self.swept_sphere_collision(start, end, self.ball_radius, self.get_paddle_aabb(paddle_pos))
+        if collision:
+            return collision[0], collision[1], paddle_pos
         return None
-    
+
     def check_wall_collisions(self, start: Vector2, end: Vector2) -> Optional[Tuple[float, Vector2]]:
-        """Check collision with top/bottom walls"""
-        wall_aabb = AABB(
-            -self.ring_length, -self.ring_height/2,
-            self.ring_length, self.ring_height/2
-        )
-        
-        collision = self.swept_sphere_collision(start, end, self.ball_radius, wall_aabb)
-        if collision and (collision[1].y != 0):  # Only wall hits (not goal lines)
-            return collision
-        
+        """Check collision with top/bottom walls (same boundary as the legacy step)"""
+        self.collision_checks += 1
+        limit = self.ring_height / 2 - self.ring_thickness - self.ball_radius
+        if end.y > limit and end.y > start.y:
+            return max(0.0, (limit - start.y) / (end.y - start.y)), Vector2(0, -1)
+        if end.y < -limit and end.y < start.y:
+            return max(0.0, (-limit - start.y) / (end.y - start.y)), Vector2(0, 1)
         return None
-    
+
+    def ccd_step(self, ball_acc: float = 0.1):
+        """
+        Continuous step for balls moving more than a paddle width per tick.
+        The remaining displacement is swept against the walls and the paddle
+        ahead; the ball stops at the earliest impact, bounces with the legacy
+        angle rules and spends the rest of the displacement in a new sub-step.
+        """
+        self.collision_checks = 0
+        remaining = self.ball_speed
+        events = 0
+        paddle_hit = False
+
+        while remaining > 1e-9:
+            length = remaining
+            direction = Vector2(math.cos(math.radians(self.angle)), -math.sin(math.radians(self.angle)))
+            start = Vector2(self.ball_pos.x, self.ball_pos.y)
+            end = start + direction * length
+
+            hit = None
+            if events < self.MAX_CCD_EVENTS:
+                paddle = self.check_paddle_collisions(start, end)
+                wall = self.check_wall_collisions(start, end)
+                if paddle and (not wall or paddle[0] <= wall[0]):
+                    hit = paddle
+                elif wall:
+                    hit = wall
+
+            if hit is None:
+                self.ball_pos = end
+                remaining -= length
+            else:
+                t = hit[0]
+                self.ball_pos = start + direction * (length * t)
+                remaining -= max(length * t, 1e-9)
+                events += 1
+                if len(hit) == 3:
+                    hit_pos = self.ball_pos.y - hit[2].y
+                    self.wall_hit_pos = 0
+                    if hit[2] is self.player_1_pos:
+                        self.angle = hit_pos / self.p_length * -90 if self.p_length > 0 else -45
+                    else:
+                        self.angle = 180 + hit_pos / self.p_length * 90 if self.p_length > 0 else 135
+                    paddle_hit = True
+                else:
+                    self.wall_hit_pos = self.ball_pos.y
+                    self.angle = -self.angle
+
+            if self.check_score():
+                break
+
+        # Same acceleration as the discrete step, applied once per tick
+        if paddle_hit and self.ball_speed < 5 * self.p_length:
+            self.ball_speed += ball_acc
+
+        self.ball_velocity.x = self.ball_speed * math.cos(math.radians(self.angle))
+        self.ball_velocity.y = self.ball_speed * -math.sin(math.radians(self.angle))
+        return self.check_score()
+
     def check_score(self) -> Optional[str]:
         """Check if ball scored - legacy compatible"""
         # Using exact legacy scoring boundaries
@@ -277,17 +342,6 @@ class ModernPhysicsEngine:
         self.ball_velocity.x = speed * math.cos(math.radians(self.angle))
         self.ball_velocity.y = speed * -math.sin(math.radians(self.angle))
     
-    def reset_ball(self, angle: Optional[float] = None):
-        """Reset ball to center"""
-        self.ball_pos = Vector2(0, 0)
-        if angle is None:
-            angle = random.uniform(30, 150)
-        
-        self.ball_velocity = Vector2(
-            math.cos(math.radians(angle)),
-            math.sin(math.radians(angle))
-        ) * self.ball_speed
-        self.ball_speed = 1.0
     def get_stats(self) -> dict:
         """Get performance statistics"""
         return {
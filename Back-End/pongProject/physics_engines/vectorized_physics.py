@@ -0,0 +1,371 @@
+"""
+Vectorized Physics Engine - NumPy batch implementation
+Features:
+- Ball, paddle and ring state of N matches in contiguous NumPy arrays
+- One vectorized step advances every scheduled match
+- step_synced steps the game loop's matches with whole-array loads and reads
+- Bit-compatible with ModernPhysicsEngine.physics_step
+- Per-match views expose the same attributes as the other engines
+
+Bit compatibility: every arithmetic operation is done in the same order as in
+ModernPhysicsEngine, and the ball direction (cos / -sin of the angle) is
+computed with `math` and cached per match, only for the rows whose angle
+changed. NumPy's SIMD trigonometry can differ from libm in the last bit, the
+IEEE +, -, *, / used for the rest of the step cannot.
+"""
+import math
+import random
+from typing import List, Optional
+
+import numpy as np
+
+from .modern_physics import Vector2
+
+NO_SCORE = 0
+PLAYER_1_SCORES = 1
+PLAYER_2_SCORES = 2
+
+RESULTS = {
+    NO_SCORE: None,
+    PLAYER_1_SCORES: "player_1_scores",
+    PLAYER_2_SCORES: "player_2_scores",
+}
+
+# Per-match float64 state, one array each
+FLOAT_FIELDS = (
+    'ball_x', 'ball_y', 'angle', 'ball_speed', 'wall_hit_pos',
+    'dir_x', 'dir_y', 'ball_acc',
+    'p1_x', 'p1_y', 'p2_x', 'p2_y',
+    'ball_radius', 'p_length', 'p_width', 'p_speed',
+    'ring_length', 'ring_height', 'ring_thickness',
+)
+
+# Score codes as step_synced returns them
+RESULT_NAMES = np.array([RESULTS[code] for code in sorted(RESULTS)], dtype=object)
+
+
+class VectorizedPhysicsEngine:
+    """Physics state of many matches, stepped in one batch"""
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = 0
+        self.size = 0          # High-water mark of allocated rows
+        self.free_rows = []
+        for name in FLOAT_FIELDS:
+            setattr(self, name, np.zeros(0))
+        self.in_use = np.zeros(0, dtype=bool)
+        self.due = np.zeros(0, dtype=bool)
+        self.results = np.zeros(0, dtype=np.int8)
+        self._grow(capacity)
+
+    def _grow(self, capacity: int):
+        """Resize every array, keeping existing rows"""
+        for name in FLOAT_FIELDS + ('in_use', 'due', 'results'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.capacity] = old
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    @property
+    def active_matches(self) -> int:
+        return int(self.in_use[:self.size].sum())
+
+    def allocate(self, ring_length=160, ring_height=90, ring_thickness=3) -> 'VectorizedMatchEngine':
+        """Reserve a row and return the per-match engine view"""
+        if self.free_rows:
+            row = self.free_rows.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow(self.capacity * 2)
+            row = self.size
+            self.size += 1
+
+        # Same defaults as ModernPhysicsEngine
+        self.in_use[row] = True
+        self.due[row] = False
+        self.results[row] = NO_SCORE
+        self.ball_x[row] = 0
+        self.ball_y[row] = 0
+        self.ball_speed[row] = 1.0
+        self.wall_hit_pos[row] = 0
+        self.ball_acc[row] = 0.1
+        self.p1_x[row] = -60
+        self.p1_y[row] = 0
+        self.p2_x[row] = 60
+        self.p2_y[row] = 0
+        self.ball_radius[row] = 2.5
+        self.p_length[row] = 20
+        self.p_width[row] = 2
+        self.p_speed[row] = 1.0
+        self.ring_length[row] = ring_length
+        self.ring_height[row] = ring_height
+        self.ring_thickness[row] = ring_thickness
+        self.set_angle(row, 0)
+        return VectorizedMatchEngine(self, row)
+
+    def release(self, row: int):
+        """Give a row back to the pool"""
+        if self.in_use[row]:
+            self.in_use[row] = False
+            self.due[row] = False
+            self.free_rows.append(row)
+
+    def set_angle(self, row: int, angle: float):
+        self.angle[row] = angle
+        self.dir_x[row] = math.cos(math.radians(angle))
+        self.dir_y[row] = -math.sin(math.radians(angle))
+
+    def schedule(self, row: int, ball_acc: float = 0.1):
+        """Include a match in the next batch step"""
+        self.ball_acc[row] = ball_acc
+        self.due[row] = True
+
+    def step_synced(self, states: List[float]):
+        """
+        Step many matches with whole-array loads and reads, for the game loop.
+        `states` is a flat list of row, ball_acc, p1_y, p2_y per match: the
+        inputs of the tick, everything else stays in the batch between ticks.
+        A flat list of floats is not tracked by the garbage collector, unlike
+        one tuple per match. Returns an iterator of (result, ball_x, ball_y,
+        angle) per match, in the same order.
+        """
+        if not states:
+            return iter(())
+        data = np.array(states, dtype=np.float64).reshape(-1, 4)
+        rows = data[:, 0].astype(np.intp)
+        self.ball_acc[rows] = data[:, 1]
+        self.p1_y[rows] = data[:, 2]
+        self.p2_y[rows] = data[:, 3]
+        self.step(rows)
+        return zip(
+            RESULT_NAMES[self.results[rows]].tolist(),
+            self.ball_x[rows].tolist(),
+            self.ball_y[rows].tolist(),
+            self.angle[rows].tolist(),
+        )
+
+    def step(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Advance the given rows (default: every scheduled row) by one step.
+        Returns the stepped rows; their score codes are left in `results`.
+        """
+        if rows is None:
+            rows = np.flatnonzero(self.due[:self.size])
+        self.due[rows] = False
+        if rows.size == 0:
+            return rows
+
+        speed = self.ball_speed[rows]
+        angle = self.angle[rows]
+        wall_hit_pos = self.wall_hit_pos[rows]
+        ball_acc = self.ball_acc[rows]
+        r = self.ball_radius[rows]
+        p_length = self.p_length[rows]
+        half_width = self.p_width[rows] / 2
+        half_length = p_length / 2
+        p1_x, p1_y = self.p1_x[rows], self.p1_y[rows]
+        p2_x, p2_y = self.p2_x[rows], self.p2_y[rows]
+        ring_length = self.ring_length[rows]
+        ring_height = self.ring_height[rows]
+        ring_thickness = self.ring_thickness[rows]
+
+        # Move ball along the cached direction (cos, -sin)
+        x = self.ball_x[rows] + speed * self.dir_x[rows]
+        y = self.ball_y[rows] + speed * self.dir_y[rows]
+
+        # Paddle collisions (same tests as p1_is_hit / p2_is_hit)
+        p1_hit = (
+            (x < 0) &
+            (x - r - speed <= p1_x + half_width) &
+            (x - speed > p1_x - half_width) &
+            (y - r <= p1_y + half_length) &
+            (y + r >= p1_y - half_length)
+        )
+        p2_hit = (
+            ~p1_hit & (x > 0) &
+            (x + r + speed >= p2_x - half_width) &
+            (x + speed < p2_x + half_width) &
+            (y - r <= p2_y + half_length) &
+            (y + r >= p2_y - half_length)
+        )
+        paddle_hit = p1_hit | p2_hit
+
+        # Wall collisions, only when no paddle was hit
+        wall_hit = ~paddle_hit & (
+            ((wall_hit_pos <= 0) & (y + r + ring_thickness + speed >= ring_height / 2)) |
+            ((wall_hit_pos >= 0) & (y - r - ring_thickness - speed <= -ring_height / 2))
+        )
+
+        has_length = p_length > 0
+        safe_length = np.where(has_length, p_length, 1.0)
+        p1_angle = np.where(has_length, (y - p1_y) / safe_length * -90, -45)
+        p2_angle = np.where(has_length, 180 + (y - p2_y) / safe_length * 90, 135)
+
+        new_angle = np.where(p1_hit, p1_angle, np.where(p2_hit, p2_angle, np.where(wall_hit, -angle, angle)))
+        speed = np.where(paddle_hit & (speed < 5 * p_length), speed + ball_acc, speed)
+        wall_hit_pos = np.where(paddle_hit, 0, np.where(wall_hit, y, wall_hit_pos))
+
+        # Scoring (same boundaries as check_score)
+        p2_scores = x - r <= -ring_length / 2
+        p1_scores = ~p2_scores & (x + r >= ring_length / 2 + ring_thickness)
+        results = np.where(p2_scores, PLAYER_2_SCORES, np.where(p1_scores, PLAYER_1_SCORES, NO_SCORE))
+
+        self.ball_x[rows] = x
+        self.ball_y[rows] = y
+        self.ball_speed[rows] = speed
+        self.wall_hit_pos[rows] = wall_hit_pos
+        self.results[rows] = results
+
+        # Refresh the cached direction only where the angle changed
+        for row, value in zip(rows[paddle_hit | wall_hit].tolist(), new_angle[paddle_hit | wall_hit].tolist()):
+            self.set_angle(row, value)
+        return rows
+
+
+class _RowVector:
+    """Vector2-like view on two arrays of a batch row"""
+
+    __slots__ = ('_batch', '_row', '_x', '_y')
+
+    def __init__(self, batch, row, x_field, y_field):
+        self._batch = batch
+        self._row = row
+        self._x = x_field
+        self._y = y_field
+
+    @property
+    def x(self) -> float:
+        return float(getattr(self._batch, self._x)[self._row])
+
+    @x.setter
+    def x(self, value):
+        getattr(self._batch, self._x)[self._row] = value
+
+    @property
+    def y(self) -> float:
+        return float(getattr(self._batch, self._y)[self._row])
+
+    @y.setter
+    def y(self, value):
+        getattr(self._batch, self._y)[self._row] = value
+
+    def length(self) -> float:
+        return math.sqrt(self.x * self.x + self.y * self.y)
+
+
+def _row_field(name):
+    """Per-match attribute backed by one batch array"""
+    def getter(self):
+        return float(getattr(self.batch, name)[self.row])
+
+    def setter(self, value):
+        getattr(self.batch, name)[self.row] = value
+
+    return property(getter, setter)
+
+
+class VectorizedMatchEngine:
+    """
+    One match of a VectorizedPhysicsEngine batch.
+
+    Exposes the same attributes as ModernPhysicsEngine so GameState and
+    PhysicsManager can use it unchanged; physics_step() steps only this row.
+    """
+
+    ball_speed = _row_field('ball_speed')
+    wall_hit_pos = _row_field('wall_hit_pos')
+    ball_radius = _row_field('ball_radius')
+    p_length = _row_field('p_length')
+    p_width = _row_field('p_width')
+    p_speed = _row_field('p_speed')
+    ring_length = _row_field('ring_length')
+    ring_height = _row_field('ring_height')
+    ring_thickness = _row_field('ring_thickness')
+
+    def __init__(self, batch: VectorizedPhysicsEngine, row: int):
+        self.batch = batch
+        self.row = row
+        self.collision_checks = 0
+        self.released = False
+        self.ball_pos = _RowVector(batch, row, 'ball_x', 'ball_y')
+        self.player_1_pos = _RowVector(batch, row, 'p1_x', 'p1_y')
+        self.player_2_pos = _RowVector(batch, row, 'p2_x', 'p2_y')
+
+    def __setattr__(self, name, value):
+        # Assigning a vector (e.g. `ball_pos = Vector2(0, 0)`) writes into the batch
+        if name in ('ball_pos', 'player_1_pos', 'player_2_pos') and name in self.__dict__:
+            view = self.__dict__[name]
+            view.x, view.y = value.x, value.y
+            return
+        super().__setattr__(name, value)
+
+    @property
+    def angle(self) -> float:
+        return float(self.batch.angle[self.row])
+
+    @angle.setter
+    def angle(self, value):
+        self.batch.set_angle(self.row, value)
+
+    @property
+    def ball_velocity(self) -> Vector2:
+        speed = self.ball_speed
+        return Vector2(speed * self.batch.dir_x[self.row], speed * self.batch.dir_y[self.row])
+
+    @property
+    def last_result(self) -> Optional[str]:
+        """Score result of the last batch step for this match"""
+        return RESULTS[int(self.batch.results[self.row])]
+
+    def schedule(self, ball_acc: float = 0.1):
+        self.batch.schedule(self.row, ball_acc)
+
+    def physics_step(self, dt: float = 1.0/30.0, ball_acc: float = 0.1):
+        """Execute one physics step for this match only"""
+        self.batch.ball_acc[self.row] = ball_acc
+        self.batch.step(np.array([self.row]))
+        return self.last_result
+
+    def check_score(self) -> Optional[str]:
+        x, r = self.ball_pos.x, self.ball_radius
+        if x - r <= -self.ring_length / 2:
+            return "player_2_scores"
+        elif x + r >= self.ring_length / 2 + self.ring_thickness:
+            return "player_1_scores"
+        return None
+
+    def reset_ball(self, angle: Optional[float] = None):
+        """Reset ball to center - legacy compatible"""
+        self.ball_pos.x = 0
+        self.ball_pos.y = 0
+        self.angle = angle if angle is not None else random.uniform(45, 135)
+        self.ball_speed = 90 / 150
+        self.wall_hit_pos = 0
+
+    def release(self):
+        """Free this match's row in the batch (once: the row may be reused)"""
+        if not self.released:
+            self.released = True
+            self.batch.release(self.row)
+
+    def get_stats(self) -> dict:
+        """Get performance statistics"""
+        velocity = self.ball_velocity
+        return {
+            "collision_checks": self.collision_checks,
+            "ball_position": (self.ball_pos.x, self.ball_pos.y),
+            "ball_velocity": (velocity.x, velocity.y),
+            "ball_speed": velocity.length(),
+            "batch_matches": self.batch.active_matches,
+        }
+
+
+_shared_batch = None
+
+def get_shared_batch() -> VectorizedPhysicsEngine:
+    """Process-wide batch used by all matches on this worker"""
+    global _shared_batch
+    if _shared_batch is None:
+        _shared_batch = VectorizedPhysicsEngine()
+    return _shared_batch
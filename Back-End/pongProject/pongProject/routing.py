@@ -6,6 +6,8 @@ Routes:
 	websocket_urlpatterns (list): A list of URL patterns for WebSocket connections.
 		- re_path(r'pong/ws/pong/(?P<room_id>\\d+)/$', consumers.GameTableConsumer.as_asgi()):
 		  Routes WebSocket connections to the GameTableConsumer based on the room_id parameter.
+		- re_path(r'pong/ws/pong/(?P<room_id>\\d+)/spectate/$', consumers.SpectatorConsumer.as_asgi()):
+		  Read-only, downsampled game state stream for spectators of room_id.
 		- re_path(r'pong/ws/tournament/(?P<tournament_id>\\d+)/$', consumers.TournamentConsumer.as_asgi()):
 		  Routes WebSocket connections to the TournamentConsumer based on the tournament_id parameter.
 			example: /pong/ws/pong/123/ or /tournament/456/
@@ -14,5 +16,6 @@ from pong_app import consumers
 
 websocket_urlpatterns = [
 	re_path(r'pong/ws/pong/(?P<room_id>\d+)/$', consumers.GameTableConsumer.as_asgi()),
+	re_path(r'pong/ws/pong/(?P<room_id>\d+)/spectate/$', consumers.SpectatorConsumer.as_asgi()),
 	re_path(r'pong/ws/tournament/(?P<tournament_id>\d+)/$', consumers.TournamentConsumer.as_asgi()),
 ]
\ No newline at end of file
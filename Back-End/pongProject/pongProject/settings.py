@@ -242,6 +242,24 @@ CHANNEL_LAYERS = {
     }
 }
 
+# Physics engine used by new matches: "modern", "legacy", "ccd" (modern + continuous collision) or "vectorized" (NumPy batch)
+PONG_PHYSICS_ENGINE = os.getenv('PONG_PHYSICS_ENGINE', 'modern')
+
+# Match ownership leases in Redis, so both players of a match may hit different pods
+PONG_MATCH_SHARDING = os.getenv('PONG_MATCH_SHARDING', 'true').lower() == 'true' and 'test' not in sys.argv
+
+# Player presence in Redis, so tournament forfeits see the game sockets of every pod
+PONG_PRESENCE = os.getenv('PONG_PRESENCE', 'true').lower() == 'true' and 'test' not in sys.argv
+
+# Leaderboards mirrored in Redis sorted sets, read from the database otherwise
+PONG_LEADERBOARD = os.getenv('PONG_LEADERBOARD', 'true').lower() == 'true' and 'test' not in sys.argv
+
+# Quick play matchmaking queue in Redis, shared by every pod; per process otherwise
+PONG_MATCHMAKING = os.getenv('PONG_MATCHMAKING', 'true').lower() == 'true' and 'test' not in sys.argv
+
+# Directory for match replay logs, empty to disable recording
+PONG_REPLAY_DIR = os.getenv('PONG_REPLAY_DIR', str(BASE_DIR / 'replays'))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
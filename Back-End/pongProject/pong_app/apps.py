@@ -8,6 +8,9 @@ class PongAppConfig(AppConfig):
 	def ready(self):
 		try:
 			import pong_app.signals
+			from .matchmaking import matchmaker
+			# Players left waiting by a restart are paired without waiting for a new join
+			matchmaker.resume()
 			# from .authentications import register_self , user_register_self
 			# register_self()
 		except Exception as e:
@@ -0,0 +1,177 @@
+"""
+Single-elimination bracket engine
+
+The whole bracket is laid out when the tournament starts, for any number of
+players: the field is padded to the next power of two with byes, and seeds
+are placed so the top seeds get the byes and meet as late as possible.
+
+The tree is a heap of 2 * size u32 slots, stored in Redis as one string
+(tournament:{id}:bracket) and written with BITFIELD, so advancing a winner
+is a single O(1) slot write:
+
+    slot 0                  number of players
+    slot 1                  champion (the final)
+    slots i*2, i*2 + 1      the two sides of match i
+    slots size..2*size-1    seeded players, 0 for a bye
+
+A slot holds a player ID, or 0 while undecided. Round r is played by the
+match slots of level depth - r (slots size >> r .. (size >> (r - 1)) - 1).
+First-round matches against a bye are decided when the bracket is built.
+"""
+
+import struct
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+SLOT = struct.Struct('>I')  # BITFIELD u32 layout (big endian)
+MIN_PLAYERS = 2
+
+
+def bracket_size(players: int) -> int:
+    """Smallest power of two that fits the field"""
+    size = MIN_PLAYERS
+    while size < players:
+        size *= 2
+    return size
+
+
+def seed_positions(size: int) -> List[int]:
+    """
+    Seed (1-based) of each leaf, left to right: seed s meets size + 1 - s in
+    the first round and seeds 1 and 2 can only meet in the final.
+    size 8 -> [1, 8, 4, 5, 2, 7, 3, 6]
+    """
+    order = [1]
+    while len(order) < size:
+        span = len(order) * 2 + 1
+        order = [seed for top in order for seed in (top, span - top)]
+    return order
+
+
+def seed(players: Sequence[int], ratings: Optional[Mapping[int, float]] = None) -> List[int]:
+    """Seed 1 first: highest rating first, join order for ties and unrated players"""
+    if not ratings:
+        return list(players)
+    return sorted(players, key=lambda player: (player not in ratings, -ratings.get(player, 0)))
+
+
+@dataclass(frozen=True)
+class Match:
+    round: int
+    slot: int
+    player_1: Optional[int]
+    player_2: Optional[int]
+    winner: Optional[int]
+
+    @property
+    def is_bye(self) -> bool:
+        return self.player_1 is None or self.player_2 is None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'round': self.round,
+            'slot': self.slot,
+            'player_1': self.player_1,
+            'player_2': self.player_2,
+            'winner': self.winner,
+            'bye': self.is_bye,
+        }
+
+
+@dataclass(frozen=True)
+class Bracket:
+    slots: Tuple[int, ...]
+
+    @classmethod
+    def build(cls, seeded_players: Sequence[int]) -> 'Bracket':
+        """Bracket of the players in seed order (see seed()), byes already advanced"""
+        if len(seeded_players) < MIN_PLAYERS:
+            raise ValueError(f"A bracket needs at least {MIN_PLAYERS} players")
+        size = bracket_size(len(seeded_players))
+        slots = [0] * (2 * size)
+        slots[0] = len(seeded_players)
+        for leaf, seed_number in enumerate(seed_positions(size)):
+            if seed_number <= len(seeded_players):
+                slots[size + leaf] = seeded_players[seed_number - 1]
+        # Seeding never pairs two byes: the one player of a bye match advances
+        for slot in range(size // 2, size):
+            left, right = slots[2 * slot], slots[2 * slot + 1]
+            if not left or not right:
+                slots[slot] = left or right
+        return cls(tuple(slots))
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> Optional['Bracket']:
+        if not raw:
+            return None
+        return cls(tuple(value for (value,) in SLOT.iter_unpack(raw)))
+
+    def to_bytes(self) -> bytes:
+        return b''.join(SLOT.pack(value) for value in self.slots)
+
+    @property
+    def size(self) -> int:
+        return len(self.slots) // 2
+
+    @property
+    def depth(self) -> int:
+        """Number of rounds"""
+        return self.size.bit_length() - 1
+
+    @property
+    def player_count(self) -> int:
+        return self.slots[0]
+
+    @property
+    def champion(self) -> Optional[int]:
+        return self.slots[1] or None
+
+    @property
+    def seeds(self) -> List[int]:
+        """Players in leaf order (byes left out)"""
+        return [player for player in self.slots[self.size:] if player]
+
+    def _level(self, round_number: int) -> range:
+        """Match slots of a round; round 0 is the leaves"""
+        start = self.size >> round_number
+        return range(start, 2 * start)
+
+    def matches(self, round_number: int) -> List[Match]:
+        if not 1 <= round_number <= self.depth:
+            return []
+        return [
+            Match(
+                round=round_number,
+                slot=slot,
+                player_1=self.slots[2 * slot] or None,
+                player_2=self.slots[2 * slot + 1] or None,
+                winner=self.slots[slot] or None,
+            )
+            for slot in self._level(round_number)
+        ]
+
+    def entrants(self, round_number: int) -> List[int]:
+        """Players of a round, those with a bye included"""
+        if round_number < 1:
+            return self.seeds
+        return [player for player in (self.slots[slot] for slot in self._level(round_number - 1)) if player]
+
+    def advancing(self, round_number: int) -> List[int]:
+        """Players through to the round after `round_number` so far (round 0: everybody)"""
+        if round_number < 1:
+            return self.seeds
+        round_number = min(round_number, self.depth)
+        return [player for player in (self.slots[slot] for slot in self._level(round_number)) if player]
+
+    def render(self) -> Dict[str, Any]:
+        """JSON-ready tree for the frontend"""
+        return {
+            'size': self.size,
+            'players': self.player_count,
+            'seeds': self.seeds,
+            'champion': self.champion,
+            'rounds': [
+                [match.to_dict() for match in self.matches(round_number)]
+                for round_number in range(1, self.depth + 1)
+            ],
+        }
@@ -1,10 +1,15 @@
 import asyncio
 import json
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from .signals import GameState
 from .tournament_manager import tournament_manager
 from .models import Game
+from .wire_protocol import BinaryStateStream
+from .spectator import spectator_broadcast, spectator_group
+from .match_registry import match_registry
+from .presence import presence
 import logging
 from asgiref.sync import sync_to_async
 
@@ -12,8 +17,9 @@ from asgiref.sync import sync_to_async
 logger = logging.getLogger('pong_app')
 websocket_logger = logging.getLogger('websockets')
 
-active_games = {}
-player_ready = {}
+# Matches owned (stepped) by this process; other pods own the rest (see match_registry)
+active_games = match_registry.local_games
+player_ready = match_registry.local_ready
 
 class GameTableConsumer(AsyncWebsocketConsumer):
 	async def connect(self):
@@ -32,6 +38,11 @@ class GameTableConsumer(AsyncWebsocketConsumer):
 		self.player_id = user.user_id
 		websocket_logger.info(f"Authenticated user {self.player_id} connected to game {self.room_id}")
 
+		# Opt-in binary game state frames (?protocol=binary), JSON otherwise
+		query_string = parse_qs(self.scope.get('query_string', b'').decode())
+		self.protocol = 'binary' if query_string.get('protocol', [''])[0] == 'binary' else 'json'
+		self.state_stream = BinaryStateStream() if self.protocol == 'binary' else None
+
 		# Join room group
 		await self.channel_layer.group_add(
 			self.room_name,
@@ -40,12 +51,15 @@ class GameTableConsumer(AsyncWebsocketConsumer):
 		
 		await self.accept()
 		logger.info(f"WebSocket connection accepted for game {self.room_id}")
+		await match_registry.watch(self.room_id)
+		await presence.connect(self.player_id)
 		
 		# Send welcome message to confirm successful connection
 		await self.send(text_data=json.dumps({
 			'type': 'connection_success',
 			'message': f'Welcome to game {self.room_id}!',
-			'player_id': self.player_id
+			'player_id': self.player_id,
+			'protocol': self.protocol
 		}))
 
 	async def disconnect(self, close_code):
@@ -77,6 +91,21 @@ class GameTableConsumer(AsyncWebsocketConsumer):
 				# Remove game from active games
 				del active_games[self.room_id]
 			logger.info(f"Game {self.room_id} resources cleaned up after disconnect")
+		elif hasattr(self, 'player_id') and await match_registry.forward(self.room_id, 'quit_game', self.player_id):
+			# The match runs on another pod
+			logger.info(f"Player {self.player_id} disconnected from game {self.room_id} owned by another process")
+			await self.channel_layer.group_send(
+				self.room_name,
+				{
+					'type': 'quit_game',
+					'player': self.player_id,
+					'message': f'Player disconnected unexpectedly',
+					'game_over': True
+				}
+			)
+		if hasattr(self, 'player_id'):
+			match_registry.unwatch(self.room_id)
+			await presence.disconnect(self.player_id)
 		
 		# Leave room group
 		await self.channel_layer.group_discard(
@@ -109,13 +138,11 @@ class GameTableConsumer(AsyncWebsocketConsumer):
 	async def player_ready(self, data):
 		# Use authenticated user from connection instead of client data
 		player = self.player_id
-		if self.room_id not in player_ready:
-			player_ready[self.room_id] = set()
+		# Shared across pods through Redis, the players may be connected to different processes
+		ready_count = await match_registry.mark_ready(self.room_id, player)
+		logger.info(f"Player {player} ready in game {self.room_id}. Ready players: {ready_count}")
 
-		player_ready[self.room_id].add(player)
-		logger.info(f"Player {player} ready in game {self.room_id}. Ready players: {len(player_ready[self.room_id])}")
-
-		if len(player_ready[self.room_id]) == 2:
+		if ready_count == 2:
 			logger.info(f"All players ready in game {self.room_id}, starting game")
 			await self.channel_layer.group_send(
 				self.room_name,
@@ -125,6 +152,10 @@ class GameTableConsumer(AsyncWebsocketConsumer):
 				}
 			)
 			
+			# Only the process that wins the lease runs the match
+			if not await match_registry.claim(self.room_id):
+				logger.info(f"Game {self.room_id} is already owned, not starting it here")
+				return
 			try:
 				game = await sync_to_async(Game.objects.get)(id=self.room_id)
 				data['player1'] = await sync_to_async(lambda: game.player_1)()
@@ -146,7 +177,7 @@ class GameTableConsumer(AsyncWebsocketConsumer):
 		logger.info(f"Starting game {self.room_id} with players {data}")
 		try:
 			self.tournament_id = await database_sync_to_async(self.get_tournament_id)()
-			del player_ready[self.room_id]
+			player_ready.pop(self.room_id, None)
 			active_games[self.room_id] = GameState(
 				data['player1'], 
 				data['player2'], 
@@ -154,6 +185,7 @@ class GameTableConsumer(AsyncWebsocketConsumer):
 				data.get('player_length', 10), 
 				tournament_id=self.tournament_id,
 			)
+			# start() only prepares the match, then hands it to the shared game loop
 			asyncio.create_task(active_games[self.room_id].start())
 			logger.info(f"Game {self.room_id} successfully started")
 		except Exception as e:
@@ -163,9 +195,7 @@ class GameTableConsumer(AsyncWebsocketConsumer):
 		try:
 			# Use authenticated user from connection instead of client data
 			player = self.player_id
-			active_games[self.room_id].up(player)
-		except KeyError:
-			logger.error(f"Game {self.room_id} not found for UP movement")
+			await self.apply_action('up', player, self.input_seq(data))
 		except Exception as e:
 			logger.error(f"Error in UP movement: {str(e)}")
 
@@ -173,9 +203,7 @@ class GameTableConsumer(AsyncWebsocketConsumer):
 		try:
 			# Use authenticated user from connection instead of client data
 			player = self.player_id
-			active_games[self.room_id].down(player)
-		except KeyError:
-			logger.error(f"Game {self.room_id} not found for DOWN movement")
+			await self.apply_action('down', player, self.input_seq(data))
 		except Exception as e:
 			logger.error(f"Error in DOWN movement: {str(e)}")
 
@@ -183,13 +211,24 @@ class GameTableConsumer(AsyncWebsocketConsumer):
 		try:
 			# Use authenticated user from connection instead of client data
 			player = self.player_id
-			active_games[self.room_id].stop(player)
+			await self.apply_action('stop', player, self.input_seq(data))
 			logger.debug(f"Player {player} stopped in game {self.room_id}")
-		except KeyError:
-			logger.error(f"Game {self.room_id} not found for STOP movement")
 		except Exception as e:
 			logger.error(f"Error in STOP movement: {str(e)}")
 
+	async def apply_action(self, action, player, seq=None):
+		"""Apply a player action locally, or forward it to the pod owning the match"""
+		if match_registry.apply_action(self.room_id, action, player, seq):
+			return
+		if not await match_registry.forward(self.room_id, action, player, seq):
+			logger.error(f"Game {self.room_id} not found for {action.upper()} movement")
+
+	@staticmethod
+	def input_seq(data):
+		"""Client input sequence number, None for clients that do not send one"""
+		seq = data.get('seq')
+		return seq if isinstance(seq, int) and not isinstance(seq, bool) else None
+
 	async def game_init(self, data):
 		logger.info(f"Game initialization for {self.room_id}")
 		try:
@@ -223,10 +262,27 @@ class GameTableConsumer(AsyncWebsocketConsumer):
 	async def game_state(self, data):
 		# Avoid excessive logging for high-frequency state updates
 		logger.debug(f"Game state update for {self.room_id}")
-		await self.send(text_data=json.dumps({
-			'type': 'game_state',
-			'game_state': data['game_state']
-		}))
+		if self.state_stream is not None and 'snapshot' in data:
+			frame = self.state_stream.encode(
+				data['seq'], tuple(data['snapshot']),
+				keyframe=data.get('keyframe'),
+				cache_key=self.room_id
+			)
+			await self.send(bytes_data=frame)
+			return
+		# Pre-encoded once per frame by GameState.update
+		text = data.get('text')
+		if text is None:
+			text = json.dumps({
+				'type': 'game_state',
+				'game_state': data['game_state']
+			})
+		await self.send(text_data=text)
+
+	async def ack(self, data):
+		"""Binary protocol: client holds snapshot `seq`, later frames are deltas against it"""
+		if self.state_stream is not None and isinstance(data.get('seq'), int):
+			self.state_stream.ack(data['seq'])
 
 	async def game_over(self, data):
 		logger.info(f"Game over for {self.room_id}")
@@ -279,6 +335,8 @@ class GameTableConsumer(AsyncWebsocketConsumer):
 				active_games[self.room_id].quit_game(player)
 				del active_games[self.room_id]
 				logger.info(f"Game {self.room_id} resources cleaned up after player quit")
+			else:
+				await match_registry.forward(self.room_id, 'quit_game', player)
 		except KeyError:
 			logger.warning(f"Game {self.room_id} already removed from active_games")
 		except Exception as e:
@@ -328,12 +386,54 @@ class GameTableConsumer(AsyncWebsocketConsumer):
 		'down': down,
 		'stop': stop,
 		'game_state': game_state,
+		'ack': ack,
 		'game_init': game_init,
 		'game_over': game_over,
 		'quit_game': quit_game,
 		'all_players_ready': all_players_ready,
 	}
 
+class SpectatorConsumer(AsyncWebsocketConsumer):
+	"""Read-only match stream: never touches player_ready / active_games"""
+
+	async def connect(self):
+		self.room_id = self.scope['url_route']['kwargs']['room_id']
+		self.group_name = spectator_group(self.room_id)
+
+		user = self.scope.get('user')
+		if not user or not hasattr(user, 'user_id'):
+			websocket_logger.warning(f"Unauthenticated spectator connection attempt for game {self.room_id}")
+			await self.close(code=4001)
+			return
+
+		self.user_id = user.user_id
+		await self.channel_layer.group_add(self.group_name, self.channel_name)
+		await self.accept()
+		websocket_logger.info(f"User {self.user_id} spectating game {self.room_id}")
+
+		await self.send(text_data=json.dumps({
+			'type': 'spectator_connection_success',
+			'message': f'Spectating game {self.room_id}',
+			'game_id': self.room_id,
+			'rate': spectator_broadcast.rate
+		}))
+
+	async def disconnect(self, close_code):
+		websocket_logger.info(f"Spectator disconnected: game={self.room_id}, code={close_code}")
+		if hasattr(self, 'user_id'):
+			await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+	async def receive(self, text_data=None, bytes_data=None):
+		# Read-only: spectators cannot send game commands
+		websocket_logger.debug(f"Ignoring spectator message for game {self.room_id}")
+
+	async def spectator_frame(self, event):
+		# Pre-encoded once per sample by the fan-out task
+		await self.send(text_data=event['text'])
+
+	async def spectator_game_over(self, event):
+		await self.send(text_data=event['text'])
+
 class TournamentConsumer(AsyncWebsocketConsumer):
 	async def connect(self):
 		self.tournament_id = self.scope['url_route']['kwargs'].get('tournament_id', None)
@@ -359,6 +459,7 @@ class TournamentConsumer(AsyncWebsocketConsumer):
 
 		await self.accept()
 		logger.info(f"Tournament websocket connection accepted: {self.tournament_id}")
+		await presence.connect(self.player_id)
 
 		# Send welcome message
 		await self.send(text_data=json.dumps({
@@ -371,6 +472,8 @@ class TournamentConsumer(AsyncWebsocketConsumer):
 
 	async def disconnect(self, close_code):
 		websocket_logger.info(f"Tournament disconnected: {self.tournament_id}, code={close_code}")
+		if hasattr(self, 'player_id'):
+			await presence.disconnect(self.player_id)
 		
 		# Leave room group
 		await self.channel_layer.group_discard(
@@ -410,9 +513,15 @@ class TournamentConsumer(AsyncWebsocketConsumer):
 				return  # Error already sent
 			
 			# Step 2: Check if player is already in tournament
-			current_players = await tournament.get_players()
-			if self.player_id in current_players:
-				await self._send_already_joined_response(tournament)
+			snapshot = await tournament.snapshot()
+			if snapshot is None:
+				await self.send(text_data=json.dumps({
+					'type': 'error',
+					'error': 'Tournament not found'
+				}))
+				return
+			if self.player_id in snapshot.players:
+				await self._send_already_joined_response(snapshot)
 				return
 			
 			# Step 3: Add player to tournament
@@ -421,10 +530,11 @@ class TournamentConsumer(AsyncWebsocketConsumer):
 				return  # Error already sent
 			
 			# Step 4: Send success response
-			await self._send_join_success_response(tournament)
+			snapshot = await tournament.snapshot()
+			await self._send_join_success_response(snapshot)
 			
 			# Step 5: Check if tournament is full
-			await self._check_tournament_full(tournament)
+			await self._check_tournament_full(snapshot)
 			
 		except Exception as e:
 			logger.error(f"Error in join for tournament {self.tournament_id}: {str(e)}", exc_info=True)
@@ -486,32 +596,28 @@ class TournamentConsumer(AsyncWebsocketConsumer):
 				}))
 				return None
 
-	async def _send_already_joined_response(self, tournament):
+	@staticmethod
+	def _tournament_data(snapshot):
+		"""Tournament summary sent with join responses"""
+		return {
+			'name': snapshot.name,
+			'current_players': snapshot.nbr_player,
+			'max_players': snapshot.max_p,
+			'creator_id': snapshot.creator_id,
+			'players': list(snapshot.players),
+			'initialized': snapshot.initialized,
+			'is_complete': snapshot.is_complete
+		}
+
+	async def _send_already_joined_response(self, snapshot):
 		"""Send response for player already in tournament"""
 		logger.info(f"Player {self.player_id} already in tournament {self.tournament_id}")
 		
-		# Get tournament data using async methods
-		name = await tournament.redis_state.get_name()
-		nbr_player = await tournament.get_nbr_player()
-		max_p = await tournament.redis_state.get_max_p()
-		creator_id = await tournament.redis_state.get_creator_id()
-		players = await tournament.get_players()
-		initialized = await tournament.get_initialized()
-		is_complete = await tournament.get_is_complete()
-		
 		await self.send(text_data=json.dumps({
 			'type': 'success',
-			'success': f'Welcome back to tournament {name}',
+			'success': f'Welcome back to tournament {snapshot.name}',
 			'already_joined': True,
-			'tournament_data': {
-				'name': name,
-				'current_players': nbr_player,
-				'max_players': max_p,
-				'creator_id': creator_id,
-				'players': players,
-				'initialized': initialized,
-				'is_complete': is_complete
-			}
+			'tournament_data': self._tournament_data(snapshot)
 		}))
 
 	async def _add_player_to_tournament(self, tournament):
@@ -555,40 +661,19 @@ class TournamentConsumer(AsyncWebsocketConsumer):
 		
 		return True
 
-	async def _send_join_success_response(self, tournament):
+	async def _send_join_success_response(self, snapshot):
 		"""Send success response for joining tournament"""
-		# Get tournament data using async methods
-		name = await tournament.redis_state.get_name()
-		nbr_player = await tournament.get_nbr_player()
-		max_p = await tournament.redis_state.get_max_p()
-		creator_id = await tournament.redis_state.get_creator_id()
-		players = await tournament.get_players()
-		initialized = await tournament.get_initialized()
-		is_complete = await tournament.get_is_complete()
-		
 		await self.send(text_data=json.dumps({
 			'type': 'success',
-			'success': f'Successfully joined tournament {name}',
+			'success': f'Successfully joined tournament {snapshot.name}',
 			'newly_joined': True,
-			'tournament_data': {
-				'name': name,
-				'current_players': nbr_player,
-				'max_players': max_p,
-				'creator_id': creator_id,
-				'players': players,
-				'initialized': initialized,
-				'is_complete': is_complete
-			}
+			'tournament_data': self._tournament_data(snapshot)
 		}))
 
-	async def _check_tournament_full(self, tournament):
+	async def _check_tournament_full(self, snapshot):
 		"""Check if tournament is full and notify if ready to start"""
-		nbr_player = await tournament.get_nbr_player()
-		max_p = await tournament.redis_state.get_max_p()
-		
-		if nbr_player >= max_p:
-			logger.info(f"Tournament {self.tournament_id} is full with {nbr_player} players")
-			players = await tournament.get_players()
+		if snapshot.nbr_player >= snapshot.max_p:
+			logger.info(f"Tournament {self.tournament_id} is full with {snapshot.nbr_player} players")
 			
 			await self.channel_layer.group_send(
 				self.room_name,
@@ -596,8 +681,8 @@ class TournamentConsumer(AsyncWebsocketConsumer):
 					'type': 'tournament_auto_start',
 					'message': 'Tournament is full! Creator can now start the tournament.',
 					'tournament_data': {
-						'players': players,
-						'max_players': max_p,
+						'players': list(snapshot.players),
+						'max_players': snapshot.max_p,
 						'ready_to_start': True
 					}
 				}
@@ -657,8 +742,7 @@ class TournamentConsumer(AsyncWebsocketConsumer):
 						logger.info(f"Tournament initialized successfully by creator {player_id} in tournament {self.tournament_id}")
 						
 						# Get tournament data for notification
-						players = await tournament.get_players()
-						max_p = await tournament.redis_state.get_max_p()
+						snapshot = await tournament.snapshot()
 						
 						# Notify all players that tournament has been initialized
 						await self.channel_layer.group_send(
@@ -667,8 +751,8 @@ class TournamentConsumer(AsyncWebsocketConsumer):
 								'type': 'tournament_initialized',
 								'message': 'Tournament brackets have been initialized! Rounds will start automatically.',
 								'tournament_data': {
-									'players': players,
-									'max_players': max_p,
+									'players': list(snapshot.players),
+									'max_players': snapshot.max_p,
 									'initialized': True,
 									'auto_rounds': True
 								}
@@ -730,7 +814,7 @@ class TournamentConsumer(AsyncWebsocketConsumer):
 		}))
 
 	async def tournament_start_round(self, event):
-		"""Handle start round broadcast message"""
+		"""Handle start round broadcast message (carries every game of the round)"""
 		await self.send(text_data=json.dumps({
 			'type': 'start_round',
 			'message': event['message'],
@@ -738,6 +822,15 @@ class TournamentConsumer(AsyncWebsocketConsumer):
 			'games': event.get('games', []),
 			'creator': event.get('creator')
 		}))
+		# One broadcast per round replaces a create_game message per game
+		for game in event.get('games', []):
+			if self.player_id in (game.get('player_1'), game.get('player_2')) and 'game_id' in game:
+				await self.send_game_created(
+					game['game_id'],
+					game['player_1'], game.get('player_1_username') or f"Player_{game['player_1']}",
+					game['player_2'], game.get('player_2_username') or f"Player_{game['player_2']}"
+				)
+				break
 
 	async def tournament_end_round(self, event):
 		"""Handle end round broadcast message"""
@@ -854,28 +947,31 @@ class TournamentConsumer(AsyncWebsocketConsumer):
 						player_2_username = f"Player_{player_2_id}"
 				
 				# Notify only the relevant player
-				await self.send(text_data=json.dumps({
-						'type': 'game_created',
-						'message': f'Your match is ready! {player_1_username} vs {player_2_username}',
-						'game_data': {
-								'game_id': game_id,
-								'player_1': {
-										'user_id': player_1_id,
-										'username': player_1_username
-								},
-								'player_2': {
-										'user_id': player_2_id,
-										'username': player_2_username
-								},
-								'tournament_id': self.tournament_id
-						}
-				}))
-				
-				logger.info(f"Game notification sent to player {self.player_id} for game {game_id}")
+				await self.send_game_created(game_id, player_1_id, player_1_username, player_2_id, player_2_username)
 				
 		except Exception as e:
 				logger.error(f"Error handling game creation notification: {str(e)}")
 
+	async def send_game_created(self, game_id, player_1_id, player_1_username, player_2_id, player_2_username):
+		"""Tell this player their match is ready"""
+		await self.send(text_data=json.dumps({
+			'type': 'game_created',
+			'message': f'Your match is ready! {player_1_username} vs {player_2_username}',
+			'game_data': {
+				'game_id': game_id,
+				'player_1': {
+					'user_id': player_1_id,
+					'username': player_1_username
+				},
+				'player_2': {
+					'user_id': player_2_id,
+					'username': player_2_username
+				},
+				'tournament_id': self.tournament_id
+			}
+		}))
+		logger.info(f"Game notification sent to player {self.player_id} for game {game_id}")
+
 	# Message handlers dictionary
 	message_handlers = {
 		'join': join,
@@ -0,0 +1,179 @@
+"""
+Shared game loop
+
+A single asyncio task steps every active GameState of this process in one
+batch per tick, instead of each match running its own `while self.running`
+loop with its own sleep/drift correction.
+
+The loop uses a fixed timestep with an accumulator: if the event loop wakes up
+late, the missed physics steps are caught up (up to `max_catch_up_steps`) and
+state is broadcast once per wake-up.
+"""
+import asyncio
+import logging
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger('pong_app')
+
+TICK_DURATION = Histogram(
+	'pong_game_loop_tick_seconds',
+	'Time spent stepping and broadcasting all matches in one scheduler wake-up',
+	buckets=(0.001, 0.0025, 0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.25),
+)
+ACTIVE_MATCHES = Gauge('pong_game_loop_active_matches', 'Matches registered in the shared game loop')
+BUDGET_USAGE = Gauge('pong_game_loop_budget_ratio', 'Last tick duration divided by the tick interval')
+TICK_OVERRUNS = Counter('pong_game_loop_overruns_total', 'Ticks whose work exceeded the tick interval')
+DROPPED_STEPS = Counter('pong_game_loop_dropped_steps_total', 'Physics steps skipped because the loop fell too far behind')
+
+
+class GameLoopScheduler:
+	"""Steps all registered matches at a fixed rate from one task"""
+
+	def __init__(self, tick_rate=30, max_catch_up_steps=5):
+		self.tick_rate = tick_rate
+		self.tick_interval = 1 / tick_rate
+		self.max_catch_up_steps = max_catch_up_steps
+		self.games = {}		# game_id -> GameState
+		self._task = None
+
+		# Per-tick budget metrics (also exported to Prometheus)
+		self.ticks = 0
+		self.last_tick_ms = 0.0
+		self.avg_tick_ms = 0.0
+		self.max_tick_ms = 0.0
+		self.overruns = 0
+		self.dropped_steps = 0
+
+	def add(self, game):
+		"""Register a match; it is stepped from the next tick on"""
+		self.games[game.game_id] = game
+		ACTIVE_MATCHES.set(len(self.games))
+		logger.info(f"Game {game.game_id} joined the game loop ({len(self.games)} active)")
+		if self._task is None or self._task.done():
+			self._task = asyncio.create_task(self._run())
+
+	def remove(self, game_id):
+		"""Unregister a match without ending it"""
+		game = self.games.pop(game_id, None)
+		ACTIVE_MATCHES.set(len(self.games))
+		return game
+
+	def __contains__(self, game_id):
+		return game_id in self.games
+
+	async def _run(self):
+		logger.info(f"Game loop started at {self.tick_rate} ticks/s")
+		accumulator = 0.0
+		last_time = time.monotonic()
+
+		while self.games:
+			now = time.monotonic()
+			accumulator += now - last_time
+			last_time = now
+
+			stepped = {}
+			steps = 0
+			while accumulator >= self.tick_interval and steps < self.max_catch_up_steps:
+				self._step_all(stepped)
+				accumulator -= self.tick_interval
+				steps += 1
+
+			if accumulator >= self.tick_interval:
+				# Too far behind: drop the backlog instead of spiralling
+				dropped = int(accumulator / self.tick_interval)
+				self.dropped_steps += dropped
+				DROPPED_STEPS.inc(dropped)
+				accumulator %= self.tick_interval
+				logger.warning(f"Game loop dropped {dropped} steps ({len(self.games)} active matches)")
+
+			if stepped:
+				await self._broadcast(stepped.values())
+			self._end_finished_games()
+
+			if steps:
+				self._record_tick(time.monotonic() - now)
+
+			elapsed = time.monotonic() - last_time
+			await asyncio.sleep(max(0, self.tick_interval - accumulator - elapsed))
+
+		logger.info("Game loop stopped, no active matches")
+
+	def _step_all(self, stepped):
+		"""Advance every running match by one fixed timestep"""
+		batches = {}	# id -> (batch, games, states)
+		for game in list(self.games.values()):
+			if not game.running:
+				continue
+			stepped[game.game_id] = game
+			batch = game.physics.batch
+			try:
+				if batch is None:
+					game.tick()
+					continue
+				# Vectorized engine: collect the state now, step the whole batch once below
+				state = game.prepare_batched_tick()
+				if id(batch) not in batches:
+					batches[id(batch)] = (batch, [], [])
+				_, games, states = batches[id(batch)]
+				games.append(game)
+				states += state
+			except Exception as e:
+				self._stop_failed_game(game, e)
+
+		for batch, games, states in batches.values():
+			for game, result in zip(games, batch.step_synced(states)):
+				try:
+					game.finish_batched_tick(*result)
+				except Exception as e:
+					self._stop_failed_game(game, e)
+
+	def _stop_failed_game(self, game, error):
+		logger.error(f"Error stepping game {game.game_id}, stopping it: {error}", exc_info=True)
+		game.running = False
+
+	async def _broadcast(self, games):
+		await asyncio.gather(*(game.update() for game in games), return_exceptions=True)
+
+	def _end_finished_games(self):
+		for game_id, game in list(self.games.items()):
+			if not game.running:
+				self.remove(game_id)
+				asyncio.create_task(game.game_end())
+
+	def _record_tick(self, duration):
+		duration_ms = duration * 1000
+		self.ticks += 1
+		self.last_tick_ms = duration_ms
+		self.max_tick_ms = max(self.max_tick_ms, duration_ms)
+		# Exponential moving average keeps this O(1)
+		self.avg_tick_ms += (duration_ms - self.avg_tick_ms) * 0.05
+
+		budget_ratio = duration / self.tick_interval
+		TICK_DURATION.observe(duration)
+		BUDGET_USAGE.set(budget_ratio)
+		if budget_ratio > 1:
+			self.overruns += 1
+			TICK_OVERRUNS.inc()
+
+		if self.ticks % (self.tick_rate * 10) == 0:	# Every 10 seconds
+			logger.info(f"Game loop stats: {self.get_metrics()}")
+
+	def get_metrics(self):
+		"""Per-tick budget metrics"""
+		return {
+			'tick_rate': self.tick_rate,
+			'active_matches': len(self.games),
+			'ticks': self.ticks,
+			'budget_ms': round(self.tick_interval * 1000, 3),
+			'last_tick_ms': round(self.last_tick_ms, 3),
+			'avg_tick_ms': round(self.avg_tick_ms, 3),
+			'max_tick_ms': round(self.max_tick_ms, 3),
+			'overruns': self.overruns,
+			'dropped_steps': self.dropped_steps,
+		}
+
+
+# Global game loop, ticking every match of the process 30 times per second
+game_loop = GameLoopScheduler(tick_rate=30)
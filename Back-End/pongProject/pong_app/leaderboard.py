@@ -0,0 +1,169 @@
+"""
+Elo ratings and Redis leaderboards
+
+    leaderboard:global          ZSET player id -> Elo rating
+    leaderboard:weekly:{week}   ZSET player id -> rating gained in ISO week {week} (e.g. 2026-W42)
+
+Ratings are kept in PlayerStats.rating (see player_stats.py); the ZSETs mirror
+them, so a rank (ZREVRANK) or a page of a board (ZREVRANGE) costs O(log n)
+however many players and games there are. A friends board scores the friends
+with one ZMSCORE.
+
+Without Redis (or with PONG_LEADERBOARD off) the global board is read from
+PlayerStats through its rating index, and the weekly board is empty.
+"""
+
+import logging
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import redis
+from django.conf import settings
+
+from .models import PlayerStats
+
+logger = logging.getLogger('pong_app')
+
+K_FACTOR = 32
+INITIAL_RATING = 1000  # PlayerStats.rating default
+BOARDS = ('global', 'weekly')
+
+
+def expected_score(rating: int, opponent: int) -> float:
+    """Probability that `rating` beats `opponent`"""
+    return 1 / (1 + 10 ** ((opponent - rating) / 400))
+
+
+def elo_delta(winner_rating: int, loser_rating: int) -> int:
+    """Points the winner takes from the loser, at least one"""
+    return max(1, round(K_FACTOR * (1 - expected_score(winner_rating, loser_rating))))
+
+
+def week_of(day: date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class Leaderboard:
+    """
+    Redis mirror of the player ratings, read by the leaderboard endpoints.
+    Writes are best effort: manage.py rebuild_player_stats reloads the global
+    board from the database.
+    """
+
+    def __init__(self):
+        self.enabled = getattr(settings, 'PONG_LEADERBOARD', True)
+        self.redis_client = None
+
+        # Redis keys
+        self.GLOBAL_KEY = "leaderboard:global"
+        self.WEEKLY_KEY = "leaderboard:weekly:{week}"
+
+        self.WEEKLY_TTL = 35 * 24 * 3600  # keep a month of past weeks
+
+        if self.enabled:
+            self._init_redis()
+
+    def _init_redis(self):
+        """Initialize Redis connection"""
+        try:
+            self.redis_client = redis.Redis(
+                host=getattr(settings, 'REDIS_HOST', 'localhost'),
+                port=int(getattr(settings, 'REDIS_PORT', '6379')),
+                db=int(getattr(settings, 'REDIS_CACHE_DB', '1')),
+                decode_responses=True,
+                socket_connect_timeout=5,
+                socket_timeout=5
+            )
+        except Exception as e:
+            logger.error(f"Leaderboard reads the database, Redis unavailable: {e}")
+            self.enabled = False
+
+    def _key(self, board: str) -> str:
+        if board == 'weekly':
+            return self.WEEKLY_KEY.format(week=week_of(date.today()))
+        return self.GLOBAL_KEY
+
+    def record(self, ratings: Dict[int, int], winner_id: int, loser_id: int, delta: int):
+        """Mirror the ratings of a game's players and the points that changed hands"""
+        if not self.enabled:
+            return
+        try:
+            weekly = self._key('weekly')
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.zadd(self.GLOBAL_KEY, ratings)
+            pipe.zincrby(weekly, delta, winner_id)
+            pipe.zincrby(weekly, -delta, loser_id)
+            pipe.expire(weekly, self.WEEKLY_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to update leaderboards after {winner_id} beat {loser_id}: {e}")
+
+    def page(self, board: str, offset: int, limit: int) -> Tuple[int, List[Tuple[int, int]]]:
+        """Number of ranked players and the (player id, score) pairs from rank offset + 1"""
+        if self.enabled:
+            try:
+                key = self._key(board)
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.zcard(key)
+                pipe.zrevrange(key, offset, offset + limit - 1, withscores=True)
+                count, rows = pipe.execute()
+                return count, [(int(player), int(score)) for player, score in rows]
+            except Exception as e:
+                logger.error(f"Leaderboard page failed, reading the database: {e}")
+        if board != 'global':
+            return 0, []
+        ranked = PlayerStats.objects.order_by('-rating', 'player_id')
+        return ranked.count(), list(ranked.values_list('player_id', 'rating')[offset:offset + limit])
+
+    def rank(self, board: str, player_id: int) -> Optional[Tuple[int, int]]:
+        """1-based rank and score of a player, None if unranked"""
+        if self.enabled:
+            try:
+                key = self._key(board)
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.zrevrank(key, player_id)
+                pipe.zscore(key, player_id)
+                rank, score = pipe.execute()
+                return None if rank is None else (rank + 1, int(score))
+            except Exception as e:
+                logger.error(f"Leaderboard rank failed, reading the database: {e}")
+        if board != 'global':
+            return None
+        rating = PlayerStats.objects.filter(player_id=player_id).values_list('rating', flat=True).first()
+        if rating is None:
+            return None
+        return PlayerStats.objects.filter(rating__gt=rating).count() + 1, rating
+
+    def ratings(self, player_ids: Iterable[int]) -> Dict[int, int]:
+        """Ratings of some players (unranked ones left out), with one ZMSCORE"""
+        player_ids = list(dict.fromkeys(player_ids))
+        if not player_ids:
+            return {}
+        if self.enabled:
+            try:
+                scores = self.redis_client.zmscore(self.GLOBAL_KEY, player_ids)
+                return {player: int(score) for player, score in zip(player_ids, scores) if score is not None}
+            except Exception as e:
+                logger.error(f"Leaderboard lookup failed, reading the database: {e}")
+        return dict(PlayerStats.objects.filter(player_id__in=player_ids).values_list('player_id', 'rating'))
+
+    def reload(self, ratings: Dict[int, int]):
+        """Replace the global board with the given ratings"""
+        if not self.enabled:
+            return
+        staging = self.GLOBAL_KEY + ':reload'
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.delete(staging)
+        items = list(ratings.items())
+        for start in range(0, len(items), 1000):
+            pipe.zadd(staging, dict(items[start:start + 1000]))
+        if items:
+            pipe.rename(staging, self.GLOBAL_KEY)
+        else:
+            pipe.delete(self.GLOBAL_KEY)
+        pipe.execute()
+
+
+# Global leaderboard
+leaderboard = Leaderboard()
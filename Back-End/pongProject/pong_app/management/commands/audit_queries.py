@@ -0,0 +1,152 @@
+import random
+import re
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from pong_app.models import Game, PlayerStats, Tournament, UserProfile
+
+# Views that look rows up by player, tournament or game: none of them should scan a table
+ENDPOINTS = [
+	'/pong/games/history?user_id={player}&page_size=10',
+	'/pong/games/pending/{player}/',
+	'/pong/player/stats?user_id={player}',
+	'/pong/user-tournaments?user_id={player}',
+	'/pong/user-tournaments?user_id={player}&status=active',
+	'/pong/game?player_1__user_id={player}',
+	'/pong/game/{game}/',
+	'/pong/player/{player}/',
+	'/pong/tournament/{tournament}/',
+]
+
+EXPLAIN = {
+	'postgresql': 'EXPLAIN (ANALYZE, BUFFERS) ',
+	'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+
+# PostgreSQL 'Seq Scan on <table>', SQLite 'SCAN <table>' without an index
+SEQ_SCAN = re.compile(r'(?:Seq Scan on |^SCAN )(pong_app_\w+)\b(?! USING)')
+
+
+@contextmanager
+def backdated(field):
+	"""Let the seed choose auto_now_add dates"""
+	field.auto_now_add = False
+	try:
+		yield
+	finally:
+		field.auto_now_add = True
+
+
+class Command(BaseCommand):
+	help = 'Replay the ORM queries of the pong views on a seeded dataset and flag sequential scans in their plans'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--players', type=int, default=500)
+		parser.add_argument('--games', type=int, default=50000)
+		parser.add_argument('--tournaments', type=int, default=1000)
+		parser.add_argument('--plans', action='store_true', help='Print every query plan')
+		parser.add_argument('--strict', action='store_true', help='Fail if any query scans a table')
+
+	def handle(self, *args, **options):
+		if connection.vendor not in EXPLAIN:
+			raise CommandError(f"No query plan support for {connection.vendor}")
+
+		# Everything runs in one transaction that is rolled back: the database is left as it was
+		with transaction.atomic():
+			ids = self.seed(options['players'], options['games'], options['tournaments'])
+			scans = self.audit(ids, options['plans'])
+			transaction.set_rollback(True)
+
+		if scans:
+			message = f"{len(scans)} quer{'y' if len(scans) == 1 else 'ies'} scan a table: " + ', '.join(sorted(set(scans)))
+			if options['strict']:
+				raise CommandError(message)
+			self.stdout.write(self.style.WARNING(message))
+		else:
+			self.stdout.write(self.style.SUCCESS('No sequential scans'))
+
+	def seed(self, players, games, tournaments):
+		rng = random.Random(42)
+		now = timezone.now()
+		first_id = (UserProfile.objects.order_by('-user_id').values_list('user_id', flat=True).first() or 0) + 1
+		profiles = UserProfile.objects.bulk_create([
+			UserProfile(user_id=user_id, username=f'audit{user_id}', email=f'audit{user_id}@pong.it')
+			for user_id in range(first_id, first_id + players)
+		])
+		player_ids = [profile.user_id for profile in profiles]
+
+		with backdated(Tournament._meta.get_field('begin_date')):
+			cups = Tournament.objects.bulk_create([
+				Tournament(
+					name=f'Audit cup {index}', max_partecipants=8, partecipants=8,
+					status=rng.choices(['completed', 'active', 'pending'], weights=[90, 5, 5])[0],
+					begin_date=now - timedelta(minutes=rng.randrange(525600)),
+				)
+				for index in range(tournaments)
+			], batch_size=1000)
+		Membership = UserProfile.tournaments.through
+		Membership.objects.bulk_create([
+			Membership(userprofile_id=player, tournament_id=cup.id)
+			for cup in cups for player in rng.sample(player_ids, 8)
+		], batch_size=5000)
+
+		with backdated(Game._meta.get_field('begin_date')):
+			rows = []
+			for _ in range(games):
+				player_1, player_2 = rng.sample(player_ids, 2)
+				rows.append(Game(
+					player_1_id=player_1, player_2_id=player_2,
+					player_1_score=rng.randrange(6), player_2_score=rng.randrange(6),
+					tournament_id=rng.choice(cups) if rng.random() < 0.3 else None,
+					status='completed',
+					begin_date=now - timedelta(minutes=rng.randrange(525600)),
+				))
+			created = Game.objects.bulk_create(rows, batch_size=5000)
+		PlayerStats.objects.bulk_create([PlayerStats(player_id=player) for player in player_ids], ignore_conflicts=True)
+
+		with connection.cursor() as cursor:
+			for model in (UserProfile, Tournament, Game, PlayerStats, Membership):
+				cursor.execute(f'ANALYZE {model._meta.db_table}')
+		self.stdout.write(f"Seeded {players} players, {tournaments} tournaments, {games} games")
+		return {'player': rng.choice(player_ids), 'tournament': rng.choice(cups).id, 'game': rng.choice(created).id}
+
+	def audit(self, ids, show_plans):
+		factory = APIRequestFactory()
+		user = UserProfile.objects.get(user_id=ids['player'])
+		scans = []
+		for endpoint in ENDPOINTS:
+			path = endpoint.format(**ids)
+			request = factory.get(path)
+			force_authenticate(request, user=user)
+			match = resolve(path.split('?')[0])
+			with CaptureQueriesContext(connection) as queries:
+				response = match.func(request, *match.args, **match.kwargs)
+				response.render()
+			self.stdout.write(self.style.MIGRATE_HEADING(f"{endpoint} ({response.status_code})"))
+
+			for query in queries.captured_queries:
+				sql = query['sql']
+				if not sql.startswith('SELECT'):
+					continue
+				plan = self.explain(sql)
+				tables = SEQ_SCAN.findall(plan)
+				scans += tables
+				status = self.style.ERROR(f"SEQ SCAN {', '.join(tables)}") if tables else self.style.SUCCESS('indexed')
+				self.stdout.write(f"  {status}  {sql[:120]}")
+				if show_plans or tables:
+					self.stdout.write('    ' + plan.replace('\n', '\n    '))
+		return scans
+
+	def explain(self, sql):
+		with connection.cursor() as cursor:
+			cursor.execute(EXPLAIN[connection.vendor] + sql)
+			rows = cursor.fetchall()
+		# SQLite rows are (id, parent, notused, detail), PostgreSQL rows one plan line each
+		return '\n'.join(str(row[-1]) for row in rows)
@@ -0,0 +1,40 @@
+import asyncio
+import re
+
+from django.core.management.base import BaseCommand
+
+from pong_app.redis_tournament_manager import redis_tournament_manager
+from pong_app.tournament_codec import SCHEMA_VERSION, is_legacy
+
+TOURNAMENT_KEY = re.compile(rb'^tournament:(\d+)$')
+
+
+class Command(BaseCommand):
+	help = f'Rewrite tournament records stored in Redis before the codec to schema version {SCHEMA_VERSION}'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--dry-run', action='store_true', help='Only count the records that need migrating')
+
+	def handle(self, *args, **options):
+		legacy, migrated = asyncio.run(self.migrate(options['dry_run']))
+		if options['dry_run']:
+			self.stdout.write(f"{legacy} tournament record(s) to migrate")
+		else:
+			self.stdout.write(self.style.SUCCESS(f"Migrated {migrated} of {legacy} legacy tournament record(s)"))
+
+	async def migrate(self, dry_run):
+		# Records are also migrated lazily on first read: this only saves that read's extra round trip
+		manager = redis_tournament_manager
+		legacy = migrated = 0
+		async for key in manager.raw_client.scan_iter(match='tournament:*', count=500):
+			match = TOURNAMENT_KEY.match(key)
+			if match is None:
+				continue
+			tournament_id = int(match.group(1))
+			if not is_legacy(await manager.raw_client.hgetall(key)):
+				continue
+			legacy += 1
+			if not dry_run and await manager.migrate_record(tournament_id):
+				migrated += 1
+		await manager.raw_client.aclose()
+		return legacy, migrated
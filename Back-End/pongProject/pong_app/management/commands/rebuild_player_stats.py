@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from pong_app.player_stats import rebuild
+
+
+class Command(BaseCommand):
+	help = 'Recompute the PlayerStats table and the global leaderboard from the games and tournaments in the database'
+
+	def handle(self, *args, **options):
+		players = rebuild()
+		self.stdout.write(self.style.SUCCESS(f"Rebuilt statistics of {players} player(s)"))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pong_app import replay
+from pong_app.models import Game
+
+
+class Command(BaseCommand):
+	help = 'Re-simulate a recorded match headlessly (by game id or replay file)'
+
+	def add_arguments(self, parser):
+		parser.add_argument('target', help='Game id or path to a .pgrp replay file')
+		parser.add_argument('--engine', help='Physics engine to use instead of the recorded one')
+		parser.add_argument('--compare', metavar='ENGINE', help='Report the first tick where ENGINE diverges from --engine (or the recorded engine)')
+
+	def handle(self, *args, **options):
+		target = options['target']
+		path = target
+		if target.isdigit():
+			game = Game.objects.filter(id=int(target)).first()
+			if game is None or not game.replay_path:
+				raise CommandError(f"Game {target} has no replay")
+			path = game.replay_path
+
+		try:
+			recording = replay.load(path)
+		except (OSError, ValueError) as e:
+			raise CommandError(f"Cannot load replay {path}: {e}")
+
+		engine = options['engine'] or recording.header['config']['engine_type']
+		result = replay.simulate(recording, engine)
+		self.stdout.write(
+			f"Game {recording.header['game_id']} [{result['engine_type']}]: "
+			f"{result['player_1_score']}-{result['player_2_score']} in {result['ticks']} ticks "
+			f"({result['ticks_per_second']:.0f} ticks/s)"
+		)
+		if 'matches_recording' in result:
+			if result['matches_recording']:
+				self.stdout.write(self.style.SUCCESS(f"Matches the recorded result {recording.footer['player_1_score']}-{recording.footer['player_2_score']}"))
+			else:
+				self.stdout.write(self.style.ERROR(
+					f"Desync: recorded {recording.footer['player_1_score']}-{recording.footer['player_2_score']} "
+					f"in {recording.footer['ticks']} ticks"
+				))
+
+		if options['compare']:
+			divergence = replay.find_divergence(recording, engine, options['compare'])
+			if divergence is None:
+				self.stdout.write(self.style.SUCCESS(f"{options['compare']} matches {engine} on every tick"))
+			else:
+				self.stdout.write(self.style.WARNING(f"{options['compare']} diverges from {engine}: {divergence}"))
@@ -0,0 +1,377 @@
+"""
+Redis match-ownership registry
+
+Lets any pod accept a game WebSocket. Each running match is owned by exactly
+one process, recorded in Redis as a lease:
+
+    match:{room_id}:owner   "<owner channel>|<fencing token>", PX lease
+    match:{room_id}:epoch   INCR'd on every claim (the fencing token)
+    match:{room_id}:ready   set of ready player ids
+    match:{room_id}:state   JSON checkpoint written with every heartbeat
+
+The owner renews its leases and checkpoints its matches every heartbeat;
+writes are fenced (only applied while the lease still holds our value), and a
+process that loses a lease drops the match locally. Consumers on other pods
+forward player inputs to the owner's process-wide channel over the channel
+layer. When a lease expires, a pod with connected players of that match
+claims it and resumes it from the last checkpoint. The old owner closes its
+replay there and the match is no longer linked to one.
+
+Without Redis (or with PONG_MATCH_SHARDING off) everything stays local, as
+with a single process. A claim that cannot reach Redis runs the match
+locally without a lease; this process still writes its result.
+"""
+
+import asyncio
+import json
+import logging
+
+import redis.asyncio as redis
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+logger = logging.getLogger('pong_app')
+
+# KEYS: owner, epoch  ARGV: owner channel, lease ms
+CLAIM_SCRIPT = """
+local owner = redis.call('get', KEYS[1])
+if owner then
+    return owner
+end
+local token = redis.call('incr', KEYS[2])
+owner = ARGV[1] .. '|' .. token
+redis.call('set', KEYS[1], owner, 'PX', ARGV[2])
+return owner
+"""
+
+# KEYS: owner, state  ARGV: our owner value, lease ms, checkpoint, checkpoint ttl ms
+HEARTBEAT_SCRIPT = """
+if redis.call('get', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('pexpire', KEYS[1], ARGV[2])
+redis.call('set', KEYS[2], ARGV[3], 'PX', ARGV[4])
+return 1
+"""
+
+# KEYS: owner, state, ready  ARGV: our owner value
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('del', KEYS[1], KEYS[2], KEYS[3])
+return 1
+"""
+
+# Player actions that may be forwarded to the owning process
+FORWARDED_ACTIONS = ('up', 'down', 'stop', 'quit_game')
+
+
+class MatchRegistry:
+    """
+    Tracks which process owns which match. `local_games` is the dict of
+    matches stepped by this process (consumers.active_games).
+    """
+
+    def __init__(self):
+        self.enabled = getattr(settings, 'PONG_MATCH_SHARDING', True)
+        self.redis_client = None
+        self.local_games = {}       # room_id -> GameState owned by this process
+        self.local_ready = {}       # room_id -> set(player ids), used without Redis
+        self.leases = {}            # room_id -> our owner value
+        self.local_claims = set()   # room_ids claimed while Redis was unreachable
+        self.watched = {}           # room_id -> local consumers connected
+        self.owner_channel = None
+        self._tasks = []
+
+        # Redis key patterns
+        self.OWNER_KEY = "match:{room_id}:owner"
+        self.EPOCH_KEY = "match:{room_id}:epoch"
+        self.READY_KEY = "match:{room_id}:ready"
+        self.STATE_KEY = "match:{room_id}:state"
+
+        # Lease timing
+        self.LEASE_MS = 5000
+        self.HEARTBEAT_INTERVAL = 1.5   # seconds, well within the lease
+        self.CHECKPOINT_TTL_MS = 60000
+        self.READY_TTL = 600  # seconds
+
+        if self.enabled:
+            self._init_redis()
+
+    def _init_redis(self):
+        """Initialize Redis connection and scripts"""
+        try:
+            self.redis_client = redis.Redis(
+                host=getattr(settings, 'REDIS_HOST', 'localhost'),
+                port=int(getattr(settings, 'REDIS_PORT', '6379')),
+                db=int(getattr(settings, 'REDIS_CACHE_DB', '1')),
+                decode_responses=True,
+                socket_connect_timeout=5,
+                socket_timeout=5
+            )
+            self._claim = self.redis_client.register_script(CLAIM_SCRIPT)
+            self._heartbeat = self.redis_client.register_script(HEARTBEAT_SCRIPT)
+            self._release = self.redis_client.register_script(RELEASE_SCRIPT)
+        except Exception as e:
+            logger.error(f"Match sharding disabled, Redis unavailable: {e}")
+            self.enabled = False
+
+    def _keys(self, room_id):
+        return {
+            'owner': self.OWNER_KEY.format(room_id=room_id),
+            'epoch': self.EPOCH_KEY.format(room_id=room_id),
+            'ready': self.READY_KEY.format(room_id=room_id),
+            'state': self.STATE_KEY.format(room_id=room_id),
+        }
+
+    async def ensure_started(self):
+        """Create this process's owner channel and background tasks (once)"""
+        if not self.enabled or self.owner_channel is not None:
+            return
+        channel_layer = get_channel_layer()
+        self.owner_channel = await channel_layer.new_channel('pong_owner.')
+        self._tasks = [
+            asyncio.create_task(self._listen(channel_layer)),
+            asyncio.create_task(self._heartbeat_loop()),
+        ]
+        logger.info(f"Match registry started, owner channel {self.owner_channel}")
+
+    # --- Consumers ---------------------------------------------------------
+
+    async def watch(self, room_id):
+        """A local consumer joined room_id (candidate for takeover)"""
+        self.watched[room_id] = self.watched.get(room_id, 0) + 1
+        await self.ensure_started()
+
+    def unwatch(self, room_id):
+        count = self.watched.get(room_id, 0) - 1
+        if count > 0:
+            self.watched[room_id] = count
+        else:
+            self.watched.pop(room_id, None)
+
+    async def mark_ready(self, room_id, player_id) -> int:
+        """Add a ready player, returns the number of ready players"""
+        if self.enabled:
+            keys = self._keys(room_id)
+            try:
+                async with self.redis_client.pipeline(transaction=True) as pipe:
+                    pipe.sadd(keys['ready'], player_id)
+                    pipe.scard(keys['ready'])
+                    pipe.expire(keys['ready'], self.READY_TTL)
+                    _, count, _ = await pipe.execute()
+                return count
+            except Exception as e:
+                logger.error(f"Redis ready set failed for game {room_id}, using local state: {e}")
+        ready = self.local_ready.setdefault(room_id, set())
+        ready.add(player_id)
+        return len(ready)
+
+    async def claim(self, room_id) -> bool:
+        """Try to become the owner of room_id"""
+        self.local_ready.pop(room_id, None)
+        if not self.enabled:
+            return room_id not in self.local_games
+        await self.ensure_started()
+        keys = self._keys(room_id)
+        try:
+            owner = await self._claim(keys=[keys['owner'], keys['epoch']], args=[self.owner_channel, self.LEASE_MS])
+        except Exception as e:
+            logger.error(f"Redis claim failed for game {room_id}, running it locally: {e}")
+            if room_id in self.local_games:
+                return False
+            # No lease to renew or fence, but the results of the match are ours to write
+            self.local_claims.add(room_id)
+            return True
+        if owner.rsplit('|', 1)[0] != self.owner_channel:
+            logger.info(f"Game {room_id} is owned by {owner}")
+            return False
+        self.leases[room_id] = owner
+        logger.info(f"Claimed game {room_id} with fencing token {owner.rsplit('|', 1)[1]}")
+        return True
+
+    async def forward(self, room_id, action, player, seq=None) -> bool:
+        """Send a player action to the process owning room_id"""
+        if not self.enabled or action not in FORWARDED_ACTIONS:
+            return False
+        try:
+            owner = await self.redis_client.get(self._keys(room_id)['owner'])
+        except Exception as e:
+            logger.error(f"Cannot look up owner of game {room_id}: {e}")
+            return False
+        if owner is None:
+            logger.warning(f"Game {room_id} has no owner, dropping {action}")
+            return False
+        await get_channel_layer().send(owner.rsplit('|', 1)[0], {
+            'type': 'match.action',
+            'room_id': room_id,
+            'action': action,
+            'player': player,
+            'seq': seq,
+        })
+        return True
+
+    # --- Owner side --------------------------------------------------------
+
+    async def release(self, room_id):
+        """The match ended: drop the lease, checkpoint and ready set"""
+        self.local_claims.discard(room_id)
+        owner = self.leases.pop(room_id, None)
+        if owner is None or not self.enabled:
+            return
+        keys = self._keys(room_id)
+        try:
+            await self._release(keys=[keys['owner'], keys['state'], keys['ready']], args=[owner])
+        except Exception as e:
+            logger.error(f"Failed to release game {room_id}: {e}")
+
+    def owns(self, room_id) -> bool:
+        """Whether this process may still write results for room_id"""
+        return not self.enabled or room_id in self.leases or room_id in self.local_claims
+
+    def apply_action(self, room_id, action, player, seq=None):
+        """Apply a (possibly forwarded) player action to a local match"""
+        game = self.local_games.get(room_id)
+        if game is None:
+            return False
+        if action == 'quit_game':
+            game.quit_game(player)
+            self.local_games.pop(room_id, None)
+        else:
+            getattr(game, action)(player, seq)
+        return True
+
+    async def _listen(self, channel_layer):
+        """Receive actions forwarded by other pods"""
+        while True:
+            try:
+                message = await channel_layer.receive(self.owner_channel)
+                if message.get('type') == 'match.action':
+                    if not self.apply_action(message['room_id'], message['action'], message['player'], message.get('seq')):
+                        logger.warning(f"Forwarded {message['action']} for game {message['room_id']} not owned here")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error handling forwarded match action: {e}")
+                await asyncio.sleep(0.1)
+
+    async def _heartbeat_loop(self):
+        while True:
+            try:
+                await self.heartbeat()
+                await self.take_over_orphans()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Match registry heartbeat failed: {e}")
+            await asyncio.sleep(self.HEARTBEAT_INTERVAL)
+
+    async def heartbeat(self):
+        """Renew every lease and checkpoint its match; drop matches we lost"""
+        for room_id, owner in list(self.leases.items()):
+            game = self.local_games.get(room_id)
+            checkpoint = json.dumps(self.checkpoint(game)) if game is not None else '{}'
+            keys = self._keys(room_id)
+            renewed = await self._heartbeat(
+                keys=[keys['owner'], keys['state']],
+                args=[owner, self.LEASE_MS, checkpoint, self.CHECKPOINT_TTL_MS]
+            )
+            if not renewed:
+                self._drop(room_id)
+
+    def _drop(self, room_id):
+        """Lease lost (e.g. after a long pause): another process owns the match now"""
+        from .game_loop import game_loop
+
+        logger.warning(f"Lost ownership of game {room_id}, stopping local copy")
+        self.leases.pop(room_id, None)
+        game = self.local_games.pop(room_id, None) or game_loop.games.get(room_id)
+        game_loop.remove(room_id)
+        if game is not None:
+            game.running = False
+            game.physics.release()
+            game.close_replay(handed_over=True)
+
+    @staticmethod
+    def checkpoint(game) -> dict:
+        # The engine owns the ball's direction and speed, GameState only mirrors them
+        engine = game.physics.engine
+        return {
+            'player_1_score': game.player_1_score,
+            'player_2_score': game.player_2_score,
+            'player_1_pos': game.player_1_pos,
+            'player_2_pos': game.player_2_pos,
+            'ball_pos': list(game.ball_pos),
+            'angle': engine.angle,
+            'ball_speed': engine.ball_speed,
+            'wall_hit_pos': engine.wall_hit_pos,
+            'tick_count': game.tick_count,
+            'ring_length': game.ring_length,
+            'ring_height': game.ring_height,
+            'ring_thickness': game.ring_thickness,
+            'p_length': game.p_length,
+            'p_speed': game.p_speed,
+        }
+
+    @staticmethod
+    def restore(game, checkpoint):
+        """Load a checkpoint into a new GameState and its physics engine"""
+        for name, value in checkpoint.items():
+            setattr(game, name, value)
+        game.sync_physics()
+        game.physics.restore_ball(
+            checkpoint['angle'], checkpoint['ball_speed'], checkpoint.get('wall_hit_pos', 0)
+        )
+
+    async def take_over_orphans(self):
+        """Claim watched matches whose owner lease expired and resume them"""
+        candidates = [room_id for room_id in self.watched if room_id not in self.leases and room_id not in self.local_claims]
+        if not candidates:
+            return
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for room_id in candidates:
+                keys = self._keys(room_id)
+                pipe.exists(keys['owner'])
+                pipe.get(keys['state'])
+            results = await pipe.execute()
+
+        for index, room_id in enumerate(candidates):
+            owner_exists, checkpoint = results[2 * index], results[2 * index + 1]
+            if owner_exists or not checkpoint or checkpoint == '{}':
+                continue
+            if await self.claim(room_id):
+                await self._resume(room_id, json.loads(checkpoint))
+
+    async def _resume(self, room_id, checkpoint):
+        from asgiref.sync import sync_to_async
+        from .game_loop import game_loop
+        from .models import Game
+        from .signals import GameState
+
+        try:
+            game_row = await sync_to_async(
+                Game.objects.select_related('player_1', 'player_2', 'tournament_id').get
+            )(id=room_id)
+        except Game.DoesNotExist:
+            await self.release(room_id)
+            return
+        if game_row.status == 'completed':
+            await self.release(room_id)
+            return
+
+        # A replay re-runs the match from its seed: one resumed from a checkpoint cannot be recorded
+        if game_row.replay_path:
+            await sync_to_async(Game.objects.filter(id=room_id).update)(replay_path=None)
+
+        game = GameState(game_row.player_1, game_row.player_2, room_id, checkpoint['p_length'], game_row.tournament_id)
+        self.restore(game, checkpoint)
+        game.running = True
+        self.local_games[room_id] = game
+        game_loop.add(game)
+        logger.info(f"Took over game {room_id} at tick {checkpoint['tick_count']} "
+                    f"({checkpoint['player_1_score']}-{checkpoint['player_2_score']})")
+
+
+# Global match registry instance
+match_registry = MatchRegistry()
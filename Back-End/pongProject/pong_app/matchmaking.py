@@ -0,0 +1,415 @@
+"""
+Rating-aware quick play matchmaking
+
+Players waiting for a quick play game are kept in Redis:
+
+    matchmaking:queue           ZSET player id -> Elo rating
+    matchmaking:joined          HASH player id -> time they joined (Redis server time, ms)
+    matchmaking:match:{player}  STRING id of the game a player was matched into (short TTL)
+
+Every MATCH_INTERVAL a pairing worker walks the queue in rating order and pairs
+neighbours whose ratings are within a window. The window starts at BASE_WINDOW
+and widens by WINDOW_GROWTH points per second the longer of the two has waited
+(up to MAX_WINDOW), so players are matched closely when the queue is busy and
+still get a game when it is not. Pairing runs as one Lua script: workers of
+several pods may share the queue without matching a player twice. A pod
+starts its worker when a player joins through it, when a queued player asks
+for their status, and at startup if the queue is not empty.
+
+Matched games are created with one INSERT per tick and announced to both
+players through the notification service, as a game created from the API is.
+Players whose game could not be created are put back in the queue without
+losing their wait; a player without a profile is dropped.
+
+Without Redis (or with PONG_MATCHMAKING off) the queue lives in this process.
+Players who join while Redis is unreachable wait in this process too, and are
+paired with the other players of this process.
+"""
+
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import redis
+from django.conf import settings
+from django.db import close_old_connections
+from prometheus_client import Gauge, Histogram
+
+logger = logging.getLogger('pong_app')
+
+QUEUE_DEPTH = Gauge('pong_matchmaking_queue_depth', 'Players waiting in the quick play queue')
+TIME_TO_MATCH = Histogram(
+    'pong_matchmaking_wait_seconds',
+    'Time from joining the quick play queue to being matched',
+    buckets=(1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+)
+MEDIAN_TIME_TO_MATCH = Gauge('pong_matchmaking_median_wait_seconds', 'Median time to match of the last players matched by this process')
+
+# KEYS: queue, joined  ARGV: player id, rating
+# Returns the queue depth, or -1 if the player was already waiting
+JOIN_SCRIPT = """
+if redis.call('zscore', KEYS[1], ARGV[1]) then
+    return -1
+end
+local time = redis.call('time')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+redis.call('zadd', KEYS[1], ARGV[2], ARGV[1])
+redis.call('hset', KEYS[2], ARGV[1], now)
+return redis.call('zcard', KEYS[1])
+"""
+
+# KEYS: queue, joined  ARGV: base window, window growth per second, max window, max pairs
+# Returns {queue depth after pairing, {player 1, player 2, wait 1 ms, wait 2 ms, rating 1, rating 2, ...}}
+PAIR_SCRIPT = """
+local time = redis.call('time')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local entries = redis.call('zrange', KEYS[1], 0, -1, 'withscores')
+local players, ratings, waits = {}, {}, {}
+for i = 1, #entries, 2 do
+    players[#players + 1] = entries[i]
+    ratings[#ratings + 1] = tonumber(entries[i + 1])
+end
+for first = 1, #players, 1000 do
+    local last = math.min(first + 999, #players)
+    local joined = redis.call('hmget', KEYS[2], unpack(players, first, last))
+    for j = 1, #joined do
+        waits[first + j - 1] = math.max(0, now - (tonumber(joined[j]) or now))
+    end
+end
+local matches, paired, i = {}, 0, 1
+while i < #players and paired < tonumber(ARGV[4]) do
+    local waited = math.max(waits[i], waits[i + 1]) / 1000
+    local window = math.min(tonumber(ARGV[1]) + tonumber(ARGV[2]) * waited, tonumber(ARGV[3]))
+    if ratings[i + 1] - ratings[i] <= window then
+        redis.call('zrem', KEYS[1], players[i], players[i + 1])
+        redis.call('hdel', KEYS[2], players[i], players[i + 1])
+        matches[#matches + 1] = players[i]
+        matches[#matches + 1] = players[i + 1]
+        matches[#matches + 1] = waits[i]
+        matches[#matches + 1] = waits[i + 1]
+        matches[#matches + 1] = ratings[i]
+        matches[#matches + 1] = ratings[i + 1]
+        paired = paired + 1
+        i = i + 2
+    else
+        i = i + 1
+    end
+end
+return {redis.call('zcard', KEYS[1]), matches}
+"""
+
+# KEYS: queue, joined  ARGV: player id, rating, ms waited, ...
+# Players who joined again since they were paired keep their new entry
+REQUEUE_SCRIPT = """
+local time = redis.call('time')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+for i = 1, #ARGV, 3 do
+    if redis.call('zadd', KEYS[1], 'NX', ARGV[i + 1], ARGV[i]) == 1 then
+        redis.call('hset', KEYS[2], ARGV[i], now - tonumber(ARGV[i + 2]))
+    end
+end
+return redis.call('zcard', KEYS[1])
+"""
+
+
+def pair_waiting(waiting: List[Tuple[int, int, float]], base_window: float, growth: float,
+                 max_window: float, max_pairs: int) -> List[Tuple[int, int, float, float]]:
+    """
+    Pair (player id, rating, seconds waited) entries as PAIR_SCRIPT does:
+    neighbours in rating order, if their gap fits the window of the longer
+    wait. Returns (player 1, player 2, wait 1, wait 2) tuples.
+    """
+    waiting = sorted(waiting, key=lambda entry: (entry[1], str(entry[0])))
+    matches = []
+    i = 0
+    while i < len(waiting) - 1 and len(matches) < max_pairs:
+        (player_1, rating_1, wait_1), (player_2, rating_2, wait_2) = waiting[i], waiting[i + 1]
+        window = min(base_window + growth * max(wait_1, wait_2), max_window)
+        if rating_2 - rating_1 <= window:
+            matches.append((player_1, player_2, wait_1, wait_2))
+            i += 2
+        else:
+            i += 1
+    return matches
+
+
+class Matchmaker:
+    """
+    Quick play queue and its pairing worker. The worker is a daemon thread
+    started by the first join of the process (or by resume() and status()
+    while players wait in Redis) and stopped when the queue is empty.
+    """
+
+    def __init__(self, worker: bool = True):
+        self.enabled = getattr(settings, 'PONG_MATCHMAKING', True)
+        self.redis_client = None
+        self.worker = worker
+        self.local_queue: Dict[int, Tuple[int, float]] = {}  # player id -> (rating, joined at)
+        self.local_matches: Dict[int, int] = {}  # player id -> game id
+        self.recent_waits = deque(maxlen=100)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._joins = 0
+
+        # Redis keys
+        self.QUEUE_KEY = "matchmaking:queue"
+        self.JOINED_KEY = "matchmaking:joined"
+        self.MATCH_KEY = "matchmaking:match:{player}"
+
+        # Pairing
+        self.MATCH_INTERVAL = 1  # seconds between pairing passes
+        self.BASE_WINDOW = 50  # rating points
+        self.WINDOW_GROWTH = 10  # rating points per second waited
+        self.MAX_WINDOW = 800
+        self.MAX_PAIRS = 100  # games created per pass
+        self.MATCH_TTL = 120  # seconds a match stays readable by status()
+
+        if self.enabled:
+            self._init_redis()
+
+    def _init_redis(self):
+        """Initialize Redis connection and scripts"""
+        try:
+            self.redis_client = redis.Redis(
+                host=getattr(settings, 'REDIS_HOST', 'localhost'),
+                port=int(getattr(settings, 'REDIS_PORT', '6379')),
+                db=int(getattr(settings, 'REDIS_CACHE_DB', '1')),
+                decode_responses=True,
+                socket_connect_timeout=5,
+                socket_timeout=5
+            )
+            self._join = self.redis_client.register_script(JOIN_SCRIPT)
+            self._pair = self.redis_client.register_script(PAIR_SCRIPT)
+            self._requeue_players = self.redis_client.register_script(REQUEUE_SCRIPT)
+        except Exception as e:
+            logger.error(f"Matchmaking queue is local only, Redis unavailable: {e}")
+            self.enabled = False
+
+    @property
+    def _keys(self):
+        return [self.QUEUE_KEY, self.JOINED_KEY]
+
+    def join(self, player_id: int, rating: int) -> Optional[int]:
+        """Queue a player; returns the queue depth, None if they were already waiting"""
+        depth = None
+        if self.enabled and player_id not in self.local_queue:
+            try:
+                depth = self._join(keys=self._keys, args=[player_id, rating])
+                self.redis_client.delete(self.MATCH_KEY.format(player=player_id))
+            except Exception as e:
+                logger.error(f"Player {player_id} waits in this process, Redis unavailable: {e}")
+        if depth is None:
+            with self._lock:
+                depth = -1 if player_id in self.local_queue else len(self.local_queue) + 1
+                if depth > 0:
+                    self.local_queue[player_id] = (rating, time.time())
+                self.local_matches.pop(player_id, None)
+        if depth < 0:
+            return None
+        QUEUE_DEPTH.set(depth)
+        self._start_worker()
+        return depth
+
+    def leave(self, player_id: int) -> bool:
+        """Take a player out of the queue; False if they were not waiting"""
+        removed, depth = False, 0
+        if self.enabled:
+            try:
+                pipe = self.redis_client.pipeline()
+                pipe.zrem(self.QUEUE_KEY, player_id)
+                pipe.hdel(self.JOINED_KEY, player_id)
+                pipe.zcard(self.QUEUE_KEY)
+                removed, _, depth = pipe.execute()
+            except Exception as e:
+                logger.error(f"Failed to take player {player_id} out of the queue: {e}")
+                depth = None
+        with self._lock:
+            removed = self.local_queue.pop(player_id, None) is not None or bool(removed)
+            if depth is not None:
+                QUEUE_DEPTH.set(depth + len(self.local_queue))
+        return removed
+
+    def status(self, player_id: int) -> Dict[str, Optional[int]]:
+        """Whether a player is waiting, for how many seconds, and the game they were matched into"""
+        joined = game_id = None
+        if self.enabled:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.hget(self.JOINED_KEY, player_id)
+                pipe.get(self.MATCH_KEY.format(player=player_id))
+                pipe.time()
+                joined, game_id, (seconds, micros) = pipe.execute()
+                now = seconds + micros / 1e6
+                joined = int(joined) / 1000 if joined is not None else None
+            except Exception as e:
+                logger.error(f"Matchmaking status of player {player_id} read from this process, Redis unavailable: {e}")
+            # The player may have joined before this process (re)started: pair them here too
+            if joined is not None:
+                self._start_worker()
+        entry = self.local_queue.get(player_id)
+        if joined is None and entry:
+            now, joined = time.time(), entry[1]
+        if game_id is None:
+            game_id = self.local_matches.get(player_id)
+        return {
+            'queued': joined is not None,
+            'waiting_seconds': int(now - joined) if joined is not None else None,
+            'game_id': int(game_id) if game_id is not None else None,
+        }
+
+    def match(self) -> int:
+        """
+        Run one pairing pass and create its games; returns the players still
+        waiting, -1 if the Redis queue could not be paired.
+        """
+        matches, ratings, depth = [], {}, 0
+        if self.enabled:
+            try:
+                depth, flat = self._pair(keys=self._keys, args=[self.BASE_WINDOW, self.WINDOW_GROWTH, self.MAX_WINDOW, self.MAX_PAIRS])
+            except Exception as e:
+                logger.error(f"Matchmaking pass failed on the Redis queue: {e}")
+                depth, flat = None, []
+            for i in range(0, len(flat), 6):
+                player_1, player_2 = int(flat[i]), int(flat[i + 1])
+                matches.append((player_1, player_2, flat[i + 2] / 1000, flat[i + 3] / 1000))
+                ratings[player_1], ratings[player_2] = flat[i + 4], flat[i + 5]
+
+        # The whole queue without Redis, the players who joined while it was unreachable with it
+        with self._lock:
+            if self.local_queue:
+                now = time.time()
+                paired = pair_waiting(
+                    [(player, rating, now - joined) for player, (rating, joined) in self.local_queue.items()],
+                    self.BASE_WINDOW, self.WINDOW_GROWTH, self.MAX_WINDOW, self.MAX_PAIRS
+                )
+                for player_1, player_2, _, _ in paired:
+                    ratings[player_1] = self.local_queue.pop(player_1)[0]
+                    ratings[player_2] = self.local_queue.pop(player_2)[0]
+                matches += paired
+            waiting = len(self.local_queue)
+
+        requeued = self._create_games(matches, ratings) if matches else 0
+        if depth is None:
+            return -1
+        depth += waiting + requeued
+        QUEUE_DEPTH.set(depth)
+        return depth
+
+    def _create_games(self, matches: List[Tuple[int, int, float, float]], ratings: Dict[int, int]) -> int:
+        """
+        Create the games of a pairing pass in one INSERT and announce them;
+        returns how many players were put back in the queue.
+        """
+        from .models import Game, UserProfile
+        from .signals import notify_game_created
+
+        profiles = UserProfile.objects.in_bulk({player for player_1, player_2, _, _ in matches for player in (player_1, player_2)})
+        pairings, requeued = [], []
+        for player_1, player_2, wait_1, wait_2 in matches:
+            if player_1 in profiles and player_2 in profiles:
+                pairings.append((player_1, player_2, wait_1, wait_2))
+            else:
+                requeued += [(player, wait) for player, wait in ((player_1, wait_1), (player_2, wait_2)) if player in profiles]
+        if len(pairings) < len(matches):
+            logger.warning(f"Dropped the unknown players of {len(matches) - len(pairings)} quick play matches")
+
+        try:
+            # bulk_create skips post_save: the games are announced below instead
+            games = Game.objects.bulk_create([
+                Game(player_1=profiles[player_1], player_2=profiles[player_2], status='pending')
+                for player_1, player_2, _, _ in pairings
+            ])
+        except Exception as e:
+            logger.error(f"Failed to create {len(pairings)} quick play games, their players wait again: {e}")
+            for player_1, player_2, wait_1, wait_2 in pairings:
+                requeued += [(player_1, wait_1), (player_2, wait_2)]
+            pairings, games = [], []
+        self._requeue(requeued, ratings)
+
+        matched_here = not self.enabled
+        if self.enabled and games:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for game in games:
+                    for player in (game.player_1_id, game.player_2_id):
+                        pipe.set(self.MATCH_KEY.format(player=player), game.id, ex=self.MATCH_TTL)
+                pipe.execute()
+            except Exception as e:
+                logger.error(f"Matched games are only readable from this process, Redis unavailable: {e}")
+                matched_here = True
+        if matched_here:
+            for game in games:
+                self.local_matches[game.player_1_id] = self.local_matches[game.player_2_id] = game.id
+
+        for game in games:
+            notify_game_created(game)
+
+        if pairings:
+            for _, _, wait_1, wait_2 in pairings:
+                for wait in (wait_1, wait_2):
+                    TIME_TO_MATCH.observe(wait)
+                    self.recent_waits.append(wait)
+            MEDIAN_TIME_TO_MATCH.set(statistics.median(self.recent_waits))
+        logger.info(f"Matched {len(games)} quick play games")
+        return len(requeued)
+
+    def _requeue(self, waiting: List[Tuple[int, float]], ratings: Dict[int, int]):
+        """Put paired (player id, seconds waited) back in the queue, keeping their wait"""
+        if not waiting:
+            return
+        if self.enabled:
+            try:
+                args = [value for player, wait in waiting for value in (player, ratings[player], int(wait * 1000))]
+                self._requeue_players(keys=self._keys, args=args)
+                return
+            except Exception as e:
+                logger.error(f"{len(waiting)} players wait again in this process, Redis unavailable: {e}")
+        now = time.time()
+        with self._lock:
+            for player, wait in waiting:
+                self.local_queue.setdefault(player, (ratings[player], now - wait))
+
+    def resume(self):
+        """Pair the players left waiting in Redis, e.g. by the pods of a previous deploy"""
+        if not self.enabled:
+            return
+        try:
+            depth = self.redis_client.zcard(self.QUEUE_KEY)
+        except Exception as e:
+            logger.error(f"Cannot resume matchmaking, Redis unavailable: {e}")
+            return
+        QUEUE_DEPTH.set(depth)
+        if depth:
+            self._start_worker()
+
+    def _start_worker(self):
+        with self._lock:
+            self._joins += 1
+            if self.worker and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='pong-matchmaking', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """Pair the queue every MATCH_INTERVAL until it is empty"""
+        while True:
+            joins = self._joins
+            try:
+                close_old_connections()
+                depth = self.match()
+            except Exception as e:
+                logger.error(f"Matchmaking pass failed: {e}")
+                depth = -1
+            with self._lock:
+                # A join since this pass started may not be counted in its depth
+                if depth == 0 and joins == self._joins:
+                    self._thread = None
+                    close_old_connections()
+                    return
+            time.sleep(self.MATCH_INTERVAL)
+
+
+# Global matchmaker
+matchmaker = Matchmaker()
@@ -18,6 +18,13 @@ class Tournament(models.Model):
 		('completed', 'Completed')
 	], max_length=10, default='pending')
 
+	class Meta:
+		# Tournament lists: newest first, optionally by status (see manage.py audit_queries)
+		indexes = [
+			models.Index(fields=['-begin_date'], name='tournament_recent_idx'),
+			models.Index(fields=['status', '-begin_date'], name='tournament_status_recent_idx'),
+		]
+
 	@property
 	def is_finished(self):
 			"""Check if tournament is finished (completed status)"""
@@ -36,17 +43,28 @@ class UserProfile(models.Model):
 
 class Game(models.Model):
 	id = models.AutoField(primary_key=True)
-	player_1 = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='player_1', null=True)
-	player_2 = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='player_2', null=True)
+	player_1 = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='player_1', null=True, db_index=False)
+	player_2 = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='player_2', null=True, db_index=False)
 	player_1_score = models.IntegerField(default=0)
 	player_2_score = models.IntegerField(default=0)
 	begin_date = models.DateTimeField(auto_now_add=True)
-	tournament_id = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='game', null=True)
+	tournament_id = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='game', null=True, db_index=False)
 	status = models.CharField(choices=[
 			('pending', 'Pending'),
 			('active', 'Active'),
 			('completed', 'Completed')
 	], max_length=10, default='pending')
+	replay_path = models.CharField(max_length=255, null=True, blank=True)
+
+	class Meta:
+		# A player's games, newest first: one index per side of the player_1 | player_2
+		# filter, ordered like the history cursor (see manage.py audit_queries).
+		# They lead with the foreign keys, which need no index of their own.
+		indexes = [
+			models.Index(fields=['player_1', '-begin_date', '-id'], name='game_player_1_recent_idx'),
+			models.Index(fields=['player_2', '-begin_date', '-id'], name='game_player_2_recent_idx'),
+			models.Index(fields=['tournament_id', '-begin_date'], name='game_tournament_recent_idx'),
+		]
 
 	@property
 	def winner(self):
@@ -89,3 +107,24 @@ class Game(models.Model):
 	def is_active(self):
 		"""Check if game is currently active"""
 		return self.status == 'active'
+
+class PlayerStats(models.Model):
+	"""Per-player totals, updated as games and tournaments end (see player_stats.py)"""
+	player = models.OneToOneField(UserProfile, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+	total_games = models.IntegerField(default=0)
+	wins = models.IntegerField(default=0)
+	losses = models.IntegerField(default=0)
+	current_streak = models.IntegerField(default=0)	# n wins in a row if positive, -n losses if negative
+	best_streak = models.IntegerField(default=0)
+	total_tournaments = models.IntegerField(default=0)
+	tournament_wins = models.IntegerField(default=0)
+	rating = models.IntegerField(default=1000)	# Elo, see leaderboard.py
+
+	class Meta:
+		# Leaderboard pages when Redis is unavailable
+		indexes = [models.Index(fields=['-rating'], name='playerstats_rating_idx')]
+
+	@property
+	def win_rate(self):
+		"""Percentage of games won"""
+		return round(self.wins / self.total_games * 100, 2) if self.total_games else 0
@@ -26,6 +26,13 @@ class PhysicsManager:
             return LegacyPhysicsEngine(**kwargs)
         elif engine_type == "modern":
             return ModernPhysicsEngine(**kwargs)
+        elif engine_type == "ccd":
+            # Modern engine with swept sub-steps for balls faster than a paddle is wide
+            return ModernPhysicsEngine(ccd=True, **kwargs)
+        elif engine_type == "vectorized":
+            # numpy is only required when this engine is selected
+            from physics_engines.vectorized_physics import get_shared_batch
+            return get_shared_batch().allocate(**kwargs)
         else:
             raise ValueError(f"Unknown engine type: {engine_type}")
     
@@ -44,6 +51,7 @@ class PhysicsManager:
             
             # Create new engine
             old_engine = self.engine
+            self.release()
             self.engine = self._create_engine(new_type,
                 ring_length=old_engine.ring_length,
                 ring_height=old_engine.ring_height,
@@ -63,6 +71,7 @@ class PhysicsManager:
                 self.engine.ball_velocity.x = ball_speed * math.cos(math.radians(angle))
                 self.engine.ball_velocity.y = ball_speed * math.sin(math.radians(angle))
         else:
+            self.release()
             self.engine = self._create_engine(new_type)
         
         self.engine_type = new_type
@@ -72,6 +81,16 @@ class PhysicsManager:
         """Execute physics step with current engine"""
         return self.engine.physics_step(*args, **kwargs)
     
+    @property
+    def batch(self):
+        """Shared batch of the vectorized engine, None for per-match engines"""
+        return getattr(self.engine, 'batch', None)
+
+    def release(self):
+        """Free engine resources held outside this match (batch rows)"""
+        if hasattr(self.engine, 'release'):
+            self.engine.release()
+    
     def get_ball_position(self):
         """Get ball position (unified interface)"""
         if self.engine_type == "legacy":
@@ -79,6 +98,12 @@ class PhysicsManager:
         else:
             return [self.engine.ball_pos.x, self.engine.ball_pos.y]
     
+    def restore_ball(self, angle, ball_speed, wall_hit_pos=0):
+        """Set the ball direction and speed, e.g. when resuming a checkpoint"""
+        self.engine.angle = angle
+        self.engine.ball_speed = ball_speed
+        self.engine.wall_hit_pos = wall_hit_pos
+
     def get_engine_stats(self):
         """Get engine-specific statistics"""
         stats = {
@@ -0,0 +1,104 @@
+"""
+Incremental player statistics
+
+PlayerStats rows are updated in place when a game or a tournament ends, so
+reading a profile's statistics is one primary key lookup instead of an
+aggregate over every game the player took part in. Every update is a single
+UPDATE with F() expressions, safe against concurrent game ends. Games also move
+the players' Elo ratings, mirrored in the Redis leaderboards (leaderboard.py).
+
+rebuild() recomputes all rows from the games and tournaments in the database
+(manage.py rebuild_player_stats), for deployments that predate the table,
+and reloads the global leaderboard.
+"""
+
+import logging
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+
+from .leaderboard import elo_delta, leaderboard
+from .models import Game, PlayerStats, Tournament, UserProfile
+
+logger = logging.getLogger('pong_app')
+
+# Streak after a win / a loss, from the streak before it
+WIN_STREAK = Case(When(current_streak__gt=0, then=F('current_streak') + 1), default=Value(1))
+LOSS_STREAK = Case(When(current_streak__lt=0, then=F('current_streak') - 1), default=Value(-1))
+
+
+def _ensure_rows(player_ids):
+	PlayerStats.objects.bulk_create([PlayerStats(player_id=player_id) for player_id in player_ids], ignore_conflicts=True)
+
+
+def record_game(winner_id, loser_id):
+	"""Count a finished game for both players and move their ratings"""
+	_ensure_rows([winner_id, loser_id])
+	ratings = dict(PlayerStats.objects.filter(player_id__in=[winner_id, loser_id]).values_list('player_id', 'rating'))
+	# Points change hands as increments: concurrent games of a player still add up
+	delta = elo_delta(ratings[winner_id], ratings[loser_id])
+	PlayerStats.objects.filter(player_id=winner_id).update(
+		total_games=F('total_games') + 1,
+		wins=F('wins') + 1,
+		current_streak=WIN_STREAK,
+		best_streak=Greatest('best_streak', WIN_STREAK),
+		rating=F('rating') + delta,
+	)
+	PlayerStats.objects.filter(player_id=loser_id).update(
+		total_games=F('total_games') + 1,
+		losses=F('losses') + 1,
+		current_streak=LOSS_STREAK,
+		rating=F('rating') - delta,
+	)
+	ratings = dict(PlayerStats.objects.filter(player_id__in=[winner_id, loser_id]).values_list('player_id', 'rating'))
+	leaderboard.record(ratings, winner_id, loser_id, delta)
+
+
+def record_tournament(tournament_id, winner_id):
+	"""Count a completed tournament for its players and its winner"""
+	player_ids = list(UserProfile.objects.filter(tournaments=tournament_id).values_list('user_id', flat=True))
+	_ensure_rows(player_ids)
+	PlayerStats.objects.filter(player_id__in=player_ids).update(total_tournaments=F('total_tournaments') + 1)
+	if winner_id:
+		PlayerStats.objects.filter(player_id=winner_id).update(tournament_wins=F('tournament_wins') + 1)
+
+
+def rebuild():
+	"""Recompute every player's statistics from scratch; returns the number of rows written"""
+	stats = {}
+
+	def row(player_id):
+		if player_id not in stats:
+			stats[player_id] = PlayerStats(player_id=player_id)
+		return stats[player_id]
+
+	games = (Game.objects.filter(status='completed', player_1__isnull=False, player_2__isnull=False)
+			.order_by('begin_date', 'id')
+			.values_list('player_1_id', 'player_2_id', 'player_1_score', 'player_2_score'))
+	for player_1, player_2, score_1, score_2 in games.iterator(chunk_size=2000):
+		# Same rule as GameState.game_end: player 2 unless player 1 scored more
+		winner, loser = (row(player_1), row(player_2)) if score_1 > score_2 else (row(player_2), row(player_1))
+		delta = elo_delta(winner.rating, loser.rating)
+		winner.rating += delta
+		loser.rating -= delta
+		winner.total_games += 1
+		winner.wins += 1
+		winner.current_streak = winner.current_streak + 1 if winner.current_streak > 0 else 1
+		winner.best_streak = max(winner.best_streak, winner.current_streak)
+		loser.total_games += 1
+		loser.losses += 1
+		loser.current_streak = loser.current_streak - 1 if loser.current_streak < 0 else -1
+
+	completed = Tournament.objects.filter(status='completed')
+	for player_id in UserProfile.objects.filter(tournaments__in=completed).values_list('user_id', flat=True).iterator():
+		row(player_id).total_tournaments += 1
+	for winner_id in completed.filter(winner__isnull=False).values_list('winner_id', flat=True).iterator():
+		row(winner_id).tournament_wins += 1
+
+	with transaction.atomic():
+		PlayerStats.objects.all().delete()
+		PlayerStats.objects.bulk_create(stats.values(), batch_size=1000)
+	leaderboard.reload({player_id: player.rating for player_id, player in stats.items()})
+	logger.info(f"Rebuilt statistics of {len(stats)} players")
+	return len(stats)
@@ -0,0 +1,184 @@
+"""
+Redis presence index of pong WebSocket sessions
+
+Tells whether players have a live game or tournament socket on any pod:
+
+    presence:players       ZSET player id -> last heartbeat (Redis server time, ms)
+    presence:connections   HASH player id -> open sockets across pods
+
+Consumers register their socket on connect and drop it on disconnect; every
+process refreshes the heartbeat of all its connected players with one ZADD
+per HEARTBEAT_INTERVAL. A player is online while their heartbeat is younger
+than PRESENCE_TIMEOUT_MS, so the sockets of a crashed pod go stale on their
+own. online() answers for a whole round of players in one call.
+
+Without Redis (or with PONG_PRESENCE off) only this process's sockets count,
+as with a single process.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Iterable
+
+import redis.asyncio as redis
+from django.conf import settings
+
+logger = logging.getLogger('pong_app')
+
+SERVER_TIME = """
+local time = redis.call('time')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+"""
+
+# KEYS: players, connections  ARGV: player id
+CONNECT_SCRIPT = SERVER_TIME + """
+redis.call('hincrby', KEYS[2], ARGV[1], 1)
+redis.call('zadd', KEYS[1], now, ARGV[1])
+return 1
+"""
+
+# KEYS: players, connections  ARGV: player id
+DISCONNECT_SCRIPT = """
+if redis.call('hincrby', KEYS[2], ARGV[1], -1) > 0 then
+    return 0
+end
+redis.call('hdel', KEYS[2], ARGV[1])
+redis.call('zrem', KEYS[1], ARGV[1])
+return 1
+"""
+
+# KEYS: players, connections  ARGV: forget after ms, player id, ...
+# Refreshes our players and forgets the ones nobody refreshed for a long time
+HEARTBEAT_SCRIPT = SERVER_TIME + """
+for i = 2, #ARGV do
+    redis.call('zadd', KEYS[1], now, ARGV[i])
+end
+local stale = redis.call('zrangebyscore', KEYS[1], '-inf', now - tonumber(ARGV[1]))
+if #stale > 0 then
+    redis.call('zrem', KEYS[1], unpack(stale))
+    redis.call('hdel', KEYS[2], unpack(stale))
+end
+return #stale
+"""
+
+# KEYS: players  ARGV: presence timeout ms, player id, ...
+# Returns 1 per player seen within the timeout, 0 otherwise
+ONLINE_SCRIPT = SERVER_TIME + """
+local online = {}
+for i = 2, #ARGV do
+    local seen = redis.call('zscore', KEYS[1], ARGV[i])
+    if seen and now - tonumber(seen) <= tonumber(ARGV[1]) then
+        online[i - 1] = 1
+    else
+        online[i - 1] = 0
+    end
+end
+return online
+"""
+
+
+class PresenceIndex:
+    """
+    Open pong sockets per player. `local_sessions` counts this process's
+    sockets; Redis aggregates every process.
+    """
+
+    def __init__(self):
+        self.enabled = getattr(settings, 'PONG_PRESENCE', True)
+        self.redis_client = None
+        self.local_sessions: Dict[int, int] = {}  # player id -> sockets open here
+        self._heartbeat = None
+
+        # Redis keys
+        self.PLAYERS_KEY = "presence:players"
+        self.CONNECTIONS_KEY = "presence:connections"
+
+        # Timing
+        self.HEARTBEAT_INTERVAL = 5  # seconds
+        self.PRESENCE_TIMEOUT_MS = 15000  # three missed heartbeats
+        self.FORGET_AFTER_MS = 600000  # drop long dead entries (crashed pods)
+
+        if self.enabled:
+            self._init_redis()
+
+    def _init_redis(self):
+        """Initialize Redis connection and scripts"""
+        try:
+            self.redis_client = redis.Redis(
+                host=getattr(settings, 'REDIS_HOST', 'localhost'),
+                port=int(getattr(settings, 'REDIS_PORT', '6379')),
+                db=int(getattr(settings, 'REDIS_CACHE_DB', '1')),
+                decode_responses=True,
+                socket_connect_timeout=5,
+                socket_timeout=5
+            )
+            self._connect = self.redis_client.register_script(CONNECT_SCRIPT)
+            self._disconnect = self.redis_client.register_script(DISCONNECT_SCRIPT)
+            self._refresh = self.redis_client.register_script(HEARTBEAT_SCRIPT)
+            self._online = self.redis_client.register_script(ONLINE_SCRIPT)
+        except Exception as e:
+            logger.error(f"Presence index is local only, Redis unavailable: {e}")
+            self.enabled = False
+
+    @property
+    def _keys(self):
+        return [self.PLAYERS_KEY, self.CONNECTIONS_KEY]
+
+    async def connect(self, player_id: int):
+        """A pong socket of player_id opened in this process"""
+        self.local_sessions[player_id] = self.local_sessions.get(player_id, 0) + 1
+        if not self.enabled:
+            return
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        try:
+            await self._connect(keys=self._keys, args=[player_id])
+        except Exception as e:
+            logger.error(f"Failed to register presence of player {player_id}: {e}")
+
+    async def disconnect(self, player_id: int):
+        """A pong socket of player_id closed"""
+        count = self.local_sessions.get(player_id, 0) - 1
+        if count > 0:
+            self.local_sessions[player_id] = count
+        else:
+            self.local_sessions.pop(player_id, None)
+        if not self.enabled:
+            return
+        try:
+            await self._disconnect(keys=self._keys, args=[player_id])
+        except Exception as e:
+            logger.error(f"Failed to drop presence of player {player_id}: {e}")
+
+    async def online(self, player_ids: Iterable[int]) -> Dict[int, bool]:
+        """Whether each player has a live pong socket anywhere, in one call"""
+        player_ids = list(dict.fromkeys(player_ids))
+        if not player_ids:
+            return {}
+        if self.enabled:
+            try:
+                flags = await self._online(keys=[self.PLAYERS_KEY], args=[self.PRESENCE_TIMEOUT_MS, *player_ids])
+                return {player_id: bool(flag) for player_id, flag in zip(player_ids, flags)}
+            except Exception as e:
+                logger.error(f"Presence lookup failed, using local sessions: {e}")
+        return {player_id: player_id in self.local_sessions for player_id in player_ids}
+
+    async def _heartbeat_loop(self):
+        """Refresh every locally connected player, for the life of the process"""
+        while True:
+            try:
+                await self.heartbeat()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Presence heartbeat failed: {e}")
+            await asyncio.sleep(self.HEARTBEAT_INTERVAL)
+
+    async def heartbeat(self):
+        forgotten = await self._refresh(keys=self._keys, args=[self.FORGET_AFTER_MS, *self.local_sessions])
+        if forgotten:
+            logger.info(f"Forgot {forgotten} stale presence entries")
+
+
+# Global presence index
+presence = PresenceIndex()
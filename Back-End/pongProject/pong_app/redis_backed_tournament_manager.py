@@ -6,31 +6,71 @@ system that maintains the same external API while supporting multi-process envir
 """
 
 import asyncio
+import json
 import logging
-import random
+import os
+import socket
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from channels.db import database_sync_to_async
 from channels.layers import get_channel_layer
+from prometheus_client import Counter, Gauge
 
-from .redis_tournament_manager import redis_tournament_manager, RedisTournamentState
+from .redis_tournament_manager import redis_tournament_manager, RedisTournamentState, TournamentSnapshot, EVENTS_CHANNEL
+from .presence import presence
 
 logger = logging.getLogger('pong_app')
 
+COORDINATED_TOURNAMENTS = Gauge('pong_tournaments_coordinated', 'Tournaments coordinated by this process')
+TOURNAMENT_COORDINATOR = Gauge(
+    'pong_tournament_coordinator_token',
+    'Fencing token of the coordinator lease held by this process',
+    ['tournament_id', 'coordinator']
+)
+COORDINATOR_TAKEOVERS = Counter('pong_tournament_coordinator_takeovers_total', 'Orphaned tournaments taken over after their coordinator lease expired')
+COORDINATOR_LEASES_LOST = Counter('pong_tournament_coordinator_leases_lost_total', 'Coordinator leases that expired or were taken before renewal')
+
 
 class RedisBackedTournamentManager:
     """
     Tournament manager that uses Redis for state storage while maintaining
-    the same external API as the original TournamentManager
+    the same external API as the original TournamentManager.
+
+    Progression is event driven: the tournament scripts publish every state
+    transition on EVENTS_CHANNEL and one listener task per process reacts to
+    the events of the tournaments it coordinates (`managed`). There is no
+    per-tournament polling; the only timer is the round watcher, which
+    forfeits absent players (see pong_app.presence) and ends the round at
+    ROUND_TIMEOUT.
+
+    Exactly one process coordinates a tournament: the one holding its
+    coordinator lease in Redis (see the COORDINATOR_* scripts). The first pod
+    touching a tournament claims it; every pod renews its leases each
+    heartbeat and claims the active tournaments whose lease expired, so a
+    dead pod's tournaments fail over within LEASE_MS. Round starts and timeout
+    resolutions carry the lease as a fencing token.
     """
     
+    ROUND_TIMEOUT = 300  # seconds before an unfinished round is resolved
+    FORFEIT_GRACE = 30  # seconds for players to reach their game before absence counts
+    FORFEIT_CHECK_INTERVAL = 5  # seconds between presence checks of a round
+    ROUND_BREAK = 3  # seconds between round end and next round, for clients
+    ROUND_RETRY = 10  # seconds before starting again a round whose games could not be created
+    LEASE_MS = 10000  # coordinator lease
+    HEARTBEAT_INTERVAL = 3  # seconds, well within the lease
+    
     def __init__(self):
         self.redis_manager = redis_tournament_manager
-        self.tournament_tasks: Dict[int, asyncio.Task] = {}  # Keep tasks in memory per process
+        self.managed: Dict[int, 'RedisBackedTournamentState'] = {}  # Tournaments coordinated by this process
+        self.leases: Dict[int, str] = {}  # tournament_id -> our coordinator lease "<owner id>|<token>"
+        self.round_timers: Dict[int, asyncio.Task] = {}
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._listener: Optional[asyncio.Task] = None
+        self._heartbeat: Optional[asyncio.Task] = None
         self.channel_layer = get_channel_layer()
     
     async def create_tournament(self, tournament_id: int, name: str, max_players: int, creator_id: int) -> 'RedisBackedTournamentState':
-        """Create a new tournament and start its management task"""
+        """Create a new tournament and start coordinating it"""
         # Create tournament in Redis
         redis_state = await self.redis_manager.create_tournament(
             tournament_id, name, max_players, creator_id
@@ -38,12 +78,9 @@ class RedisBackedTournamentManager:
         
         # Create wrapper that maintains original API
         tournament = RedisBackedTournamentState(redis_state, self)
+        await self.manage(tournament)
         
-        # Start the tournament management task
-        task = asyncio.create_task(self._manage_tournament(tournament))
-        self.tournament_tasks[tournament_id] = task
-        
-        logger.info(f"Tournament {tournament_id} created in Redis and management task started")
+        logger.info(f"Tournament {tournament_id} created in Redis")
         return tournament
     
     async def get_tournament(self, tournament_id: int) -> Optional['RedisBackedTournamentState']:
@@ -55,78 +92,243 @@ class RedisBackedTournamentManager:
         
         tournament = RedisBackedTournamentState(redis_state, self)
         
-        # Start management task if tournament is active and not already managed
-        if (tournament_id not in self.tournament_tasks and 
+        # Coordinate the tournament if it is active and nobody does yet
+        if (tournament_id not in self.managed and 
             await tournament.get_status() == 'active' and 
             not await tournament.get_is_complete()):
-            task = asyncio.create_task(self._manage_tournament(tournament))
-            self.tournament_tasks[tournament_id] = task
-            logger.info(f"Started management task for existing tournament {tournament_id}")
+            await self.manage(tournament)
         
         return tournament
     
     async def remove_tournament(self, tournament_id: int):
-        """Remove tournament and cancel its management task"""
-        # Cancel local management task
-        if tournament_id in self.tournament_tasks:
-            self.tournament_tasks[tournament_id].cancel()
-            del self.tournament_tasks[tournament_id]
+        """Remove tournament and stop coordinating it"""
+        await self.unmanage(tournament_id)
         
         # Remove from Redis
         await self.redis_manager.remove_tournament(tournament_id)
         
-        logger.info(f"Tournament {tournament_id} removed and task cancelled")
+        logger.info(f"Tournament {tournament_id} removed")
     
-    async def _manage_tournament(self, tournament: 'RedisBackedTournamentState'):
-        """Main tournament management loop"""
-        try:
-            tournament_id = await tournament.get_tournament_id()
-            logger.info(f"Starting tournament management for {tournament_id}")
-            
-            # Wait for tournament to be initialized (brackets created)
-            while not await tournament.get_initialized():
-                logger.info(f"Tournament {tournament_id} waiting for initialization...")
+    async def manage(self, tournament: 'RedisBackedTournamentState') -> bool:
+        """Coordinate a tournament from this process unless another process does"""
+        tournament_id = tournament.tournament_id
+        self._ensure_heartbeat()
+        if tournament_id in self.managed:
+            return True
+        
+        claimed, lease = await self.redis_manager.claim_coordinator(tournament_id, self.owner_id, self.LEASE_MS)
+        if not claimed:
+            if lease is not None:
+                logger.debug(f"Tournament {tournament_id} is coordinated by {lease}")
+            return False
+        
+        self.leases[tournament_id] = lease
+        self.managed[tournament_id] = tournament
+        TOURNAMENT_COORDINATOR.labels(tournament_id=str(tournament_id), coordinator=self.owner_id).set(int(lease.rsplit('|', 1)[1]))
+        COORDINATED_TOURNAMENTS.set(len(self.managed))
+        logger.info(f"Coordinating tournament {tournament_id} with fencing token {lease.rsplit('|', 1)[1]}")
+        
+        if self._listener is None or self._listener.done():
+            # A fresh listener reconciles every managed tournament once subscribed
+            self._listener = asyncio.create_task(self._listen())
+        else:
+            asyncio.create_task(self._reconcile(tournament))
+        return True
+    
+    async def unmanage(self, tournament_id: int):
+        """Stop coordinating a tournament and hand its lease back"""
+        lease = self._drop(tournament_id)
+        if lease is not None:
+            await self.redis_manager.release_coordinator(tournament_id, lease)
+    
+    def _drop(self, tournament_id: int) -> Optional[str]:
+        """Forget a tournament locally, returns the lease we held"""
+        self.managed.pop(tournament_id, None)
+        self._cancel_round_timer(tournament_id)
+        lease = self.leases.pop(tournament_id, None)
+        if lease is not None:
+            try:
+                TOURNAMENT_COORDINATOR.remove(str(tournament_id), self.owner_id)
+            except KeyError:
+                pass
+        COORDINATED_TOURNAMENTS.set(len(self.managed))
+        return lease
+    
+    def lease_of(self, tournament_id: int) -> Optional[str]:
+        """Our coordinator lease of a tournament, None if another process coordinates it"""
+        return self.leases.get(tournament_id)
+    
+    def _ensure_heartbeat(self):
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+    
+    async def _heartbeat_loop(self):
+        """Renew our leases and adopt orphaned tournaments, for the life of the process"""
+        while True:
+            try:
+                await self._renew_leases()
+                await self._take_over_orphans()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Tournament coordinator heartbeat failed: {e}")
+            await asyncio.sleep(self.HEARTBEAT_INTERVAL)
+    
+    async def _renew_leases(self):
+        if not self.leases:
+            return
+        leases = dict(self.leases)
+        renewed = await self.redis_manager.renew_coordinators(leases, self.LEASE_MS)
+        for tournament_id, lease in leases.items():
+            if tournament_id not in renewed and self.leases.get(tournament_id) == lease:
+                # E.g. after a long pause: another process may already coordinate it
+                logger.warning(f"Lost coordinator lease of tournament {tournament_id}, stopping coordination")
+                COORDINATOR_LEASES_LOST.inc()
+                self._drop(tournament_id)
+    
+    async def _take_over_orphans(self):
+        """Claim the active tournaments nobody coordinates (their coordinator died)"""
+        candidates = [tid for tid in await self.redis_manager.get_active_tournaments() if tid not in self.managed]
+        coordinators = await self.redis_manager.get_coordinators(candidates)
+        for tournament_id, holder in coordinators.items():
+            if holder is not None:
+                continue
+            state = RedisTournamentState(tournament_id, self.redis_manager)
+            if await self.manage(RedisBackedTournamentState(state, self)):
+                COORDINATOR_TAKEOVERS.inc()
+                logger.warning(f"Took over orphaned tournament {tournament_id}")
+    
+    async def _listen(self):
+        """Subscribe to tournament events and dispatch them, reconnecting on errors"""
+        while self.managed:
+            pubsub = self.redis_manager.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(EVENTS_CHANNEL)
+                logger.info(f"Listening for tournament events on {EVENTS_CHANNEL}")
+                # Catch up on transitions published while we were not subscribed
+                for tournament in list(self.managed.values()):
+                    asyncio.create_task(self._reconcile(tournament))
+                
+                while self.managed:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=30)
+                    if message is not None:
+                        self._dispatch(message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Tournament event listener error, resubscribing: {e}")
                 await asyncio.sleep(1)
-            
-            logger.info(f"Tournament {tournament_id} initialized, starting auto-round progression")
-            
-            # Auto-start rounds until tournament is complete
-            while not await tournament.get_is_complete():
-                if await tournament.can_start_next_round():
-                    logger.info(f"Tournament {tournament_id} can start next round, starting...")
-                    await tournament.start_round()
-                    
-                    # Wait for round to complete (with timeout)
-                    await self._wait_for_round_completion(tournament)
-                else:
-                    # Wait a bit before checking again
-                    logger.info(f"Tournament {tournament_id} cannot start next round yet, waiting...")
-                    await asyncio.sleep(2)
-            
-            logger.info(f"Tournament {tournament_id} completed!")
-            
-        except asyncio.CancelledError:
-            tournament_id = await tournament.get_tournament_id()
-            logger.info(f"Tournament {tournament_id} management cancelled")
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+        logger.info("Tournament event listener stopped, no tournaments to coordinate")
+    
+    def _dispatch(self, data: str):
+        try:
+            event = json.loads(data)
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring malformed tournament event: {data!r}")
+            return
+        tournament = self.managed.get(event.get('tournament_id'))
+        if tournament is None:
+            return
+        handler = self.EVENT_HANDLERS.get(event.get('event'))
+        if handler is not None:
+            # Handlers may wait (round break): never block the listener
+            asyncio.create_task(handler(self, tournament, event))
+    
+    async def _on_initialized(self, tournament: 'RedisBackedTournamentState', event: Dict[str, Any]):
+        logger.info(f"Tournament {tournament.tournament_id} initialized, starting first round")
+        # Same pause as between rounds, so clients see the start before round 1
+        await asyncio.sleep(self.ROUND_BREAK)
+        await tournament.start_round()
+    
+    async def _on_round_started(self, tournament: 'RedisBackedTournamentState', event: Dict[str, Any]):
+        self._arm_round_timer(tournament, event['round'])
+    
+    async def _on_round_aborted(self, tournament: 'RedisBackedTournamentState', event: Dict[str, Any]):
+        self._cancel_round_timer(tournament.tournament_id)
+        logger.warning(f"Round {event['round']} of tournament {tournament.tournament_id} aborted, "
+                       f"starting it again in {self.ROUND_RETRY}s")
+        await asyncio.sleep(self.ROUND_RETRY)
+        await tournament.start_round()
+    
+    async def _on_round_complete(self, tournament: 'RedisBackedTournamentState', event: Dict[str, Any]):
+        tournament_id = tournament.tournament_id
+        self._cancel_round_timer(tournament_id)
+        logger.info(f"Round {event['round']} completed in tournament {tournament_id}")
+        logger.info(f"Winners advancing to next round: {event['winners']}")
+        
+        await tournament._broadcast_round_end()
+        
+        # Give clients time to process the round end
+        await asyncio.sleep(self.ROUND_BREAK)
+        await tournament.start_round()
+    
+    async def _on_complete(self, tournament: 'RedisBackedTournamentState', event: Dict[str, Any]):
+        winner = event.get('winner') or None
+        logger.info(f"Tournament {tournament.tournament_id} completed! Winner: {winner}")
+        await self.unmanage(tournament.tournament_id)
+        
+        # Update database BEFORE broadcasting
+        await tournament._update_tournament_in_db()
+        await tournament._broadcast_tournament_complete(winner)
+    
+    EVENT_HANDLERS = {
+        'initialized': _on_initialized,
+        'round_started': _on_round_started,
+        'round_aborted': _on_round_aborted,
+        'round_complete': _on_round_complete,
+        'complete': _on_complete,
+    }
+    
+    async def _reconcile(self, tournament: 'RedisBackedTournamentState'):
+        """One-off state check for a tournament picked up without its events"""
+        try:
+            if not await tournament.get_initialized() or await tournament.get_is_complete():
+                return
+            if await tournament.get_is_round_active():
+                self._arm_round_timer(tournament, await tournament.get_current_round())
+            elif await tournament.can_start_next_round():
+                await tournament.start_round()
         except Exception as e:
-            tournament_id = await tournament.get_tournament_id()
-            logger.error(f"Error in tournament {tournament_id} management: {e}", exc_info=True)
-    
-    async def _wait_for_round_completion(self, tournament: 'RedisBackedTournamentState'):
-        """Wait for round to complete with timeout handling"""
-        round_timeout = 300  # 5 minutes per round
-        start_time = datetime.now()
-        
-        while (await tournament.get_is_round_active() and 
-               not await tournament.get_is_complete()):
-            # Check if round timeout exceeded
-            if datetime.now() - start_time > timedelta(seconds=round_timeout):
-                tournament_id = await tournament.get_tournament_id()
-                logger.warning(f"Round timeout in tournament {tournament_id}")
-                await tournament.handle_round_timeout()
-                break
-            
-            await asyncio.sleep(5)  # Check every 5 seconds
+            logger.error(f"Error reconciling tournament {tournament.tournament_id}: {e}", exc_info=True)
+    
+    def _arm_round_timer(self, tournament: 'RedisBackedTournamentState', round_number: int):
+        self._cancel_round_timer(tournament.tournament_id)
+        self.round_timers[tournament.tournament_id] = asyncio.create_task(
+            self._watch_round(tournament, round_number)
+        )
+    
+    def _cancel_round_timer(self, tournament_id: int):
+        timer = self.round_timers.pop(tournament_id, None)
+        if timer is not None:
+            timer.cancel()
+    
+    async def _watch_round(self, tournament: 'RedisBackedTournamentState', round_number: int):
+        """
+        Forfeit the games of absent players every FORFEIT_CHECK_INTERVAL once
+        FORFEIT_GRACE is over, and resolve whatever is left at ROUND_TIMEOUT.
+        The round_complete event of the last result cancels this task.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.ROUND_TIMEOUT
+        await asyncio.sleep(self.FORFEIT_GRACE)
+        while loop.time() < deadline:
+            if not (await tournament.get_current_round() == round_number and
+                    await tournament.get_is_round_active()):
+                return
+            await tournament.resolve_forfeits()
+            await asyncio.sleep(min(self.FORFEIT_CHECK_INTERVAL, max(deadline - loop.time(), 0)))
+        # Resolving the games completes the round: don't let that event cancel us
+        if self.round_timers.get(tournament.tournament_id) is asyncio.current_task():
+            del self.round_timers[tournament.tournament_id]
+        if (await tournament.get_current_round() == round_number and 
+            await tournament.get_is_round_active()):
+            logger.warning(f"Round {round_number} timeout in tournament {tournament.tournament_id}")
+            await tournament.handle_round_timeout()
 
 
 class RedisBackedTournamentState:
@@ -197,41 +399,24 @@ class RedisBackedTournamentState:
     async def get_winner(self) -> Optional[int]:
         return await self.redis_state.get_winner()
     
+    # Join outcomes of the JOIN script -> messages of the original API
+    JOIN_MESSAGES = {
+        'added': "Player added to the tournament",
+        'duplicate': "Player already in tournament",
+        'full': "Tournament is full",
+        'started': "Tournament has already started",
+        'missing': "Tournament not found",
+    }
+
     async def add_player(self, user_dict: Dict[str, Any]) -> str:
-        """Add player to tournament"""
+        """Add player to tournament (one atomic Redis call)"""
         player_id = user_dict['user_id']
+        outcome = await self.redis_state.join(player_id)
         
-        # Acquire lock for tournament modification
-        if not await self.redis_state.manager._acquire_lock(self.redis_state.tournament_id):
-            return "Tournament is currently being modified, try again"
-        
-        try:
-            if await self.get_initialized():
-                return "Tournament has already started"
-            
-            current_players = await self.get_nbr_player()
-            max_players = await self.redis_state.get_max_p()
-            
-            if current_players >= max_players:
-                return "Tournament is full"
-            
-            players = await self.get_players()
-            if player_id in players:
-                return "Player already in tournament"
-            
-            # Add player
-            players.append(player_id)
-            await self.redis_state._update_data({
-                'players': players,
-                'nbr_player': len(players)
-            })
-            
+        if outcome == 'added':
             tournament_id = await self.get_tournament_id()
-            logger.info(f"Player {player_id} added to tournament {tournament_id}. Players: {len(players)}/{max_players}")
-            return "Player added to the tournament"
-            
-        finally:
-            await self.redis_state.manager._release_lock(self.redis_state.tournament_id)
+            logger.info(f"Player {player_id} added to tournament {tournament_id}. Players: {await self.get_nbr_player()}/{await self.redis_state.get_max_p()}")
+        return self.JOIN_MESSAGES[outcome]
     
     async def load_players_from_db(self) -> bool:
         """Load players from database and sync with Redis state"""
@@ -266,77 +451,40 @@ class RedisBackedTournamentState:
             return False
     
     async def start(self) -> Dict[str, Any]:
-        """Initialize tournament brackets"""
-        # Acquire lock for tournament modification
-        if not await self.redis_state.manager._acquire_lock(self.redis_state.tournament_id):
-            return {'type': 'error', 'error': 'Tournament is currently being modified'}
+        """Initialize tournament brackets, seeded by the players' records"""
+        ratings = await self._player_ratings(await self.redis_state.get_players())
+        outcome = await self.redis_state.initialize(ratings)
+        if outcome == 'changed':
+            return {'type': 'error', 'error': 'Players are still joining, try again'}
+        if outcome == 'initialized':
+            return {'type': 'error', 'error': 'Tournament already initialized'}
+        if outcome == 'not_enough_players':
+            return {'type': 'error', 'error': 'Need at least 2 players to start tournament'}
+        if outcome == 'missing':
+            return {'type': 'error', 'error': 'Tournament not found'}
         
-        try:
-            if await self.get_initialized():
-                return {'type': 'error', 'error': 'Tournament already initialized'}
-            
-            nbr_players = await self.get_nbr_player()
-            if nbr_players < 2:
-                return {'type': 'error', 'error': 'Need at least 2 players to start tournament'}
-            
-            # Initialize tournament
-            players = await self.get_players()
-            
-            updates = {
-                'initialized': True,
-                'status': 'active',
-                'current_round': 0,
-                'partecipants': players.copy()
-            }
-            
-            await self.redis_state._update_data(updates)
-            
-            # Initialize next round and brackets
-            await self.redis_state.clear_next_round()
-            for player_id in players:
-                await self.redis_state.add_next_round_player(player_id)
-            
-            await self.redis_state.set_bracket_round(0, players.copy())
-            
-            tournament_id = await self.get_tournament_id()
-            logger.info(f"Tournament {tournament_id} initialized with {nbr_players} players letsgoski")
-            
-            # Update tournament status in database
-            asyncio.create_task(self._update_tournament_status_in_db('active'))
-            
-            # Ensure management task is started for auto-round progression
-            await self._ensure_management_task()
-            
-            return {'type': 'success', 'success': 'Tournament initialized successfully'}
-            
-        finally:
-            await self.redis_state.manager._release_lock(self.redis_state.tournament_id)
-    
-    async def _ensure_management_task(self):
-        """Ensure management task is running for this tournament"""
-        if not self.manager:
-            return
-            
         tournament_id = await self.get_tournament_id()
+        logger.info(f"Tournament {tournament_id} initialized with {await self.get_nbr_player()} players letsgoski")
         
-        # Check if task already exists and is not done
-        if tournament_id in self.manager.tournament_tasks:
-            task = self.manager.tournament_tasks[tournament_id]
-            if not task.done():
-                logger.info(f"Management task already running for tournament {tournament_id}")
-                return
-            else:
-                # Remove completed task
-                del self.manager.tournament_tasks[tournament_id]
-        
-        # Start new management task if tournament is active
-        if (await self.get_status() == 'active' and 
-            not await self.get_is_complete()):
-            task = asyncio.create_task(self.manager._manage_tournament(self))
-            self.manager.tournament_tasks[tournament_id] = task
-            logger.info(f"Started management task for tournament {tournament_id}")
-        else:
-            logger.info(f"Tournament {tournament_id} not ready for management task: status={await self.get_status()}, complete={await self.get_is_complete()}")
+        # Update tournament status in database
+        asyncio.create_task(self._update_tournament_status_in_db('active'))
+        
+        # Ensure management task is started for auto-round progression
+        await self._ensure_management_task()
+        
+        return {'type': 'success', 'success': 'Tournament initialized successfully'}
+    
+    @database_sync_to_async
+    def _player_ratings(self, players: List[int]) -> Dict[int, int]:
+        """Elo rating of each player, for seeding (players who never played are left out)"""
+        from .leaderboard import leaderboard
+        
+        return leaderboard.ratings(players)
+    
+    async def _ensure_management_task(self):
+        """Coordinate the tournament from this process unless another process does"""
+        if self.manager:
+            await self.manager.manage(self)
     
     
     async def can_start_next_round(self) -> bool:
@@ -367,7 +515,7 @@ class RedisBackedTournamentState:
                 'winner': next_round_players[0],
                 'is_complete': True,
                 'status': 'completed',
-                'completion_time': datetime.now().isoformat()
+                'completion_time': datetime.now()
             })
             # Update database immediately
             await self._update_tournament_in_db()
@@ -375,326 +523,201 @@ class RedisBackedTournamentState:
         
         return True
     
-    async def start_round(self) -> Dict[str, Any]:
-        """Start the next tournament round"""
-        # Acquire lock for round operations
-        if not await self.redis_state.manager._acquire_lock(self.redis_state.tournament_id):
-            return {'type': 'error', 'error': 'Tournament is currently being modified'}
-        
-        try:
-            if not await self.can_start_next_round():
-                return {'type': 'error', 'error': 'Cannot start round'}
-            
-            current_round = await self.get_current_round()
-            new_round = current_round + 1
-            
-            # Update round state
-            tournament_id = await self.get_tournament_id()
-            #logger.info(f"DEBUG: Starting round {new_round} for tournament {tournament_id}")
-            await self.redis_state._update_data({
-                'current_round': new_round,
-                'round_start_time': datetime.now().isoformat()
-            })
-            
-            # Get participants for this round
-            participants = await self.redis_state.get_next_round_players()
-            random.shuffle(participants)  # Shuffle for fair pairing
-            
-            # Clear next round (winners will be added back)
-            await self.redis_state.clear_next_round()
-            
-            # Create bracket for this round
-            await self.redis_state.set_bracket_round(new_round, participants.copy())
-            
-            # Create games for this round
-            games = []
-            remaining_players = participants.copy()
-            
-            # Pair players for games
-            while len(remaining_players) >= 2:
-                player_1 = remaining_players.pop(0)
-                player_2 = remaining_players.pop(0)
-                
-                # Create game
-                await self._create_game(player_1, player_2)
-                games.append({'player_1': player_1, 'player_2': player_2})
-            
-            # Handle odd player (bye)
-            if remaining_players:
-                bye_player = remaining_players[0]
-                tournament_id = await self.get_tournament_id()
-                logger.info(f"Player {bye_player} gets a bye in round {new_round}")
-                # Automatically advance bye player
-                await self.register_game_result(None, bye_player, None, auto_advance=True)
-            
-            tournament_id = await self.get_tournament_id()
-            logger.info(f"Round {new_round} started in tournament {tournament_id}")
-            logger.info(f"Participants: {participants}")
-            logger.info(f"Games created: {len(games)}")
-            
-            # Broadcast round start to all players
-            await self._broadcast_round_start(games)
-            
-            return {'type': 'success', 'success': f'Round {new_round} started'}
-            
-        finally:
-            await self.redis_state.manager._release_lock(self.redis_state.tournament_id)
+    def _coordinator_lease(self) -> Optional[str]:
+        """Fencing token for coordinator writes: '' without a manager, None if another process coordinates"""
+        if self.manager is None:
+            return ''
+        return self.manager.lease_of(self.tournament_id)
     
-    async def register_game_result(self, game_id: int, winner: int, loser: int, auto_advance: bool = False) -> Dict[str, Any]:
-        """Register the result of a tournament game - maintains original API signature"""
-        # Convert parameters to proper types for backward compatibility
-        game_id = str(game_id) if game_id is not None else None
-        winner = str(winner) if winner is not None else None
-        loser = str(loser) if loser is not None else None
-        
-        # Acquire lock for game result processing
-        if not await self.redis_state.manager._acquire_lock(self.redis_state.tournament_id):
-            return {'type': 'error', 'error': 'Tournament is currently being modified'}
+    async def start_round(self) -> Dict[str, Any]:
+        """Start the next tournament round (coordinator only)"""
+        lease = self._coordinator_lease()
+        if lease is None:
+            return {'type': 'error', 'error': 'Tournament is coordinated by another process'}
+        
+        # Claims the round atomically: concurrent callers get round_active/not_enough_players
+        round_data = await self.redis_state.begin_round(fence=lease)
+        if round_data['status'] == 'fenced':
+            logger.warning(f"Coordinator lease of tournament {self.tournament_id} lost, not starting a round")
+            return {'type': 'error', 'error': 'Tournament is coordinated by another process'}
+        if round_data['status'] != 'started':
+            return {'type': 'error', 'error': 'Cannot start round'}
+        
+        new_round = round_data['round']
+        tournament_id = await self.get_tournament_id()
         
-        try:
-            tournament_id = await self.get_tournament_id()
-            active_games = await self.redis_state.get_active_games()
-            logger.info(f"Registering game result in tournament {tournament_id}. Game: {game_id}, Winner: {winner}, Loser: {loser}")
-            logger.info(f"Active games: {list(active_games.keys())}")
-            
-            # Handle bye advancement
-            if auto_advance:
-                logger.info(f"Auto-advancing {winner} (bye) in tournament {tournament_id}")
-                next_round_players = await self.redis_state.get_next_round_players()
-                if int(winner) not in next_round_players:
-                    await self.redis_state.add_next_round_player(int(winner))
-                    logger.info(f"Bye player {winner} added to next round")
-                await self._check_round_completion()
-                return {'type': 'success', 'success': f'{winner} advanced (bye)'}
-            
-            # Check if this game belongs to the tournament
-            if int(game_id) not in active_games:
-                logger.warning(f"Game {game_id} not found in tournament {tournament_id} active games: {list(active_games.keys())}")
-                return {'type': 'error', 'error': 'Game not found in tournament'}
-            
-            # Remove the completed game
-            game_info = await self.redis_state.remove_active_game(int(game_id))
-            logger.info(f"Game {game_id} completed in tournament {tournament_id}: {winner} beat {loser}")
-            
-            # Add winner to next round
-            next_round_players = await self.redis_state.get_next_round_players()
-            if int(winner) not in next_round_players:
-                await self.redis_state.add_next_round_player(int(winner))
-                logger.info(f"Winner {winner} added to next round")
-            
-            # Remove loser from next round if present
-            try:
-                await self.redis_state.remove_next_round_player(int(loser))
-                logger.info(f"Loser {loser} removed from next round")
-            except:
-                logger.info(f"Loser {loser} was not in next round (eliminated)")
-            
-            # Check if round is complete
-            remaining_active_games = await self.redis_state.get_active_games()
-            logger.info(f"Checking round completion. Active games remaining: {len(remaining_active_games)}")
-            await self._check_round_completion()
-            
-            return {'type': 'success', 'success': f'Result registered: {winner} beats {loser}'}
-            
-        finally:
-            await self.redis_state.manager._release_lock(self.redis_state.tournament_id)
-    
-    async def _check_round_completion(self):
-        """Check if current round is complete and handle progression"""
+        # Create the games of this round of the bracket in one batch
+        created = await self._create_round_games(round_data['matches'])
+        if created is None:
+            # Nothing was created: without games nobody would ever end the round
+            await self.redis_state.abort_round(new_round, fence=lease)
+            return {'type': 'error', 'error': 'Cannot create the games of the round'}
+        games, walkovers = created
+        if games:
+            await self.redis_state.add_active_games({game['game_id']: game for game in games})
+        for winner in walkovers:
+            await self.redis_state.record_result(None, winner, forced=True, fence=lease)
+        
+        # Byes were advanced when the bracket was built
+        if round_data['byes']:
+            logger.info(f"Players {round_data['byes']} get a bye in round {new_round}")
+        
+        logger.info(f"Round {new_round} started in tournament {tournament_id}")
+        logger.info(f"Games created: {len(games)}")
+        
+        # Broadcast round start to all players
+        await self._broadcast_round_start(games)
+        
+        return {'type': 'success', 'success': f'Round {new_round} started'}
+    
+    async def register_game_result(self, game_id: int, winner: int, loser: int, auto_advance: bool = False,
+                                   fence: str = '') -> Dict[str, Any]:
+        """
+        Register the result of a tournament game - maintains original API signature.
+        Results decided by the coordinator (timeouts) pass its lease as `fence`.
+        """
         tournament_id = await self.get_tournament_id()
-        #logger.info(f"DEBUG: _check_round_completion called for tournament {tournament_id}")
+        logger.info(f"Registering game result in tournament {tournament_id}. Game: {game_id}, Winner: {winner}, Loser: {loser}")
+        
+        # Remove the game, advance the winner and detect the end of the round in one call
+        outcome = await self.redis_state.record_result(
+            int(game_id) if game_id is not None else None,
+            int(winner),
+            int(loser) if loser is not None else None,
+            forced=auto_advance,
+            fence=fence
+        )
         
-        # Check for expired games first
-        expired = await self.redis_state.manager.cleanup_expired_games(tournament_id)
-        if expired:
-            logger.warning(f"Active games for tournament {tournament_id} have expired due to TTL")
-            
-            # Try to determine winner from current round state
-            next_round_players = await self.redis_state.get_next_round_players()
-            winner = None
-            
-            if len(next_round_players) == 1:
-                winner = next_round_players[0]
-                logger.info(f"Tournament {tournament_id} expired but found single winner: {winner}")
-            elif len(next_round_players) > 1:
-                # Multiple players remain, pick one arbitrarily or use tournament rules
-                winner = next_round_players[0]  # Could also use random.choice() or other logic
-                logger.warning(f"Tournament {tournament_id} expired with {len(next_round_players)} remaining players, selected winner: {winner}")
-            else:
-                # No next round players, try to find any player from current tournament
-                all_players = await self.get_players()
-                if all_players:
-                    winner = all_players[0]  # Last resort: pick first original player
-                    logger.warning(f"Tournament {tournament_id} expired with no clear winner, selected: {winner}")
-                else:
-                    logger.error(f"Tournament {tournament_id} expired and no players found!")
-            
-
-            # End tournament due to timeout
-            await self.redis_state._update_data({
-                'status': 'completed',
-                'is_complete': True,
-                'completion_time': datetime.now().isoformat(),
-                'winner': winner
-            })
-            await self._update_tournament_in_db()
-            await self._broadcast_tournament_complete(winner)
+        if outcome['status'] == 'fenced':
+            logger.warning(f"Coordinator lease of tournament {tournament_id} lost, result of game {game_id} not recorded")
+            return {'type': 'error', 'error': 'Tournament is coordinated by another process'}
+        if outcome['status'] == 'unknown_game':
+            logger.warning(f"Game {game_id} not found in tournament {tournament_id} active games")
+            return {'type': 'error', 'error': 'Game not found in tournament'}
+        if outcome['status'] == 'unknown_player':
+            logger.warning(f"Player {winner} is not in game {game_id} of tournament {tournament_id}")
+            return {'type': 'error', 'error': 'Winner is not a player of this game'}
+        
+        await self._check_round_completion(outcome)
+        
+        if auto_advance:
+            return {'type': 'success', 'success': f'{winner} advanced (bye)'}
+        logger.info(f"Game {game_id} completed in tournament {tournament_id}: {winner} beat {loser}")
+        return {'type': 'success', 'success': f'Result registered: {winner} beats {loser}'}
+    
+    async def _check_round_completion(self, outcome: Dict[str, Any]):
+        """Round/tournament ends are handled by the coordinator from the script's event"""
+        if outcome['status'] != 'recorded':
             return
-
-        # Round is complete when no more active games
-        active_games = await self.redis_state.get_active_games()
-        #logger.info(f"DEBUG: Retrieved active games: {list(active_games.keys()) if active_games else 'None'}")
-        #logger.info(f"DEBUG: Active games count: {len(active_games)}")
         
-        if len(active_games) == 0:
-            current_round = await self.get_current_round()
-            next_round_players = await self.redis_state.get_next_round_players()
-            
-            logger.info(f"Round {current_round} completed in tournament {tournament_id}")
-            logger.info(f"Winners advancing to next round: {next_round_players}")
-            
-            # Check if tournament is complete
-            if len(next_round_players) <= 1:
-                logger.info(f"Tournament {tournament_id} completed!")
-                if next_round_players:
-                    winner = next_round_players[0]
-                    logger.info(f"Tournament winner: {winner}")
-                else:
-                    # No next round players - try to find a winner from the current state
-                    logger.warning(f"Tournament {tournament_id} completed but no next round players found!")
-                    
-                    # Try to get winner from tournament players as fallback
-                    all_players = await self.get_players()
-                    if all_players:
-                        winner = all_players[0]  # Pick first player as fallback
-                        logger.warning(f"Tournament {tournament_id} using fallback winner: {winner}")
-                    else:
-                        logger.error(f"Tournament {tournament_id} completed but no players found at all!")
-                        winner = None
-                
-                # Mark tournament as complete
-                await self.redis_state._update_data({
-                    'status': 'completed',
-                    'is_complete': True,
-                    'completion_time': datetime.now().isoformat(),
-                    'winner': winner
-                })
-                
-                # Update database BEFORE broadcasting
-                #logger.info(f"DEBUG: Updating database for completed tournament {tournament_id}")
-                await self._update_tournament_in_db()
-                
-                # Broadcast completion
-                await self._broadcast_tournament_complete(winner)
-                return
-            
-            # Broadcast round end
-            await self._broadcast_round_end()
-            
-            # Schedule next round (wait a bit for clients to process round end)
-            await asyncio.sleep(3)
-            logger.info(f"Scheduling next round for tournament {tournament_id}")
-            await self.start_round()
-        else:
-            current_round = await self.get_current_round()
-            next_round_players = await self.redis_state.get_next_round_players()
-            
-            logger.info(f"Round {current_round} still active. Games remaining: {len(active_games)}")
-            logger.info(f"Active games: {list(active_games.keys())}")
-            logger.info(f"Current next_round: {next_round_players}")
-            
-            # Check if games are taking too long and extend TTL if needed
-            round_start_data = await self.redis_state._get_data()
-            round_start_time_str = round_start_data.get('round_start_time')
-            if round_start_time_str:
-                try:
-                    round_start_time = datetime.fromisoformat(round_start_time_str)
-                    if datetime.now() - round_start_time > timedelta(minutes=4):  # 4 minutes into round
-                        logger.info(f"Round has been active for >4 minutes, extending game TTL for tournament {tournament_id}")
-                        await self.redis_state.manager.extend_game_ttl(tournament_id, 300)  # Extend by 5 more minutes
-                except Exception as e:
-                    logger.warning(f"Failed to parse round start time or extend TTL: {e}")
-    
-    async def handle_round_timeout(self):
-        """Handle round timeout by checking connections and advancing players"""
         tournament_id = await self.get_tournament_id()
-        logger.warning(f"Handling round timeout for tournament {tournament_id}")
+        logger.info(f"Round {await self.get_current_round()} still active. Games remaining: {outcome['remaining']}")
         
-        # Get incomplete games and resolve them
+        # Check if games are taking too long and extend TTL if needed
+        round_start_data = await self.redis_state._get_data()
+        round_start_time = round_start_data.get('round_start_time')
+        if round_start_time:
+            try:
+                if datetime.now() - round_start_time > timedelta(minutes=4):  # 4 minutes into round
+                    logger.info(f"Round has been active for >4 minutes, extending game TTL for tournament {tournament_id}")
+                    await self.redis_state.manager.extend_game_ttl(tournament_id, 300)  # Extend by 5 more minutes
+            except Exception as e:
+                logger.warning(f"Failed to extend TTL: {e}")
+    
+    async def resolve_forfeits(self) -> int:
+        """Advance past every active game with an absent player; returns how many"""
+        return await self._resolve_games(forfeits_only=True)
+    
+    async def handle_round_timeout(self):
+        """Resolve every game still running at the round deadline"""
+        logger.warning(f"Handling round timeout for tournament {await self.get_tournament_id()}")
+        await self._resolve_games(forfeits_only=False)
+    
+    async def _resolve_games(self, forfeits_only: bool) -> int:
+        """
+        Award the active games from one presence lookup for the whole round:
+        the present player wins; with both players absent, or both still
+        playing at the deadline, player 1 (the upper side of the bracket) does.
+        """
+        lease = self._coordinator_lease()
+        if lease is None:
+            return 0
         active_games = await self.redis_state.get_active_games()
+        if not active_games:
+            return 0
+        online = await presence.online(
+            player for game_info in active_games.values() for player in (game_info['player_1'], game_info['player_2'])
+        )
         
+        resolved = 0
         for game_id, game_info in active_games.items():
             player_1 = game_info['player_1']
             player_2 = game_info['player_2']
-            
-            # Check player connections (simplified)
-            player_1_connected = await self._check_player_connection(player_1)
-            player_2_connected = await self._check_player_connection(player_2)
-            
-            if player_1_connected and not player_2_connected:
-                winner = player_1
-            elif player_2_connected and not player_1_connected:
-                winner = player_2
-            else:
-                # Both connected or both disconnected - random choice
-                winner = random.choice([player_1, player_2])
-            
-            logger.info(f"Timeout resolution: {winner} advances (connection check)")
-            await self.register_game_result(game_id, winner, None, auto_advance=True)
-    
-    async def _check_player_connection(self, player_id: int) -> bool:
-        """Check if player is connected (simplified implementation)"""
-        # In a real implementation, you'd check WebSocket connections in channel layer
-        return True
-    
-    async def _create_game(self, player_1: int, player_2: int):
-        """Create a game between two players"""
+            if forfeits_only and online[player_1] and online[player_2]:
+                continue
+            winner, loser = (player_2, player_1) if online[player_2] and not online[player_1] else (player_1, player_2)
+            
+            logger.info(f"Game {game_id} resolved: {winner} advances ({'present' if online[winner] else 'absent'}), {loser} {'present' if online[loser] else 'absent'}")
+            result = await self.register_game_result(game_id, winner, loser, auto_advance=True, fence=lease)
+            if result['type'] == 'success':
+                resolved += 1
+        return resolved
+    
+    @database_sync_to_async
+    def _create_round_games(self, matches: List[List[int]]) -> Optional[Tuple[List[Dict[str, Any]], List[int]]]:
+        """
+        Create the games of a round's [slot, player_1, player_2] matches with
+        one profile lookup and one INSERT. Returns the active game info of
+        each game (with usernames for the round broadcast) and the walkover
+        winners: a match with an unknown player gets no game, the other player
+        (player 1 if both are unknown) advances. None when nothing could be
+        created.
+        """
+        from .models import Tournament, UserProfile, Game
+        
+        tournament_id = self.redis_state.tournament_id
         try:
-            from .models import Tournament, UserProfile, Game
-            
-            # Get the players and tournament
-            player_1_obj = await database_sync_to_async(UserProfile.objects.get)(user_id=player_1)
-            player_2_obj = await database_sync_to_async(UserProfile.objects.get)(user_id=player_2)
-            tournament_obj = await database_sync_to_async(Tournament.objects.get)(id=self.redis_state.tournament_id)
-            
-            # Create the game
-            game = await database_sync_to_async(Game.objects.create)(
-                player_1=player_1_obj,
-                player_2=player_2_obj,
-                tournament_id=tournament_obj
-            )
-            
-            # Store game info in Redis
-            game_info = {
+            profiles = UserProfile.objects.in_bulk({player for _, player_1, player_2 in matches for player in (player_1, player_2)})
+            if not Tournament.objects.filter(id=tournament_id).exists():
+                logger.error(f"Tournament {tournament_id} not in database, cannot create its games")
+                return None
+            
+            created_at = datetime.now().isoformat()
+            pairings, walkovers = [], []
+            for slot, player_1, player_2 in matches:
+                if player_1 not in profiles or player_2 not in profiles:
+                    winner = player_2 if player_1 not in profiles and player_2 in profiles else player_1
+                    logger.error(f"Player profile missing for game {player_1} vs {player_2} of tournament {tournament_id}, {winner} advances")
+                    walkovers.append(winner)
+                    continue
+                pairings.append((slot, player_1, player_2))
+            
+            # bulk_create sends no post_save: players learn of their game from the round broadcast
+            games = Game.objects.bulk_create([
+                Game(player_1_id=player_1, player_2_id=player_2, tournament_id_id=tournament_id)
+                for _, player_1, player_2 in pairings
+            ])
+        except Exception as e:
+            logger.error(f"Error creating games for tournament {tournament_id}: {e}", exc_info=True)
+            return None
+        
+        logger.info(f"Created {len(games)} games for tournament {tournament_id}")
+        return [
+            {
                 'game_id': game.id,
                 'player_1': player_1,
                 'player_2': player_2,
-                'created_at': datetime.now().isoformat(),
-                'tournament_id': self.redis_state.tournament_id
+                'player_1_username': profiles[player_1].username,
+                'player_2_username': profiles[player_2].username,
+                'slot': slot,
+                'created_at': created_at,
+                'tournament_id': tournament_id
             }
-            
-            await self.redis_state.add_active_game(game.id, game_info)
-            
-            # Broadcast game creation to tournament players
-            channel_layer = get_channel_layer()
-            if channel_layer:
-                await channel_layer.group_send(
-                    f'tournament_{self.redis_state.tournament_id}',
-                    {
-                        'type': 'create_game',
-                        'game_id': game.id,
-                        'player_1': player_1,
-                        'player_2': player_2,
-                        'tournament_id': self.redis_state.tournament_id
-                    }
-                )
-                logger.info(f"Game {game.id} created for tournament {self.redis_state.tournament_id}: {player_1} vs {player_2}")
-        
-        except Exception as e:
-            logger.error(f"Error creating game for tournament: {e}", exc_info=True)
+            for game, (slot, player_1, player_2) in zip(games, pairings)
+        ], walkovers
     
     async def _broadcast_round_start(self, games: List[Dict]):
-        """Broadcast round start to all tournament players"""
+        """Broadcast round start, with every game of the round, to all tournament players"""
         channel_layer = get_channel_layer()
         if channel_layer:
             current_round = await self.get_current_round()
@@ -759,6 +782,7 @@ class RedisBackedTournamentState:
         """Update tournament status in database"""
         try:
             from .models import Tournament, UserProfile
+            from .player_stats import record_tournament
             
             tournament_id = await self.get_tournament_id()
             #logger.info(f"DEBUG: Updating tournament {tournament_id} in database")
@@ -778,6 +802,7 @@ class RedisBackedTournamentState:
             
             #logger.info(f"DEBUG: Tournament {tournament_id} - status: {status}, winner_id: {winner_id}")
             
+            newly_completed = status == 'completed' and tournament_obj.status != 'completed'
             tournament_obj.status = status
             if winner_id:
                 try:
@@ -789,6 +814,8 @@ class RedisBackedTournamentState:
                     logger.warning(f"Failed to set winner {winner_id} in database")
             
             await database_sync_to_async(tournament_obj.save)()
+            if newly_completed:
+                await database_sync_to_async(record_tournament)(tournament_id, tournament_obj.winner_id)
             
             logger.info(f"Tournament {tournament_id} updated in database: status={status}, winner={winner_id}")
             
@@ -812,57 +839,33 @@ class RedisBackedTournamentState:
             tournament_id = await self.get_tournament_id()
             logger.error(f"Failed to update tournament {tournament_id} status in database: {e}")
     
+    async def snapshot(self) -> Optional[TournamentSnapshot]:
+        """Every Redis key of the tournament in one round trip (see RedisTournamentState.snapshot)"""
+        return await self.redis_state.snapshot()
+    
     async def get_brackets(self) -> Dict[str, Any]:
-        """Get tournament brackets data for frontend"""
-        # Get active games in serializable format
-        active_games = await self.redis_state.get_active_games()
-        active_games_serializable = []
-        for game_info in active_games.values():
-            serializable_game = game_info.copy()
-            # Convert datetime to string if needed
-            if 'created_at' in serializable_game and isinstance(serializable_game['created_at'], datetime):
-                serializable_game['created_at'] = serializable_game['created_at'].isoformat()
-            active_games_serializable.append(serializable_game)
-        
-        # Get brackets
-        brackets = await self.redis_state.get_brackets()
-        
-        # Get other data
-        tournament_id = await self.get_tournament_id()
-        name = await self.redis_state.get_name()
-        max_p = await self.redis_state.get_max_p()
-        nbr_player = await self.get_nbr_player()
-        creator_id = await self.redis_state.get_creator_id()
-        players = await self.get_players()
-        current_round = await self.get_current_round()
-        is_round_active = await self.get_is_round_active()
-        initialized = await self.get_initialized()
-        is_complete = await self.get_is_complete()
-        winner = await self.get_winner()
-        next_round_players = await self.redis_state.get_next_round_players()
-        
-        # Get timing data
-        data = await self.redis_state._get_data()
-        round_start_time = data.get('round_start_time')
-        completion_time = data.get('completion_time')
-        
+        """Get tournament brackets data for frontend (one Redis round trip)"""
+        snapshot = await self.snapshot()
+        if snapshot is None:
+            return {}
         return {
-            'tournament_id': tournament_id,
-            'name': name,
-            'max_partecipants': max_p,
-            'current_partecipants': nbr_player,
-            'creator_id': creator_id,
-            'players': players,
-            'current_round': current_round,
-            'is_round_active': is_round_active,
-            'initialized': initialized,
-            'is_complete': is_complete,
-            'winner': winner,
-            'brackets': brackets,
-            'active_games': active_games_serializable,
-            'next_round_players': next_round_players,
-            'round_start_time': round_start_time,
-            'completion_time': completion_time
+            'tournament_id': snapshot.tournament_id,
+            'name': snapshot.name,
+            'max_partecipants': snapshot.max_p,
+            'current_partecipants': snapshot.nbr_player,
+            'creator_id': snapshot.creator_id,
+            'players': list(snapshot.players),
+            'current_round': snapshot.current_round,
+            'is_round_active': snapshot.is_round_active,
+            'initialized': snapshot.initialized,
+            'is_complete': snapshot.is_complete,
+            'winner': snapshot.winner,
+            'brackets': {round_num: list(players) for round_num, players in snapshot.brackets.items()},
+            'bracket': snapshot.bracket.render() if snapshot.bracket else None,
+            'active_games': [dict(game_info) for game_info in snapshot.active_games.values()],
+            'next_round_players': list(snapshot.next_round_players),
+            'round_start_time': snapshot.round_start_time.isoformat() if snapshot.round_start_time else None,
+            'completion_time': snapshot.completion_time.isoformat() if snapshot.completion_time else None
         }
 
 
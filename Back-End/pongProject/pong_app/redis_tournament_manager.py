@@ -9,12 +9,454 @@ import asyncio
 import json
 import logging
 import redis.asyncio as redis
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Set
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Any, Set, Tuple
 from django.conf import settings
 
+from .bracket import Bracket, seed
+from .tournament_codec import (
+    LUA_FIELDS, SCHEMA_VERSION, VERSION_FIELD, decode_record, encode_fields, encode_record, encode_value,
+    is_legacy, migrate_legacy,
+)
+
 logger = logging.getLogger('pong_app')
 
+# Tournament state transitions run as Lua scripts: each one reads and writes
+# the tournament hash and its lists in a single atomic call, so no app-level
+# lock is needed. The hash holds msgpack values under numeric field IDs (see
+# tournament_codec); scripts access them by name through get_fields/set_fields.
+#
+# Every transition also publishes an event on EVENTS_CHANNEL from inside the
+# script, so subscribers see exactly the transitions that happened, in order:
+#   {"tournament_id": 7, "event": "player_joined" | "initialized" |
+#    "round_started" | "round_aborted" | "game_finished" | "round_complete" |
+#    "complete", ...}
+EVENTS_CHANNEL = "tournament_events"
+
+# ARGV[1] of every script is the tournament id
+SCRIPT_HELPERS = LUA_FIELDS + """
+local function contains(list, value)
+    for _, item in ipairs(list) do
+        if tostring(item) == tostring(value) then
+            return true
+        end
+    end
+    return false
+end
+
+local function publish(event, fields)
+    fields = fields or {}
+    fields['tournament_id'] = tonumber(ARGV[1])
+    fields['event'] = event
+    redis.call('publish', '""" + EVENTS_CHANNEL + """', cjson.encode(fields))
+end
+
+-- Decoded tournament attributes by name, nil if the tournament does not exist
+local function get_fields(key, ...)
+    local names = {...}
+    local ids = {}
+    for i, name in ipairs(names) do
+        ids[i] = F[name]
+    end
+    local raw = redis.call('hmget', key, '""" + VERSION_FIELD + """', unpack(ids))
+    if not raw[1] then
+        if redis.call('exists', key) == 1 then
+            error({err = 'LEGACY_RECORD ' .. key .. ' must be migrated (manage.py migrate_tournament_records)'})
+        end
+        return nil
+    end
+    local record = {}
+    for i, name in ipairs(names) do
+        if raw[i + 1] then
+            record[name] = cmsgpack.unpack(raw[i + 1])
+        end
+    end
+    return record
+end
+
+-- `fields` are Lua values to pack, `encoded` values already packed by the caller
+local function set_fields(key, fields, encoded)
+    local args = {}
+    for name, value in pairs(fields) do
+        table.insert(args, F[name])
+        table.insert(args, cmsgpack.pack(value))
+    end
+    for name, value in pairs(encoded or {}) do
+        table.insert(args, F[name])
+        table.insert(args, value)
+    end
+    redis.call('hset', key, unpack(args))
+end
+
+-- Bracket slots (see bracket.py): u32 cells of the bracket string
+local function get_slots(key, first, last)
+    local args = {}
+    for slot = first, last do
+        table.insert(args, 'GET')
+        table.insert(args, 'u32')
+        table.insert(args, '#' .. slot)
+    end
+    return redis.call('bitfield', key, unpack(args))
+end
+
+-- First and last match slot of a round, nil if the bracket has no such round
+local function round_slots(key, round)
+    local size = redis.call('strlen', key) / 8
+    local first = math.floor(size / 2 ^ round)
+    if round < 1 or first < 1 then
+        return nil
+    end
+    return first, 2 * first - 1
+end
+
+-- Fencing: the coordinator passes its lease value ('' = unfenced write) and
+-- the write is refused once that lease expired or another process holds it
+local function lease_lost(key, value)
+    return value ~= '' and redis.call('get', key) ~= value
+end
+"""
+
+# KEYS: tournament  ARGV: tournament id, player id
+JOIN_SCRIPT = SCRIPT_HELPERS + """
+local tournament = get_fields(KEYS[1], 'initialized', 'max_p', 'players')
+if not tournament then
+    return 'missing'
+end
+if tournament.initialized then
+    return 'started'
+end
+local player_id = tonumber(ARGV[2])
+local players = tournament.players or {}
+if contains(players, player_id) then
+    return 'duplicate'
+end
+if #players >= tournament.max_p then
+    return 'full'
+end
+table.insert(players, player_id)
+set_fields(KEYS[1], {players = players, nbr_player = #players})
+publish('player_joined', {player_id = player_id, players = #players, max_p = tournament.max_p})
+return 'added'
+"""
+
+# KEYS: tournament, bracket
+# ARGV: tournament id, bracket ttl, bracket (see bracket.py), players it was built from
+START_SCRIPT = SCRIPT_HELPERS + """
+local tournament = get_fields(KEYS[1], 'initialized', 'players')
+if not tournament then
+    return 'missing'
+end
+if tournament.initialized then
+    return 'initialized'
+end
+local players = tournament.players or {}
+if #players < 2 then
+    return 'not_enough_players'
+end
+-- Somebody joined since the caller read the players: the bracket is stale
+if #players ~= #ARGV - 3 then
+    return 'changed'
+end
+for i, player in ipairs(players) do
+    if tostring(player) ~= ARGV[i + 3] then
+        return 'changed'
+    end
+end
+set_fields(KEYS[1], {initialized = true, status = 'active', current_round = 0, partecipants = players})
+redis.call('set', KEYS[2], ARGV[3], 'EX', ARGV[2])
+publish('initialized', {players = #players})
+return 'started'
+"""
+
+# KEYS: tournament, active_games, bracket, coordinator
+# ARGV: tournament id, round start time (encoded), bracket ttl, coordinator lease
+# Opens the next round of the bracket and returns its matches as
+# {slot, player_1, player_2}; games are created by the caller. Players with
+# a bye were advanced when the bracket was built.
+START_ROUND_SCRIPT = SCRIPT_HELPERS + """
+if lease_lost(KEYS[4], ARGV[4]) then
+    return cjson.encode({status = 'fenced'})
+end
+local tournament = get_fields(KEYS[1], 'initialized', 'is_complete', 'current_round')
+if not tournament or not tournament.initialized or tournament.is_complete then
+    return cjson.encode({status = 'not_ready'})
+end
+if redis.call('hlen', KEYS[2]) > 0 then
+    return cjson.encode({status = 'round_active'})
+end
+local round = (tournament.current_round or 0) + 1
+local first, last = round_slots(KEYS[3], round)
+if not first then
+    return cjson.encode({status = 'not_enough_players'})
+end
+
+local sides = get_slots(KEYS[3], 2 * first, 2 * last + 1)
+local decided = get_slots(KEYS[3], first, last)
+local matches, byes = {}, {}
+for i = 1, #decided do
+    local player_1, player_2 = sides[2 * i - 1], sides[2 * i]
+    if decided[i] ~= 0 then
+        if round == 1 then
+            table.insert(byes, decided[i])
+        end
+    elseif player_1 == 0 or player_2 == 0 then
+        -- A game of the previous round is still being created or played
+        return cjson.encode({status = 'round_active'})
+    else
+        table.insert(matches, {first + i - 1, player_1, player_2})
+    end
+end
+if #matches == 0 then
+    return cjson.encode({status = 'not_enough_players'})
+end
+
+set_fields(KEYS[1], {current_round = round}, {round_start_time = ARGV[2]})
+redis.call('expire', KEYS[3], ARGV[3])
+publish('round_started', {round = round})
+return cjson.encode({status = 'started', round = round, matches = matches, byes = byes})
+"""
+
+# KEYS: tournament, active_games, coordinator
+# ARGV: tournament id, round, coordinator lease
+# Hands back a round opened by START_ROUND_SCRIPT whose games could not be
+# created, so that the coordinator can start it again.
+ABORT_ROUND_SCRIPT = SCRIPT_HELPERS + """
+if lease_lost(KEYS[3], ARGV[3]) then
+    return 'fenced'
+end
+local round = tonumber(ARGV[2])
+local tournament = get_fields(KEYS[1], 'current_round')
+if not tournament or tournament.current_round ~= round or redis.call('hlen', KEYS[2]) > 0 then
+    return 'unchanged'
+end
+set_fields(KEYS[1], {current_round = round - 1})
+publish('round_aborted', {round = round})
+return 'aborted'
+"""
+
+# KEYS: tournament, active_games, bracket, coordinator
+# ARGV: tournament id, game id ('' if unknown), winner,
+#       forced ('1' when the game may already be gone: timeouts),
+#       completion time (encoded), coordinator lease
+# Writes the winner into the game's bracket slot and, when it was the last
+# game of the round, either completes the tournament or reports the round
+# winners.
+RECORD_RESULT_SCRIPT = SCRIPT_HELPERS + """
+if lease_lost(KEYS[4], ARGV[6]) then
+    return cjson.encode({status = 'fenced'})
+end
+local game = false
+if ARGV[2] ~= '' then
+    game = redis.call('hget', KEYS[2], ARGV[2])
+    if not game and ARGV[4] ~= '1' then
+        return cjson.encode({status = 'unknown_game'})
+    end
+end
+
+local tournament = get_fields(KEYS[1], 'current_round') or {}
+local round = tournament.current_round or 0
+local first, last = round_slots(KEYS[3], round)
+if not first then
+    return cjson.encode({status = 'unknown_game'})
+end
+local winner = tonumber(ARGV[3])
+local slot = game and cjson.decode(game).slot
+if not slot then
+    -- Forced result of a game that is gone: find the winner's match
+    local sides = get_slots(KEYS[3], 2 * first, 2 * last + 1)
+    for i, player in ipairs(sides) do
+        if player == winner then
+            slot = first + math.floor((i - 1) / 2)
+            break
+        end
+    end
+    if not slot then
+        return cjson.encode({status = 'unknown_player'})
+    end
+end
+local match = get_slots(KEYS[3], slot, slot)
+local sides = get_slots(KEYS[3], 2 * slot, 2 * slot + 1)
+if sides[1] ~= winner and sides[2] ~= winner then
+    return cjson.encode({status = 'unknown_player'})
+end
+if not game and match[1] ~= 0 then
+    return cjson.encode({status = 'unknown_game'})
+end
+if game then
+    redis.call('hdel', KEYS[2], ARGV[2])
+end
+redis.call('bitfield', KEYS[3], 'SET', 'u32', '#' .. slot, winner)
+
+local remaining = redis.call('hlen', KEYS[2])
+local winners = get_slots(KEYS[3], first, last)
+for _, player in ipairs(winners) do
+    if player == 0 then
+        -- Games of this round still running (or not created yet)
+        publish('game_finished', {round = round, game_id = tonumber(ARGV[2]), winner = winner, remaining = remaining})
+        return cjson.encode({status = 'recorded', remaining = remaining})
+    end
+end
+
+if first > 1 then
+    publish('round_complete', {round = round, winners = winners})
+    return cjson.encode({status = 'round_complete', winners = winners})
+end
+set_fields(KEYS[1], {status = 'completed', is_complete = true, winner = winner}, {completion_time = ARGV[5]})
+publish('complete', {round = round, winner = winner})
+return cjson.encode({status = 'complete', winner = winner})
+"""
+
+# Coordinator leases: one process per tournament runs its progression.
+#   tournament:{id}:coordinator        "<owner id>|<fencing token>", PX lease
+#   tournament:{id}:coordinator_epoch  INCR'd on every claim (the fencing token)
+
+# KEYS: coordinator, coordinator_epoch, tournament, active tournaments
+# ARGV: tournament id, owner id, lease ms, epoch ttl
+# Returns {1, lease} when we took the lease, {0, holder} when another process
+# holds it, and {0, false} for a tournament that is gone or complete.
+COORDINATOR_CLAIM_SCRIPT = LUA_FIELDS + """
+local holder = redis.call('get', KEYS[1])
+if holder then
+    return {0, holder}
+end
+if redis.call('exists', KEYS[3]) == 0 then
+    -- Tournament data expired: stop offering it for takeover
+    redis.call('srem', KEYS[4], ARGV[1])
+    return {0, false}
+end
+-- Not yet migrated records have no field ID keys: claim them, reading migrates them
+local is_complete = redis.call('hget', KEYS[3], F.is_complete)
+if is_complete and cmsgpack.unpack(is_complete) then
+    return {0, false}
+end
+local token = redis.call('incr', KEYS[2])
+redis.call('expire', KEYS[2], ARGV[4])
+local lease = ARGV[2] .. '|' .. token
+redis.call('set', KEYS[1], lease, 'PX', ARGV[3])
+return {1, lease}
+"""
+
+# KEYS: coordinator of each tournament  ARGV: lease ms, our lease for each key
+# Returns 1 per key still held (and extended), 0 per key lost
+COORDINATOR_RENEW_SCRIPT = """
+local renewed = {}
+for i, key in ipairs(KEYS) do
+    if redis.call('get', key) == ARGV[i + 1] then
+        redis.call('pexpire', key, ARGV[1])
+        renewed[i] = 1
+    else
+        renewed[i] = 0
+    end
+end
+return renewed
+"""
+
+# KEYS: coordinator  ARGV: our lease
+COORDINATOR_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+return redis.call('del', KEYS[1])
+"""
+
+# KEYS: tournament  ARGV: field, value, ... (the versioned record)
+# Replaces a legacy record in place, keeping its TTL; 0 if already migrated
+MIGRATE_RECORD_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 or redis.call('hexists', KEYS[1], '""" + VERSION_FIELD + """') == 1 then
+    return 0
+end
+local ttl = redis.call('pttl', KEYS[1])
+redis.call('del', KEYS[1])
+redis.call('hset', KEYS[1], unpack(ARGV))
+if ttl > 0 then
+    redis.call('pexpire', KEYS[1], ttl)
+end
+return 1
+"""
+
+
+def parse_active_games(games_data: Dict[str, str]) -> Dict[int, Dict]:
+    active_games = {}
+    for game_id, game_info_json in games_data.items():
+        try:
+            active_games[int(game_id)] = json.loads(game_info_json)
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.warning(f"Failed to parse game {game_id} info: {e}")
+    return active_games
+
+
+@dataclass(frozen=True)
+class TournamentSnapshot:
+    """
+    Immutable view of every Redis key of a tournament, read in one pipeline
+    (see RedisTournamentState.snapshot). Lists are tuples and dicts are
+    read-only mappings; defaults match the RedisTournamentState getters.
+    """
+    tournament_id: int
+    name: str
+    max_p: int
+    creator_id: Optional[int]
+    players: Tuple[int, ...]
+    nbr_player: int
+    status: str
+    initialized: bool
+    is_complete: bool
+    current_round: int
+    winner: Optional[int]
+    round_start_time: Optional[datetime]
+    completion_time: Optional[datetime]
+    active_games: Mapping[int, Mapping[str, Any]]
+    bracket: Optional[Bracket]
+
+    @property
+    def next_round_players(self) -> Tuple[int, ...]:
+        """Players through the current round so far (everybody before round 1)"""
+        if self.bracket is None:
+            return ()
+        return tuple(self.bracket.advancing(self.current_round))
+
+    @property
+    def brackets(self) -> Mapping[int, Tuple[int, ...]]:
+        """Seeded players (round 0) and the players of each round started so far"""
+        if self.bracket is None:
+            return MappingProxyType({})
+        return MappingProxyType({
+            round_num: tuple(self.bracket.entrants(round_num))
+            for round_num in range(self.current_round + 1)
+        })
+
+    @property
+    def is_round_active(self) -> bool:
+        """A round is active while it still has games"""
+        return self.initialized and not self.is_complete and len(self.active_games) > 0
+
+    @classmethod
+    def from_redis(cls, tournament_id: int, data: Dict[str, Any], games_data: Dict[str, str],
+                   bracket_data: Optional[bytes]) -> 'TournamentSnapshot':
+        """Build from the raw replies; `data` is the decoded tournament record"""
+        return cls(
+            tournament_id=tournament_id,
+            name=data.get('name', ''),
+            max_p=data.get('max_p', 0),
+            creator_id=data.get('creator_id', 0),
+            players=tuple(data.get('players', [])),
+            nbr_player=data.get('nbr_player', 0),
+            status=data.get('status', 'pending'),
+            initialized=data.get('initialized', False),
+            is_complete=data.get('is_complete', False),
+            current_round=data.get('current_round', 0),
+            winner=data.get('winner'),
+            round_start_time=data.get('round_start_time'),
+            completion_time=data.get('completion_time'),
+            active_games=MappingProxyType({
+                game_id: MappingProxyType(game_info)
+                for game_id, game_info in parse_active_games(games_data).items()
+            }),
+            bracket=Bracket.from_bytes(bracket_data),
+        )
+
 
 class RedisTournamentManager:
     """
@@ -29,19 +471,17 @@ class RedisTournamentManager:
         self.TOURNAMENT_KEY = "tournament:{tournament_id}"
         self.ACTIVE_TOURNAMENTS_KEY = "active_tournaments"
         self.TOURNAMENT_TASKS_KEY = "tournament_tasks"
-        self.TOURNAMENT_LOCK_KEY = "tournament_lock:{tournament_id}"
         self.ACTIVE_GAMES_KEY = "tournament:{tournament_id}:active_games"
-        self.NEXT_ROUND_KEY = "tournament:{tournament_id}:next_round"
-        self.BRACKETS_KEY = "tournament:{tournament_id}:brackets"
+        self.BRACKET_KEY = "tournament:{tournament_id}:bracket"
+        self.COORDINATOR_KEY = "tournament:{tournament_id}:coordinator"
+        self.COORDINATOR_EPOCH_KEY = "tournament:{tournament_id}:coordinator_epoch"
         
-        # Lock timeouts
-        self.LOCK_TIMEOUT = 30  # seconds
         self.OPERATION_TIMEOUT = 10  # seconds
+        self.START_ATTEMPTS = 3  # bracket rebuilds when players join during the start
         
         # Key expiration times
         self.TOURNAMENT_TTL = 7200  # 2 hours for tournament data
         self.ACTIVE_GAMES_TTL = 360  # 6 minutes for active games
-        self.ROUND_DATA_TTL = 1800  # 30 minutes for round data
         self.BRACKET_TTL = 7200  # 2 hours for bracket data
     
     def _init_redis(self):
@@ -59,37 +499,28 @@ class RedisTournamentManager:
                 socket_connect_timeout=5,
                 socket_timeout=5
             )
+            # Tournament records are binary (msgpack): read them without decoding
+            self.raw_client = redis.Redis(
+                host=redis_host,
+                port=int(redis_port),
+                db=int(redis_db),
+                socket_connect_timeout=5,
+                socket_timeout=5
+            )
+            self._join = self.redis_client.register_script(JOIN_SCRIPT)
+            self._start = self.redis_client.register_script(START_SCRIPT)
+            self._start_round = self.redis_client.register_script(START_ROUND_SCRIPT)
+            self._abort_round = self.redis_client.register_script(ABORT_ROUND_SCRIPT)
+            self._record_result = self.redis_client.register_script(RECORD_RESULT_SCRIPT)
+            self._claim_coordinator = self.redis_client.register_script(COORDINATOR_CLAIM_SCRIPT)
+            self._renew_coordinators = self.redis_client.register_script(COORDINATOR_RENEW_SCRIPT)
+            self._release_coordinator = self.redis_client.register_script(COORDINATOR_RELEASE_SCRIPT)
+            self._migrate_record = self.redis_client.register_script(MIGRATE_RECORD_SCRIPT)
             logger.info(f"Redis tournament manager initialized: {redis_host}:{redis_port}/{redis_db}")
         except Exception as e:
             logger.error(f"Failed to initialize Redis connection: {e}")
             raise
     
-    async def _acquire_lock(self, tournament_id: int, timeout: float = None) -> bool:
-        """Acquire distributed lock for tournament operations"""
-        timeout = timeout or self.LOCK_TIMEOUT
-        lock_key = self.TOURNAMENT_LOCK_KEY.format(tournament_id=tournament_id)
-        
-        try:
-            # Try to acquire lock with expiration
-            acquired = await self.redis_client.set(
-                lock_key, 
-                f"process_{asyncio.current_task().get_name()}", 
-                nx=True, 
-                ex=int(timeout)
-            )
-            return bool(acquired)
-        except Exception as e:
-            logger.error(f"Failed to acquire lock for tournament {tournament_id}: {e}")
-            return False
-    
-    async def _release_lock(self, tournament_id: int):
-        """Release distributed lock for tournament operations"""
-        lock_key = self.TOURNAMENT_LOCK_KEY.format(tournament_id=tournament_id)
-        try:
-            await self.redis_client.delete(lock_key)
-        except Exception as e:
-            logger.warning(f"Failed to release lock for tournament {tournament_id}: {e}")
-    
     async def create_tournament(self, tournament_id: int, name: str, max_players: int, creator_id: int) -> 'RedisTournamentState':
         """Create a new tournament and store in Redis"""
         tournament_data = {
@@ -106,7 +537,7 @@ class RedisTournamentManager:
             'is_round_active': False,
             'partecipants': [],
             'winner': None,
-            'created_at': datetime.now().isoformat(),
+            'created_at': datetime.now(),
             'round_start_time': None,
             'completion_time': None
         }
@@ -114,10 +545,8 @@ class RedisTournamentManager:
         try:
             # Store tournament data
             tournament_key = self.TOURNAMENT_KEY.format(tournament_id=tournament_id)
-            await self.redis_client.hset(tournament_key, mapping={
-                k: json.dumps(v) if isinstance(v, (list, dict)) else str(v)
-                for k, v in tournament_data.items()
-            })
+            await self.redis_client.delete(tournament_key)
+            await self.redis_client.hset(tournament_key, mapping=encode_record(tournament_data))
             
             # Set TTL for tournament data
             await self.redis_client.expire(tournament_key, self.TOURNAMENT_TTL)
@@ -125,19 +554,14 @@ class RedisTournamentManager:
             # Add to active tournaments set
             await self.redis_client.sadd(self.ACTIVE_TOURNAMENTS_KEY, tournament_id)
             
-            # Initialize empty collections with TTL
+            # Initialize empty collections with TTL (the bracket is written on start)
             active_games_key = self.ACTIVE_GAMES_KEY.format(tournament_id=tournament_id)
-            next_round_key = self.NEXT_ROUND_KEY.format(tournament_id=tournament_id)
-            brackets_key = self.BRACKETS_KEY.format(tournament_id=tournament_id)
             
             await self.redis_client.delete(active_games_key)
-            await self.redis_client.delete(next_round_key)
-            await self.redis_client.delete(brackets_key)
+            await self.redis_client.delete(self.BRACKET_KEY.format(tournament_id=tournament_id))
             
             # Set TTL on the keys even if they're empty (Redis will maintain the TTL)
             await self.redis_client.expire(active_games_key, self.ACTIVE_GAMES_TTL)
-            await self.redis_client.expire(next_round_key, self.ROUND_DATA_TTL)
-            await self.redis_client.expire(brackets_key, self.BRACKET_TTL)
             
             logger.info(f"Tournament {tournament_id} created in Redis with TTL settings")
             
@@ -152,9 +576,15 @@ class RedisTournamentManager:
         """Get tournament by ID from Redis"""
         try:
             tournament_key = self.TOURNAMENT_KEY.format(tournament_id=tournament_id)
-            exists = await self.redis_client.exists(tournament_key)
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.exists(tournament_key)
+                pipe.hexists(tournament_key, VERSION_FIELD)
+                exists, versioned = await pipe.execute()
             
             if exists:
+                if not versioned:
+                    # Written before the codec: the scripts need the versioned record
+                    await self.migrate_record(tournament_id)
                 return RedisTournamentState(tournament_id, self)
             
             # Try to load from database if not in Redis
@@ -184,7 +614,7 @@ class RedisTournamentManager:
             
             # Get created_at safely in async context
             created_at = await database_sync_to_async(
-                lambda: tournament_db.created_at.isoformat() if hasattr(tournament_db, 'created_at') else datetime.now().isoformat()
+                lambda: tournament_db.created_at if hasattr(tournament_db, 'created_at') else datetime.now()
             )()
             
             # Convert database model to Redis format
@@ -222,10 +652,8 @@ class RedisTournamentManager:
             
             # Store in Redis
             tournament_key = self.TOURNAMENT_KEY.format(tournament_id=tournament_id)
-            await self.redis_client.hset(tournament_key, mapping={
-                k: json.dumps(v) if isinstance(v, (list, dict)) else str(v)
-                for k, v in tournament_data.items()
-            })
+            await self.redis_client.delete(tournament_key)
+            await self.redis_client.hset(tournament_key, mapping=encode_record(tournament_data))
             
             # Set TTL for tournament data
             await self.redis_client.expire(tournament_key, self.TOURNAMENT_TTL)
@@ -252,11 +680,9 @@ class RedisTournamentManager:
             
             # Remove related data
             await self.redis_client.delete(self.ACTIVE_GAMES_KEY.format(tournament_id=tournament_id))
-            await self.redis_client.delete(self.NEXT_ROUND_KEY.format(tournament_id=tournament_id))
-            await self.redis_client.delete(self.BRACKETS_KEY.format(tournament_id=tournament_id))
-            
-            # Remove lock
-            await self._release_lock(tournament_id)
+            await self.redis_client.delete(self.BRACKET_KEY.format(tournament_id=tournament_id))
+            # Whoever coordinates it loses the lease at its next renewal
+            await self.redis_client.delete(self.COORDINATOR_KEY.format(tournament_id=tournament_id))
             
             logger.info(f"Tournament {tournament_id} removed from Redis")
             
@@ -272,6 +698,63 @@ class RedisTournamentManager:
             logger.error(f"Failed to get active tournaments: {e}")
             return set()
     
+    async def claim_coordinator(self, tournament_id: int, owner_id: str, lease_ms: int) -> Tuple[bool, Optional[str]]:
+        """
+        Take the coordinator lease of a tournament if nobody holds it.
+        Returns (claimed, lease): the holder's lease value, or None when the
+        tournament is gone or complete.
+        """
+        claimed, lease = await self._claim_coordinator(
+            keys=[
+                self.COORDINATOR_KEY.format(tournament_id=tournament_id),
+                self.COORDINATOR_EPOCH_KEY.format(tournament_id=tournament_id),
+                self.TOURNAMENT_KEY.format(tournament_id=tournament_id),
+                self.ACTIVE_TOURNAMENTS_KEY,
+            ],
+            args=[tournament_id, owner_id, lease_ms, self.TOURNAMENT_TTL]
+        )
+        return bool(claimed), lease or None
+    
+    async def renew_coordinators(self, leases: Dict[int, str], lease_ms: int) -> Set[int]:
+        """Extend our coordinator leases in one call, returns the tournaments still held"""
+        tournament_ids = list(leases)
+        renewed = await self._renew_coordinators(
+            keys=[self.COORDINATOR_KEY.format(tournament_id=tid) for tid in tournament_ids],
+            args=[lease_ms] + [leases[tid] for tid in tournament_ids]
+        )
+        return {tid for tid, held in zip(tournament_ids, renewed) if held}
+    
+    async def release_coordinator(self, tournament_id: int, lease: str):
+        """Drop our coordinator lease (no-op if it is no longer ours)"""
+        try:
+            await self._release_coordinator(
+                keys=[self.COORDINATOR_KEY.format(tournament_id=tournament_id)], args=[lease]
+            )
+        except Exception as e:
+            logger.error(f"Failed to release coordinator lease of tournament {tournament_id}: {e}")
+    
+    async def get_coordinators(self, tournament_ids: List[int]) -> Dict[int, Optional[str]]:
+        """Current coordinator lease of each tournament (None if nobody holds one)"""
+        if not tournament_ids:
+            return {}
+        holders = await self.redis_client.mget(
+            [self.COORDINATOR_KEY.format(tournament_id=tid) for tid in tournament_ids]
+        )
+        return dict(zip(tournament_ids, holders))
+    
+    async def migrate_record(self, tournament_id: int) -> bool:
+        """Rewrite a tournament record from before the codec; False if there was nothing to migrate"""
+        tournament_key = self.TOURNAMENT_KEY.format(tournament_id=tournament_id)
+        raw = await self.raw_client.hgetall(tournament_key)
+        if not is_legacy(raw):
+            return False
+        mapping = migrate_legacy(raw)
+        args = [item for field_value in mapping.items() for item in field_value]
+        migrated = await self._migrate_record(keys=[tournament_key], args=args)
+        if migrated:
+            logger.info(f"Tournament {tournament_id} record migrated to schema version {SCHEMA_VERSION}")
+        return bool(migrated)
+    
     async def cleanup_expired_games(self, tournament_id: int):
         """Cleanup expired active games for a tournament"""
         try:
@@ -332,35 +815,15 @@ class RedisTournamentState:
         
         try:
             tournament_key = self.manager.TOURNAMENT_KEY.format(tournament_id=self.tournament_id)
-            data = await self.manager.redis_client.hgetall(tournament_key)
+            data = await self.manager.raw_client.hgetall(tournament_key)
             
             if not data:
                 logger.warning(f"Tournament {self.tournament_id} not found in Redis")
                 return {}
+            if is_legacy(data):
+                await self.manager.migrate_record(self.tournament_id)
             
-            # Parse JSON fields
-            parsed_data = {}
-            for key, value in data.items():
-                try:
-                    # Try to parse as JSON for lists/dicts
-                    if value.startswith('[') or value.startswith('{'):
-                        parsed_data[key] = json.loads(value)
-                    else:
-                        # Handle primitives
-                        if value.lower() in ('true', 'false'):
-                            parsed_data[key] = value.lower() == 'true'
-                        elif value.isdigit():
-                            parsed_data[key] = int(value)
-                        elif value in ('None', ''):
-                            parsed_data[key] = None
-                        else:
-                            parsed_data[key] = value
-                except json.JSONDecodeError:
-                    parsed_data[key] = value
-            
-            self._cached_data = parsed_data
-            self._cache_expiry = now + timedelta(seconds=self._cache_ttl)
-            return parsed_data
+            return self._cache(decode_record(data))
             
         except Exception as e:
             logger.error(f"Failed to get tournament {self.tournament_id} data: {e}")
@@ -371,21 +834,142 @@ class RedisTournamentState:
         try:
             tournament_key = self.manager.TOURNAMENT_KEY.format(tournament_id=self.tournament_id)
             
-            # Serialize updates
-            serialized_updates = {
-                k: json.dumps(v) if isinstance(v, (list, dict)) else str(v)
-                for k, v in updates.items()
-            }
-            
-            await self.manager.redis_client.hset(tournament_key, mapping=serialized_updates)
-            
-            # Invalidate cache
-            self._cached_data = {}
-            self._cache_expiry = None
+            await self.manager.redis_client.hset(tournament_key, mapping=encode_fields(updates))
+            self._invalidate_cache()
             
         except Exception as e:
             logger.error(f"Failed to update tournament {self.tournament_id} data: {e}")
             raise
+
+    def _cache(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        self._cached_data = parsed_data
+        self._cache_expiry = datetime.now() + timedelta(seconds=self._cache_ttl)
+        return parsed_data
+
+    async def snapshot(self) -> Optional[TournamentSnapshot]:
+        """
+        Read the tournament hash, active games and bracket in one
+        MULTI/EXEC pipeline (one round trip, consistent with each other).
+        Returns None if the tournament is not in Redis. Refreshes the cache
+        used by the single-field getters.
+        """
+        keys = self._keys('tournament', 'active_games', 'bracket')
+        async with self.manager.raw_client.pipeline(transaction=True) as pipe:
+            pipe.hgetall(keys[0])
+            pipe.hgetall(keys[1])
+            pipe.get(keys[2])
+            data, games_data, bracket_data = await pipe.execute()
+        
+        if not data:
+            logger.warning(f"Tournament {self.tournament_id} not found in Redis")
+            return None
+        if is_legacy(data):
+            await self.manager.migrate_record(self.tournament_id)
+        return TournamentSnapshot.from_redis(
+            self.tournament_id,
+            self._cache(decode_record(data)),
+            {k.decode(): v.decode() for k, v in games_data.items()},
+            bracket_data,
+        )
+
+    def _invalidate_cache(self):
+        self._cached_data = {}
+        self._cache_expiry = None
+
+    def _keys(self, *names: str) -> List[str]:
+        patterns = {
+            'tournament': self.manager.TOURNAMENT_KEY,
+            'active_games': self.manager.ACTIVE_GAMES_KEY,
+            'bracket': self.manager.BRACKET_KEY,
+            'coordinator': self.manager.COORDINATOR_KEY,
+        }
+        return [patterns[name].format(tournament_id=self.tournament_id) for name in names]
+
+    # Atomic state transitions (see the scripts at the top of the module)
+    async def join(self, player_id: int) -> str:
+        """Add a player; returns added, duplicate, full, started or missing"""
+        try:
+            return await self.manager._join(keys=self._keys('tournament'), args=[self.tournament_id, player_id])
+        finally:
+            self._invalidate_cache()
+
+    async def initialize(self, ratings: Optional[Mapping[int, float]] = None) -> str:
+        """
+        Lock the player list and lay out the bracket, seeded by `ratings`
+        (join order without). Returns started, initialized,
+        not_enough_players, missing or changed (players kept joining).
+        """
+        try:
+            for _ in range(self.manager.START_ATTEMPTS):
+                players = (await self._get_data(force_refresh=True)).get('players', [])
+                bracket = Bracket.build(seed(players, ratings)) if len(players) >= 2 else None
+                outcome = await self.manager._start(
+                    keys=self._keys('tournament', 'bracket'),
+                    args=[self.tournament_id, self.manager.BRACKET_TTL, bracket.to_bytes() if bracket else b'', *players]
+                )
+                if outcome != 'changed':
+                    return outcome
+            return outcome
+        finally:
+            self._invalidate_cache()
+
+    async def begin_round(self, fence: str = '') -> Dict[str, Any]:
+        """
+        Open the next round: {'status', 'round', 'matches', 'byes'}, matches
+        as [slot, player_1, player_2].
+        With a coordinator lease as `fence`, the status is 'fenced' once that
+        lease is no longer held.
+        """
+        try:
+            result = await self.manager._start_round(
+                keys=self._keys('tournament', 'active_games', 'bracket', 'coordinator'),
+                args=[self.tournament_id, encode_value('round_start_time', datetime.now()), self.manager.BRACKET_TTL, fence]
+            )
+            round_data = json.loads(result)
+            if 'byes' in round_data:
+                round_data['byes'] = round_data['byes'] or []  # cjson encodes {} for an empty list
+            return round_data
+        finally:
+            self._invalidate_cache()
+
+    async def abort_round(self, round_number: int, fence: str = '') -> str:
+        """
+        Undo begin_round when none of the round's games could be created.
+        Returns aborted, unchanged (the round moved on or has games) or
+        fenced (see begin_round).
+        """
+        try:
+            return await self.manager._abort_round(
+                keys=self._keys('tournament', 'active_games', 'coordinator'),
+                args=[self.tournament_id, round_number, fence]
+            )
+        finally:
+            self._invalidate_cache()
+
+    async def record_result(self, game_id: Optional[int], winner: int, loser: Optional[int] = None,
+                            forced: bool = False, fence: str = '') -> Dict[str, Any]:
+        """
+        Record a game result and advance the winner in the bracket. Returns
+        the status recorded, round_complete (with `winners`), complete (with
+        `winner`), unknown_game, unknown_player (not in that game) or fenced
+        (see begin_round); exactly one caller sees the end of a round.
+        The loser is implied by the bracket.
+        """
+        try:
+            result = await self.manager._record_result(
+                keys=self._keys('tournament', 'active_games', 'bracket', 'coordinator'),
+                args=[
+                    self.tournament_id,
+                    '' if game_id is None else game_id,
+                    winner,
+                    '1' if forced else '0',
+                    encode_value('completion_time', datetime.now()),
+                    fence,
+                ]
+            )
+            return json.loads(result)
+        finally:
+            self._invalidate_cache()
     
     # Properties that mirror the original TournamentState
     async def get_tournament_id(self) -> int:
@@ -440,16 +1024,7 @@ class RedisTournamentState:
         try:
             games_key = self.manager.ACTIVE_GAMES_KEY.format(tournament_id=self.tournament_id)
             games_data = await self.manager.redis_client.hgetall(games_key)
-            
-            # Parse JSON values
-            active_games = {}
-            for game_id, game_info_json in games_data.items():
-                try:
-                    active_games[int(game_id)] = json.loads(game_info_json)
-                except (json.JSONDecodeError, ValueError) as e:
-                    logger.warning(f"Failed to parse game {game_id} info: {e}")
-            
-            return active_games
+            return parse_active_games(games_data)
         except Exception as e:
             logger.error(f"Failed to get active games for tournament {self.tournament_id}: {e}")
             return {}
@@ -466,6 +1041,19 @@ class RedisTournamentState:
             logger.error(f"Failed to add active game {game_id}: {e}")
             raise
     
+    async def add_active_games(self, games: Dict[int, Dict]):
+        """Add the games of a round in one call"""
+        try:
+            games_key = self.manager.ACTIVE_GAMES_KEY.format(tournament_id=self.tournament_id)
+            async with self.manager.redis_client.pipeline(transaction=True) as pipe:
+                pipe.hset(games_key, mapping={game_id: json.dumps(game_info) for game_id, game_info in games.items()})
+                pipe.expire(games_key, self.manager.ACTIVE_GAMES_TTL)
+                await pipe.execute()
+            logger.info(f"{len(games)} active games added with {self.manager.ACTIVE_GAMES_TTL}s TTL")
+        except Exception as e:
+            logger.error(f"Failed to add active games {list(games)}: {e}")
+            raise
+    
     async def remove_active_game(self, game_id: int) -> Optional[Dict]:
         """Remove and return active game from Redis"""
         try:
@@ -489,75 +1077,29 @@ class RedisTournamentState:
             logger.error(f"Failed to remove active game {game_id}: {e}")
             return None
     
-    async def get_next_round_players(self) -> List[int]:
-        """Get next round players from Redis"""
-        try:
-            next_round_key = self.manager.NEXT_ROUND_KEY.format(tournament_id=self.tournament_id)
-            players = await self.manager.redis_client.lrange(next_round_key, 0, -1)
-            return [int(p) for p in players]
-        except Exception as e:
-            logger.error(f"Failed to get next round players: {e}")
-            return []
-    
-    async def add_next_round_player(self, player_id: int):
-        """Add player to next round with TTL refresh"""
-        try:
-            next_round_key = self.manager.NEXT_ROUND_KEY.format(tournament_id=self.tournament_id)
-            await self.manager.redis_client.rpush(next_round_key, player_id)
-            # Refresh TTL for round data
-            await self.manager.redis_client.expire(next_round_key, self.manager.ROUND_DATA_TTL)
-        except Exception as e:
-            logger.error(f"Failed to add player {player_id} to next round: {e}")
-            raise
-    
-    async def remove_next_round_player(self, player_id: int):
-        """Remove player from next round"""
+    async def get_bracket(self) -> Optional[Bracket]:
+        """The bracket laid out on start, None before"""
         try:
-            next_round_key = self.manager.NEXT_ROUND_KEY.format(tournament_id=self.tournament_id)
-            await self.manager.redis_client.lrem(next_round_key, 0, player_id)
+            bracket_key = self.manager.BRACKET_KEY.format(tournament_id=self.tournament_id)
+            return Bracket.from_bytes(await self.manager.raw_client.get(bracket_key))
         except Exception as e:
-            logger.error(f"Failed to remove player {player_id} from next round: {e}")
-            raise
+            logger.error(f"Failed to get bracket of tournament {self.tournament_id}: {e}")
+            return None
     
-    async def clear_next_round(self):
-        """Clear next round players and reset TTL"""
-        try:
-            next_round_key = self.manager.NEXT_ROUND_KEY.format(tournament_id=self.tournament_id)
-            await self.manager.redis_client.delete(next_round_key)
-            # Set TTL even on empty key to ensure cleanup
-            await self.manager.redis_client.expire(next_round_key, self.manager.ROUND_DATA_TTL)
-        except Exception as e:
-            logger.error(f"Failed to clear next round: {e}")
-            raise
+    async def get_next_round_players(self) -> List[int]:
+        """Players through the current round so far (everybody before round 1)"""
+        bracket = await self.get_bracket()
+        if bracket is None:
+            return []
+        return bracket.advancing(await self.get_current_round())
     
     async def get_brackets(self) -> Dict[int, List[int]]:
-        """Get tournament brackets from Redis"""
-        try:
-            brackets_key = self.manager.BRACKETS_KEY.format(tournament_id=self.tournament_id)
-            brackets_data = await self.manager.redis_client.hgetall(brackets_key)
-            
-            brackets = {}
-            for round_num, players_json in brackets_data.items():
-                try:
-                    brackets[int(round_num)] = json.loads(players_json)
-                except (json.JSONDecodeError, ValueError) as e:
-                    logger.warning(f"Failed to parse bracket round {round_num}: {e}")
-            
-            return brackets
-        except Exception as e:
-            logger.error(f"Failed to get brackets: {e}")
+        """Seeded players (round 0) and the players of each round started so far"""
+        bracket = await self.get_bracket()
+        if bracket is None:
             return {}
-    
-    async def set_bracket_round(self, round_num: int, players: List[int]):
-        """Set players for a bracket round with TTL"""
-        try:
-            brackets_key = self.manager.BRACKETS_KEY.format(tournament_id=self.tournament_id)
-            await self.manager.redis_client.hset(brackets_key, round_num, json.dumps(players))
-            # Refresh TTL for bracket data
-            await self.manager.redis_client.expire(brackets_key, self.manager.BRACKET_TTL)
-        except Exception as e:
-            logger.error(f"Failed to set bracket round {round_num}: {e}")
-            raise
+        current_round = await self.get_current_round()
+        return {round_num: bracket.entrants(round_num) for round_num in range(current_round + 1)}
 
 
 # Global Redis tournament manager instance
@@ -0,0 +1,182 @@
+"""
+Match replays
+
+A replay is an append-only file written while the match runs:
+
+	magic		b'PGRP', u8 version
+	header		u16 length + JSON: seed, initial angle/ball speed, config
+	ticks		one byte per tick: player 1 move in bits 0-1, player 2 in bits 2-3
+	footer		END_MARKER, u16 length + JSON: final scores, tick count
+			('handed_over': true when another process took the match over, with the scores of then)
+
+Every random draw of a match comes from GameState.rng (seeded from the
+header), so re-running GameState.tick() with the recorded moves reproduces the
+match; simulate() does that headlessly, optionally with another physics engine.
+"""
+import json
+import logging
+import os
+import struct
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+logger = logging.getLogger('pong_app')
+
+MAGIC = b'PGRP'
+VERSION = 1
+END_MARKER = 0xFF
+LENGTH = struct.Struct('<H')
+
+# move (-1 up, 0 still, 1 down) <-> 2-bit code
+MOVE_CODES = {0: 0, -1: 1, 1: 2}
+CODE_MOVES = {code: move for move, code in MOVE_CODES.items()}
+
+FLUSH_EVERY = 300	# Ticks (10 seconds at 30 ticks/s)
+
+
+def encode_moves(player_1_move, player_2_move):
+	return MOVE_CODES[player_1_move] | MOVE_CODES[player_2_move] << 2
+
+
+def decode_moves(code):
+	return CODE_MOVES[code & 0b11], CODE_MOVES[code >> 2 & 0b11]
+
+
+def _pack_json(data):
+	payload = json.dumps(data, separators=(',', ':')).encode()
+	return LENGTH.pack(len(payload)) + payload
+
+
+class ReplayWriter:
+	"""Streams one match to disk, one byte per tick"""
+
+	def __init__(self, path, header):
+		self.path = path
+		self.ticks = 0
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		self.file = open(path, 'wb')
+		self.file.write(MAGIC + bytes([VERSION]) + _pack_json(header))
+
+	def record(self, player_1_move, player_2_move):
+		self.file.write(bytes((encode_moves(player_1_move, player_2_move),)))
+		self.ticks += 1
+		if self.ticks % FLUSH_EVERY == 0:
+			self.file.flush()
+
+	def close(self, footer):
+		if self.file.closed:
+			return
+		self.file.write(bytes((END_MARKER,)) + _pack_json(dict(footer, ticks=self.ticks)))
+		self.file.close()
+
+
+@dataclass
+class Replay:
+	header: dict
+	inputs: bytes
+	footer: dict = field(default_factory=dict)	# Empty when the match never finished
+
+	@property
+	def ticks(self):
+		return len(self.inputs)
+
+
+def load(path):
+	with open(path, 'rb') as f:
+		data = f.read()
+	if data[:4] != MAGIC or data[4] != VERSION:
+		raise ValueError(f"{path} is not a version {VERSION} replay")
+
+	offset = 5
+	(length,) = LENGTH.unpack_from(data, offset)
+	offset += LENGTH.size
+	header = json.loads(data[offset:offset + length])
+	offset += length
+
+	end = data.find(bytes((END_MARKER,)), offset)
+	if end == -1:
+		return Replay(header, data[offset:])
+	(length,) = LENGTH.unpack_from(data, end + 1)
+	footer = json.loads(data[end + 1 + LENGTH.size:end + 1 + LENGTH.size + length])
+	return Replay(header, data[offset:end], footer)
+
+
+def replay_path(game_id, replay_dir):
+	return os.path.join(str(replay_dir), f'game_{game_id}_{int(time.time())}.pgrp')
+
+
+def simulate(replay, engine_type=None, on_tick=None):
+	"""
+	Re-run a replay through GameState.tick() without the game loop or sockets.
+	`on_tick(tick, game)` is called after every tick.
+	"""
+	from .signals import GameState
+
+	header = replay.header
+	config = header['config']
+	game = GameState(
+		SimpleNamespace(user_id=header['player_1']),
+		SimpleNamespace(user_id=header['player_2']),
+		header['game_id'],
+		config['p_length'],
+		None,
+		seed=header['seed'],
+		engine_type=engine_type or config['engine_type'],
+	)
+	for name, value in config.items():
+		if name != 'engine_type':
+			setattr(game, name, list(value) if isinstance(value, list) else value)
+	game.angle = game.initial_angle()
+	if game.angle != header['angle']:
+		raise ValueError("Replay seed does not reproduce the recorded initial angle")
+	game.ball_speed = header['ball_speed']
+	game.running = True
+
+	started = time.perf_counter()
+	tick = 0
+	try:
+		for tick, code in enumerate(replay.inputs, 1):
+			game.player_1_move, game.player_2_move = decode_moves(code)
+			game.tick()
+			if on_tick is not None:
+				on_tick(tick, game)
+			if not game.running:
+				break
+	finally:
+		game.physics.release()
+	elapsed = time.perf_counter() - started
+
+	result = {
+		'engine_type': game.physics.engine_type,
+		'ticks': tick,
+		'player_1_score': game.player_1_score,
+		'player_2_score': game.player_2_score,
+		'seconds': elapsed,
+		'ticks_per_second': tick / elapsed if elapsed > 0 else 0.0,
+	}
+	if replay.footer:
+		result['matches_recording'] = (
+			result['ticks'] == replay.footer['ticks'] and
+			result['player_1_score'] == replay.footer['player_1_score'] and
+			result['player_2_score'] == replay.footer['player_2_score']
+		)
+	return result
+
+
+def find_divergence(replay, engine_a, engine_b):
+	"""First tick where two engines disagree on the ball position, or None"""
+	trace = []
+	simulate(replay, engine_a, lambda tick, game: trace.append(tuple(game.ball_pos)))
+	divergence = []
+
+	def check(tick, game):
+		if not divergence and (tick > len(trace) or trace[tick - 1] != tuple(game.ball_pos)):
+			divergence.append({
+				'tick': tick,
+				engine_a: trace[tick - 1] if tick <= len(trace) else None,
+				engine_b: tuple(game.ball_pos),
+			})
+
+	simulate(replay, engine_b, check)
+	return divergence[0] if divergence else None
@@ -26,7 +26,7 @@ class TournamentSerializer(serializers.ModelSerializer):
 		name = serializers.CharField(max_length=255)
 		begin_date = serializers.DateTimeField(read_only=True)
 		partecipants = serializers.IntegerField(min_value=0, default=0, read_only=True)
-		max_partecipants = serializers.IntegerField(min_value=2, help_text="Will be adjusted to nearest power of 2 (4, 8, 16, 32, 64)")
+		max_partecipants = serializers.IntegerField(min_value=2, help_text="Any size from 2 to 128, brackets are padded with byes")
 		winner = serializers.SerializerMethodField(read_only=True)
 		creator = serializers.SerializerMethodField(read_only=True)
 		current_participants = serializers.SerializerMethodField(read_only=True)
@@ -138,6 +138,9 @@ class GameStateSerializer(serializers.Serializer):
 		angle = serializers.FloatField()
 		ring_length = serializers.IntegerField()
 		ring_height = serializers.IntegerField()
+		tick = serializers.IntegerField(required=False)
+		player_1_input_seq = serializers.IntegerField(required=False, allow_null=True)
+		player_2_input_seq = serializers.IntegerField(required=False, allow_null=True)
 		
 class UserStatisticsSerializer(serializers.Serializer):
 		"""Simple serializer for user statistics response"""
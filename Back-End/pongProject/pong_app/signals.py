@@ -10,15 +10,24 @@ from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import *
 from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from asgiref.sync import async_to_sync, sync_to_async
 import time, asyncio
+import secrets
+from collections import deque
 from .serializer import *
 from .physics_integration import create_physics_manager
+from .game_loop import game_loop
+from . import wire_protocol
+from .spectator import spectator_broadcast
+from . import player_stats
+from .replay import ReplayWriter, replay_path
+from .match_registry import match_registry
+from django.conf import settings
 
 logger = logging.getLogger('pong_app')
 
-# ✅ CRITICAL: Reduce tick rate to prevent lag and channel overflow
-tick_rate = 30	# Reduced from 60 to 30 FPS for better performance
+# All matches are stepped by the shared game loop (see game_loop.py)
+tick_rate = game_loop.tick_rate
 websocket_update_rate = 20	# Send WebSocket updates at 20 FPS (every 3rd frame)
 
 # ring_size = [160 , 90]
@@ -27,8 +36,12 @@ websocket_update_rate = 20	# Send WebSocket updates at 20 FPS (every 3rd frame)
 # ring_thickness = 3
 # self.p_speed = 0.1
 ball_acc = 0.1
+
+# Client inputs tagged with a sequence number are queued and applied one per tick
+max_queued_inputs = 32
+max_input_backlog = 3	# Ticks of queued input before the queue is caught up
 class GameState:
-	def __init__(self, player_1, player_2, game_id, player_length, tournament_id):
+	def __init__(self, player_1, player_2, game_id, player_length, tournament_id, seed=None, engine_type=None):
 		self.game_id = game_id
 		self.player_1 = player_1
 		self.player_2 = player_2
@@ -58,10 +71,21 @@ class GameState:
 		# ✅ CRITICAL: Add frame tracking for reduced WebSocket update frequency
 		self.frame_count = 0
 		self.last_websocket_update = 0
+		self.tick_count = 0
+
+		# Prediction support: per-player input queues and last processed input seq
+		self.input_queues = {1: deque(maxlen=max_queued_inputs), 2: deque(maxlen=max_queued_inputs)}
+		self.player_1_input_seq = None
+		self.player_2_input_seq = None
+
+		# Every random draw comes from this generator so replays are deterministic
+		self.seed = seed if seed is not None else secrets.randbits(32)
+		self.rng = random.Random(self.seed)
+		self.replay = None
 		
-		# 🚀 NEW: Physics engine integration (can switch between legacy/modern)
-		# Set via environment variable or default to modern for better performance
-		engine_type = "modern"	# Using modern physics engine!
+		# 🚀 NEW: Physics engine integration (can switch between legacy/modern/vectorized)
+		# Set via PONG_PHYSICS_ENGINE, defaults to modern
+		engine_type = engine_type or getattr(settings, 'PONG_PHYSICS_ENGINE', 'modern')
 		self.physics = create_physics_manager(
 			engine_type=engine_type,
 			ring_length=self.ring_length,
@@ -70,13 +94,14 @@ class GameState:
 		)
 
 
+	def initial_angle(self):
+		if self.rng.choice([True, False]):
+			return self.rng.uniform(70, -70)
+		return self.rng.uniform(110, 250)
+
 	async def start(self):
 		self.running = True
-		tick_interval = 1 / tick_rate
-		if random.choice([True, False]):
-			self.angle = random.uniform(70, -70)
-		else:
-			self.angle = random.uniform(110, 250)
+		self.angle = self.initial_angle()
 
 		try:
 			from django.utils import timezone
@@ -93,61 +118,139 @@ class GameState:
 		await asyncio.sleep(1.5)	# Wait max 1.5 seconds for initialization
 		
 		self.ball_speed = 1.0
+
+		# Record from the first tick, once game_init has set the configuration
+		path = self.start_replay()
+		if path:
+			try:
+				await sync_to_async(Game.objects.filter(id=self.game_id).update)(replay_path=path)
+			except Exception as e:
+				logger.error(f"Failed to link replay of game {self.game_id}: {e}")
 		
-		logger.info(f"Game {self.game_id} starting main loop with ball_speed: {self.ball_speed}")
-		start_time = time.monotonic()
-		frame_count = 0
-		
-		while self.running:
-			self.physics_step()
-			self.movement()
+		# Batched engines only load the paddles every tick: hand them the game_init setup now
+		self.sync_physics()
+		logger.info(f"Game {self.game_id} joining the game loop with ball_speed: {self.ball_speed}")
+		# The shared game loop steps this match from now on and calls game_end() when it stops running
+		game_loop.add(self)
+
+	def start_replay(self):
+		"""Open the replay log of this match, returns its path (None if disabled)"""
+		replay_dir = getattr(settings, 'PONG_REPLAY_DIR', None)
+		if not replay_dir:
+			return None
+		path = replay_path(self.game_id, replay_dir)
+		header = {
+			'game_id': self.game_id,
+			'player_1': self.player_1.user_id,
+			'player_2': self.player_2.user_id,
+			'seed': self.seed,
+			'angle': self.angle,
+			'ball_speed': self.ball_speed,
+			'tick_rate': tick_rate,
+			'config': {
+				'engine_type': self.physics.engine_type,
+				'ring_length': self.ring_length,
+				'ring_height': self.ring_height,
+				'ring_thickness': self.ring_thickness,
+				'p_length': self.p_length,
+				'p_width': self.p_width,
+				'p_speed': self.p_speed,
+				'ball_radius': self.ball_radius,
+				'player_1_pos': list(self.player_1_pos),
+				'player_2_pos': list(self.player_2_pos),
+				'ball_pos': list(self.ball_pos),
+			},
+		}
+		try:
+			self.replay = ReplayWriter(path, header)
+		except OSError as e:
+			logger.error(f"Cannot record replay of game {self.game_id}: {e}")
+			return None
+		return path
+
+	def close_replay(self, handed_over=False):
+		"""Write the replay footer; a match handed over to another process stops recording here"""
+		if self.replay is None:
+			return
+		footer = {'player_1_score': self.player_1_score, 'player_2_score': self.player_2_score}
+		if handed_over:
+			footer['handed_over'] = True
+		self.replay.close(footer)
+
+	def tick(self):
+		"""Advance the match by one fixed timestep (called by the game loop)"""
+		self.apply_inputs()
+		self.physics_step()
+		self.end_tick()
+
+	def prepare_batched_tick(self):
+		"""
+		First half of a batched tick: apply inputs, returns what the batch loads
+		(step_synced). Only the paddles move outside the engine; the ball lives
+		in the batch and is read back in finish_batched_tick.
+		"""
+		self.apply_inputs()
+		return (self.physics.engine.row, ball_acc, self.player_1_pos[1], self.player_2_pos[1])
+
+	def finish_batched_tick(self, result, ball_x, ball_y, angle):
+		"""Second half of a batched tick, with this match's state read back from the batch"""
+		self.ball_pos = [ball_x, ball_y]
+		self.angle = angle
+		self.handle_score(result)
+		self.end_tick()
 
-			await self.update()
+	def end_tick(self):
+		self.movement()
 
-			if self.player_1_score == 5 or self.player_2_score == 5:
-				logger.info(f"Game {self.game_id} ended due to score limit")
-				self.running = False
-				break
-			
-			frame_count += 1
-			# Log periodically to confirm game is running
-			if frame_count % (tick_rate * 10) == 0:	# Every 10 seconds
-				logger.info(f"Game {self.game_id} running - Frame {frame_count}")
-			
-			start_time += tick_interval
-			await asyncio.sleep(max(0, start_time - time.monotonic()))
+		if self.player_1_score == 5 or self.player_2_score == 5:
+			logger.info(f"Game {self.game_id} ended due to score limit")
+			self.running = False
 		
-		logger.info(f"Game {self.game_id} ended with scores: Player 1: {self.player_1_score}, Player 2: {self.player_2_score}")
-		await self.game_end()
+		self.tick_count += 1
+		# Log periodically to confirm game is running
+		if self.tick_count % (tick_rate * 10) == 0:	# Every 10 seconds
+			logger.info(f"Game {self.game_id} running - Frame {self.tick_count}")
 
 	async def game_end(self):
 		logger = logging.getLogger(__name__)
 		logger.info(f"Game {self.game_id} ending with scores: Player 1: {self.player_1_score}, Player 2: {self.player_2_score}")
+		# Fencing: a process that lost the match lease must not write results
+		if not match_registry.owns(self.game_id):
+			logger.warning(f"Game {self.game_id} is owned by another process, not saving results here")
+			self.physics.release()
+			self.close_replay(handed_over=True)
+			return
+		await match_registry.release(self.game_id)
+
+		# Free the match's slot in a shared physics batch
+		self.physics.release()
+		self.close_replay()
+
+		# Determine winner and loser based on scores
+		if self.player_1_score > self.player_2_score:
+			winner_id = self.player_1.user_id
+			loser_id = self.player_2.user_id
+		else:
+			winner_id = self.player_2.user_id
+			loser_id = self.player_1.user_id
 
 		# Save game to database asynchronously
 		try:
 			from django.utils import timezone
 			from asgiref.sync import sync_to_async
-			await sync_to_async(Game.objects.filter(id=self.game_id).update)(
+			saved = await sync_to_async(Game.objects.filter(id=self.game_id, status__in=['pending', 'active']).update)(
 						player_1_score=self.player_1_score,
 						player_2_score=self.player_2_score,
 						status='completed'
 				)
 			logger.info(f"Game {self.game_id} saved to database with scores P1:{self.player_1_score} P2:{self.player_2_score}")
-			
-			# Get the updated game object to access properties
-			game = await sync_to_async(Game.objects.get)(id=self.game_id)
+
+			# Count the game once, on its transition to completed
+			if saved:
+				await sync_to_async(player_stats.record_game)(winner_id, loser_id)
 
 		except Exception as e:
 			logger.error(f"Error saving game {self.game_id} to database: {str(e)}")
-
-		# Determine winner and loser based on scores
-		if self.player_1_score > self.player_2_score:
-			winner_id = self.player_1.user_id
-			loser_id = self.player_2.user_id
-		else:
-			winner_id = self.player_2.user_id
-			loser_id = self.player_1.user_id
 		# If this is a tournament game, register the result
 		if self.tournament_id:
 			logger.info(f"Game {self.game_id} is part of tournament {self.tournament_id}, registering result")
@@ -180,6 +283,16 @@ class GameState:
 			except Exception as e:
 				logger.error(f"Error registering tournament result: {str(e)}")
 		
+		# Spectators get the result on their own group
+		await spectator_broadcast.end(self.game_id, {
+			'winner': winner_id,
+			'loser': loser_id,
+			'final_scores': {
+				'player_1_score': self.player_1_score,
+				'player_2_score': self.player_2_score
+			}
+		})
+
 		# Send game over message to players
 		try:
 			channel_layer = get_channel_layer()
@@ -232,40 +345,48 @@ class GameState:
 
 	def physics_step(self):
 		"""🚀 NEW: Use physics manager instead of inline physics"""
-		# Sync game state to physics engine
+		self.sync_physics()
+		
+		# Execute physics step
+		result = self.physics.physics_step(ball_acc=ball_acc)
+		self.apply_physics_result(result)
+
+	def sync_physics(self):
+		"""Sync game state to physics engine"""
 		if self.physics.engine_type == "legacy":
 			self.physics.engine.player_1_pos = self.player_1_pos.copy()
 			self.physics.engine.player_2_pos = self.player_2_pos.copy()
 			self.physics.engine.ball_pos = self.ball_pos.copy()
 			self.physics.engine.ball_speed = self.ball_speed
-		else:	# modern
+		else:	# modern / vectorized
 			self.physics.engine.player_1_pos.x = self.player_1_pos[0]
 			self.physics.engine.player_1_pos.y = self.player_1_pos[1]
 			self.physics.engine.player_2_pos.x = self.player_2_pos[0]
 			self.physics.engine.player_2_pos.y = self.player_2_pos[1]
 			self.physics.engine.ball_pos.x = self.ball_pos[0]
 			self.physics.engine.ball_pos.y = self.ball_pos[1]
-		
-		# Execute physics step
-		result = self.physics.physics_step(ball_acc=ball_acc)
-		
+
+	def apply_physics_result(self, result):
+		"""Sync physics engine back to game state and handle scoring"""
 		# Sync back to game state
 		self.ball_pos = self.physics.get_ball_position()
 		
 		# Sync angle from physics engine
 		if hasattr(self.physics.engine, 'angle'):
 			self.angle = self.physics.engine.angle
-		
-		# Handle scoring
+		self.handle_score(result)
+
+	def handle_score(self, result):
+		"""Count a goal and serve again"""
 		if result == "player_1_scores":
 			self.player_1_score += 1
-			self.reset_ball(random.uniform(110, 250))
+			self.reset_ball(self.rng.uniform(110, 250))
 		elif result == "player_2_scores":
 			self.player_2_score += 1
-			self.reset_ball(random.uniform(70, -70))
+			self.reset_ball(self.rng.uniform(70, -70))
 		
 		# Log physics stats occasionally for debugging
-		if self.frame_count % 300 == 0:	# Every 10 seconds
+		if self.frame_count % 300 == 0 and logger.isEnabledFor(logging.DEBUG):	# Every 10 seconds
 			stats = self.physics.get_engine_stats()
 			logger.debug(f"Game {self.game_id} physics stats: {stats}")
 	
@@ -284,16 +405,28 @@ class GameState:
 			
 		channel_layer = get_channel_layer()
 		try:
-			serialized_data = GameStateSerializer(self.to_dict()).data
+			state = self.to_dict()
+			seq = self.frame_count % wire_protocol.SEQ_MODULO
+			snapshot = wire_protocol.quantize(state)
+			# Spectators sample this from their own fan-out task
+			spectator_broadcast.publish(self.game_id, state)
 			# Reduce logging verbosity - only log occasionally
 			if self.frame_count % 300 == 0:	# Log every 10 seconds at 30fps
 				logger.debug(f"Sending game state for game {self.game_id} (frame {self.frame_count})")
 			
+			# Encode the frame once here; consumers forward it as-is to every socket
 			await channel_layer.group_send(
 				f'game_{self.game_id}',
 				{
 					'type': 'game_state',
-					'game_state': serialized_data
+					'text': json.dumps({
+						'type': 'game_state',
+						'game_state': GameStateSerializer(state).data
+					}),
+					# Binary protocol: keyframe plus the quantized snapshot for deltas
+					'seq': seq,
+					'snapshot': snapshot,
+					'keyframe': wire_protocol.encode(seq, snapshot),
 				}
 			)
 		except Exception as e:
@@ -321,23 +454,55 @@ class GameState:
 		elif (self.player_2_move < 0 and self.player_2_pos[1] - self.p_length / 2 > -self.ring_height / 2 + self.ring_thickness / 2):
 			self.player_2_pos[1] -= self.p_speed
 
-	def up(self, player):
-		if player == self.player_1.user_id:
-			self.player_1_move = -1	# Set movement state, not direct position
-		elif player == self.player_2.user_id:
-			self.player_2_move = -1
+	def up(self, player, seq=None):
+		self.queue_input(player, -1, seq)	# Set movement state, not direct position
 
-	def down(self, player):
-		if player == self.player_1.user_id:
-			self.player_1_move = 1	# Set movement state, not direct position
-		elif player == self.player_2.user_id:
-			self.player_2_move = 1
+	def down(self, player, seq=None):
+		self.queue_input(player, 1, seq)
+
+	def stop(self, player, seq=None):
+		self.queue_input(player, 0, seq)
 
-	def stop(self, player):
+	def player_number(self, player):
 		if player == self.player_1.user_id:
-			self.player_1_move = 0
+			return 1
 		elif player == self.player_2.user_id:
-			self.player_2_move = 0
+			return 2
+		return None
+
+	def queue_input(self, player, move, seq=None):
+		"""
+		Inputs without seq are applied immediately (legacy clients). Tagged
+		inputs are applied in order, one per tick, and acked in snapshots.
+		"""
+		number = self.player_number(player)
+		if number is None:
+			return
+		if seq is None:
+			setattr(self, f'player_{number}_move', move)
+			return
+
+		queue = self.input_queues[number]
+		last_seq = queue[-1][0] if queue else getattr(self, f'player_{number}_input_seq')
+		if last_seq is not None and seq <= last_seq:
+			return	# Duplicate or out of order
+		queue.append((seq, move))
+
+	def apply_inputs(self):
+		"""Apply queued inputs at the start of a tick"""
+		for number, queue in self.input_queues.items():
+			if not queue:
+				continue
+			# Catch up when the client got ahead, so input latency stays bounded
+			while len(queue) > max_input_backlog:
+				queue.popleft()
+			seq, move = queue.popleft()
+			setattr(self, f'player_{number}_move', move)
+			setattr(self, f'player_{number}_input_seq', seq)
+
+		# The moves used by this tick are all a replay needs
+		if self.replay is not None:
+			self.replay.record(self.player_1_move, self.player_2_move)
 
 	def to_dict(self):
 		# ✅ PERFORMANCE: Only send essential game state data to reduce payload size
@@ -347,11 +512,16 @@ class GameState:
 			'player_1_pos': self.to_percent(self.player_1_pos),
 			'player_2_pos': self.to_percent(self.player_2_pos),
 			'ball_pos': self.ball_pos,
-			'ball_speed': self.ball_speed,
+			# The engine speeds the ball up on paddle hits, GameState.ball_speed is only the serve speed
+			'ball_speed': self.physics.engine.ball_speed,
 			'angle': self.angle,
 			# Send ring dimensions only occasionally (they don't change during game)
 			'ring_length': self.ring_length if self.frame_count % 30 == 0 else None,
 			'ring_height': self.ring_height if self.frame_count % 30 == 0 else None,
+			# Reconciliation: server tick and last input seq applied per player
+			'tick': self.tick_count,
+			'player_1_input_seq': self.player_1_input_seq,
+			'player_2_input_seq': self.player_2_input_seq,
 		}
 
 	
@@ -373,16 +543,59 @@ class GameState:
 		print(f"Game {getattr(self, 'game_id', 'unknown')} quit by player {player_id}")
 		if hasattr(self, 'running'):
 			self.running = False
+		# Matches still in the game loop release their physics in game_end()
+		if hasattr(self, 'physics') and getattr(self, 'game_id', None) not in game_loop:
+			self.physics.release()
 		#TODO: implement forfeit logic - set quitting player score to 0 and opponent to 5
 
 
 
-@receiver(post_save, sender=Game)
-def start_game(sender, instance, created, **kwargs):
+def notify_game_created(game):
+	"""Tell both players of a new game through the notification service"""
 	from .notification import SendNotificationSync, ImmediateNotification
 	from .serializer import PlayerSerializer
 	logger = logging.getLogger(__name__)
 
+	# Prepare notification data
+	notification_data = {
+		'type': 'game_created',
+		'game_id': game.id,
+		'player_1': PlayerSerializer(game.player_1).data,
+		'player_2': PlayerSerializer(game.player_2).data,
+		'tournament_id': getattr(game.tournament_id, 'id', None) if game.tournament_id else None
+	}
+
+	# Send notification to player 1
+	try:
+		notification_p1 = ImmediateNotification(
+			Sender='Pong',
+			message=notification_data,
+			user_id=game.player_1.user_id
+		)
+		SendNotificationSync(notification_p1)
+		logger.info(f'✅ Game notification sent to player 1 (ID: {game.player_1.user_id}) for game {game.id}')
+	except Exception as e:
+		logger.error(f'❌ Failed to send game notification to player 1 (ID: {game.player_1.user_id if game.player_1 else "None"}): {str(e)}')
+		print(f"❌ Error sending notification to player 1: {str(e)}")
+
+	# Send notification to player 2
+	try:
+		notification_p2 = ImmediateNotification(
+			Sender='Pong',
+			message=notification_data,
+			user_id=game.player_2.user_id
+		)
+		SendNotificationSync(notification_p2)
+		logger.info(f'✅ Game notification sent to player 2 (ID: {game.player_2.user_id}) for game {game.id}')
+	except Exception as e:
+		logger.error(f'❌ Failed to send game notification to player 2 (ID: {game.player_2.user_id if game.player_2 else "None"}): {str(e)}')
+		print(f"❌ Error sending notification to player 2: {str(e)}")
+
+
+@receiver(post_save, sender=Game)
+def start_game(sender, instance, created, **kwargs):
+	logger = logging.getLogger(__name__)
+
 	if created:
 		# Check if both players are set
 		if not instance.player_1 or not instance.player_2:
@@ -394,42 +607,7 @@ def start_game(sender, instance, created, **kwargs):
 			return
 
 		logger.info(f'🎮 Creating new game {instance.id} between player {instance.player_1.user_id} and player {instance.player_2.user_id}')
-
-		# Prepare notification data
-		notification_data = {
-			'type': 'game_created',
-			'game_id': instance.id,
-			'player_1': PlayerSerializer(instance.player_1).data,
-			'player_2': PlayerSerializer(instance.player_2).data,
-			'tournament_id': getattr(instance.tournament_id, 'id', None) if instance.tournament_id else None
-		}
-
-		# Send notification to player 1
-		try:
-			notification_p1 = ImmediateNotification(
-				Sender='Pong',
-				message=notification_data,
-				user_id=instance.player_1.user_id
-			)
-			SendNotificationSync(notification_p1)
-			logger.info(f'✅ Game notification sent to player 1 (ID: {instance.player_1.user_id}) for game {instance.id}')
-		except Exception as e:
-			logger.error(f'❌ Failed to send game notification to player 1 (ID: {instance.player_1.user_id if instance.player_1 else "None"}): {str(e)}')
-			print(f"❌ Error sending notification to player 1: {str(e)}")
-
-		# Send notification to player 2
-		try:
-			notification_p2 = ImmediateNotification(
-				Sender='Pong',
-				message=notification_data,
-				user_id=instance.player_2.user_id
-			)
-			SendNotificationSync(notification_p2)
-			logger.info(f'✅ Game notification sent to player 2 (ID: {instance.player_2.user_id}) for game {instance.id}')
-		except Exception as e:
-			logger.error(f'❌ Failed to send game notification to player 2 (ID: {instance.player_2.user_id if instance.player_2 else "None"}): {str(e)}')
-			print(f"❌ Error sending notification to player 2: {str(e)}")
-
+		notify_game_created(instance)
 		logger.info(f'✅ Game {instance.id} created successfully')
 
 	else:
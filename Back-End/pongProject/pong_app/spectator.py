@@ -0,0 +1,128 @@
+"""
+Spectator fan-out
+
+Spectators do not join the players' `game_{id}` group. The game loop only
+writes the latest state of a match into a per-match buffer (O(1), no I/O);
+a separate task samples the buffers at `rate` Hz, encodes each changed frame
+once with interpolation hints and sends it to the `spectate_{id}` group.
+The cost for the tick loop does not depend on the number of viewers.
+"""
+import asyncio
+import json
+import logging
+import math
+import time
+
+from channels.layers import get_channel_layer
+
+logger = logging.getLogger('pong_app')
+
+
+def spectator_group(game_id):
+	return f'spectate_{game_id}'
+
+
+class MatchBuffer:
+	"""Latest published state of one match and the last sample sent to spectators"""
+
+	__slots__ = ('state', 'version', 'published_at', 'sent_version', 'sent_state', 'sent_at')
+
+	def __init__(self):
+		self.state = None
+		self.version = 0
+		self.published_at = 0.0
+		self.sent_version = 0
+		self.sent_state = None
+		self.sent_at = 0.0
+
+
+class SpectatorBroadcaster:
+	"""Downsampled, read-only game state stream for spectators"""
+
+	def __init__(self, rate=10, tick_rate=30):
+		self.rate = rate
+		self.interval = 1 / rate
+		self.tick_rate = tick_rate
+		self.buffers = {}		# game_id -> MatchBuffer
+		self._task = None
+
+	def publish(self, game_id, state):
+		"""Called from the game loop: only stores a reference to the latest state"""
+		buffer = self.buffers.get(game_id)
+		if buffer is None:
+			buffer = self.buffers[game_id] = MatchBuffer()
+		buffer.state = state
+		buffer.version += 1
+		buffer.published_at = time.time()
+		if self._task is None or self._task.done():
+			self._task = asyncio.create_task(self._run())
+
+	async def end(self, game_id, message):
+		"""Stop streaming a match and tell its spectators how it ended"""
+		self.buffers.pop(game_id, None)
+		try:
+			await get_channel_layer().group_send(spectator_group(game_id), {
+				'type': 'spectator_game_over',
+				'text': json.dumps(dict(message, type='game_over', game_id=game_id)),
+			})
+		except Exception as e:
+			logger.error(f"Error sending spectator game over for game {game_id}: {e}")
+
+	async def _run(self):
+		logger.info(f"Spectator fan-out started at {self.rate} Hz")
+		channel_layer = get_channel_layer()
+		while self.buffers:
+			started = time.monotonic()
+			await self.fan_out(channel_layer)
+			await asyncio.sleep(max(0, self.interval - (time.monotonic() - started)))
+		logger.info("Spectator fan-out stopped, no active matches")
+
+	async def fan_out(self, channel_layer):
+		"""Send one frame per match whose state changed since the last sample"""
+		sends = []
+		for game_id, buffer in list(self.buffers.items()):
+			if buffer.state is None or buffer.version == buffer.sent_version:
+				continue
+			text = json.dumps(self.build_frame(game_id, buffer))
+			buffer.sent_version = buffer.version
+			buffer.sent_state = buffer.state
+			buffer.sent_at = buffer.published_at
+			sends.append(channel_layer.group_send(spectator_group(game_id), {
+				'type': 'spectator_frame',
+				'text': text,
+			}))
+		if sends:
+			results = await asyncio.gather(*sends, return_exceptions=True)
+			for result in results:
+				if isinstance(result, Exception):
+					logger.error(f"Error sending spectator frame: {result}")
+
+	def build_frame(self, game_id, buffer):
+		"""Frame plus the hints a client needs to interpolate until the next one"""
+		state = buffer.state
+		radians = math.radians(state['angle'])
+		ball_speed = state['ball_speed'] * self.tick_rate	# units per second
+		paddle_velocity = [0.0, 0.0]
+		previous = buffer.sent_state
+		elapsed = buffer.published_at - buffer.sent_at
+		if previous is not None and elapsed > 0:
+			paddle_velocity = [
+				(state['player_1_pos'][1] - previous['player_1_pos'][1]) / elapsed,
+				(state['player_2_pos'][1] - previous['player_2_pos'][1]) / elapsed,
+			]
+
+		return {
+			'type': 'spectator_frame',
+			'game_id': game_id,
+			'game_state': state,
+			'interpolation': {
+				'server_time': buffer.published_at,
+				'interval_ms': round(self.interval * 1000),
+				'ball_velocity': [ball_speed * math.cos(radians), -ball_speed * math.sin(radians)],
+				'paddle_velocity': paddle_velocity,	# percent of ring height per second
+			},
+		}
+
+
+# Global spectator fan-out instance (10 Hz)
+spectator_broadcast = SpectatorBroadcaster(rate=10)
@@ -10,11 +10,14 @@ import json
 import pytest
 from django.test import TestCase, TransactionTestCase
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from channels.db import database_sync_to_async
 from channels.testing import WebsocketCommunicator
 
 from .redis_tournament_manager import redis_tournament_manager, RedisTournamentState
-from .redis_backed_tournament_manager import redis_backed_tournament_manager, RedisBackedTournamentState
-from .models import Tournament, UserProfile
+from .redis_backed_tournament_manager import redis_backed_tournament_manager, RedisBackedTournamentManager, RedisBackedTournamentState
+from .models import Game, Tournament, UserProfile
 
 
 class RedisTournamentManagerTest(TransactionTestCase):
@@ -22,6 +25,12 @@ class RedisTournamentManagerTest(TransactionTestCase):
     
     def setUp(self):
         """Set up test data"""
+        # Each test runs its own event loop: start from a fresh Redis client
+        # and forget tournaments coordinated in a previous loop
+        redis_tournament_manager._init_redis()
+        redis_backed_tournament_manager.managed.clear()
+        redis_backed_tournament_manager.leases.clear()
+        
         # Create test users
         self.user1 = UserProfile.objects.create(
             user_id=1,
@@ -184,6 +193,8 @@ class RedisTournamentManagerTest(TransactionTestCase):
     
     def test_async_round_management(self):
         """Test round progression"""
+        Tournament.objects.create(id=103, name="Round Test Tournament", max_partecipants=4, creator=self.user1)
+        
         async def async_test():
             # Create and start tournament
             tournament = await redis_backed_tournament_manager.create_tournament(
@@ -224,8 +235,41 @@ class RedisTournamentManagerTest(TransactionTestCase):
         
         asyncio.run(async_test())
     
+    def test_round_without_games_is_rolled_back(self):
+        """Test a round whose games cannot be created can be started again"""
+        async def async_test():
+            tournament = await redis_backed_tournament_manager.create_tournament(
+                tournament_id=105,
+                name="Rollback Test Tournament",
+                max_players=4,
+                creator_id=1
+            )
+            for user_id in (1, 2, 3, 4):
+                await tournament.add_player({'user_id': user_id})
+            await tournament.start()
+            
+            # No Tournament row yet: the games cannot be created
+            result = await tournament.start_round()
+            self.assertEqual(result['type'], 'error')
+            self.assertEqual(await tournament.get_current_round(), 0)
+            self.assertTrue(await tournament.can_start_next_round())
+            
+            await database_sync_to_async(Tournament.objects.create)(
+                id=105, name="Rollback Test Tournament", max_partecipants=4, creator_id=1
+            )
+            result = await tournament.start_round()
+            self.assertEqual(result['type'], 'success')
+            self.assertEqual(await tournament.get_current_round(), 1)
+            self.assertEqual(len(await tournament.redis_state.get_active_games()), 2)
+            
+            await redis_backed_tournament_manager.remove_tournament(105)
+        
+        asyncio.run(async_test())
+    
     def test_async_game_result_registration(self):
         """Test game result registration and round completion"""
+        Tournament.objects.create(id=104, name="Game Result Test Tournament", max_partecipants=4, creator=self.user1)
+        
         async def async_test():
             # Create and start tournament
             tournament = await redis_backed_tournament_manager.create_tournament(
@@ -319,6 +363,78 @@ class RedisTournamentManagerTest(TransactionTestCase):
         
         asyncio.run(async_test())
     
+    def test_snapshot(self):
+        """Test the pipelined snapshot agrees with the single-field getters"""
+        async def async_test():
+            tournament = await redis_backed_tournament_manager.create_tournament(
+                tournament_id=107,
+                name="Snapshot Test Tournament",
+                max_players=4,
+                creator_id=1
+            )
+            await tournament.add_player({'user_id': 1})
+            await tournament.add_player({'user_id': 2})
+            await tournament.add_player({'user_id': 3})
+            await tournament.start()
+            
+            snapshot = await tournament.snapshot()
+            self.assertEqual(snapshot.name, "Snapshot Test Tournament")
+            self.assertEqual(snapshot.max_p, 4)
+            self.assertEqual(snapshot.players, (1, 2, 3))
+            self.assertEqual(snapshot.nbr_player, await tournament.get_nbr_player())
+            self.assertEqual(snapshot.status, 'active')
+            self.assertTrue(snapshot.initialized)
+            self.assertEqual(set(snapshot.next_round_players), {1, 2, 3})
+            self.assertEqual(set(snapshot.brackets[0]), {1, 2, 3})
+            
+            brackets = await tournament.get_brackets()
+            self.assertEqual(brackets['players'], [1, 2, 3])
+            self.assertEqual(brackets['current_partecipants'], 3)
+            json.dumps(brackets)
+            
+            # Clean up
+            await redis_backed_tournament_manager.remove_tournament(107)
+            self.assertIsNone(await tournament.snapshot())
+        
+        asyncio.run(async_test())
+    
+    def test_single_coordinator(self):
+        """Test only one process coordinates a tournament and another takes over"""
+        async def async_test():
+            other_pod = RedisBackedTournamentManager()
+            other_pod.owner_id = "other-pod:1"
+            
+            tournament = await redis_backed_tournament_manager.create_tournament(
+                tournament_id=106,
+                name="Coordinator Test Tournament",
+                max_players=4,
+                creator_id=1
+            )
+            self.assertIn(106, redis_backed_tournament_manager.managed)
+            
+            # The other pod sees the lease and stays passive
+            other = RedisBackedTournamentState(tournament.redis_state, other_pod)
+            self.assertFalse(await other_pod.manage(other))
+            result = await other.start_round()
+            self.assertEqual(result['type'], 'error')
+            
+            # Once the lease is released the other pod takes over with a newer token
+            old_lease = redis_backed_tournament_manager.lease_of(106)
+            await redis_backed_tournament_manager.unmanage(106)
+            self.assertTrue(await other_pod.manage(other))
+            new_lease = other_pod.lease_of(106)
+            self.assertGreater(int(new_lease.rsplit('|', 1)[1]), int(old_lease.rsplit('|', 1)[1]))
+            
+            # Writes fenced with the old lease are refused
+            round_data = await tournament.redis_state.begin_round(fence=old_lease)
+            self.assertEqual(round_data['status'], 'fenced')
+            
+            # Clean up
+            await other_pod.unmanage(106)
+            await redis_backed_tournament_manager.remove_tournament(106)
+        
+        asyncio.run(async_test())
+    
     def test_tournament_not_found(self):
         """Test retrieval of non-existent tournament"""
         async def async_test():
@@ -384,6 +500,24 @@ class RedisTournamentIntegrationTest(TransactionTestCase):
             await redis_backed_tournament_manager.remove_tournament(200)
         
         asyncio.run(async_test())
+    
+    def test_round_games_created_in_one_batch(self):
+        """Test a round's games cost one profile lookup and one INSERT"""
+        tournament = RedisBackedTournamentState(RedisTournamentState(200, redis_tournament_manager))
+        create_round_games = vars(RedisBackedTournamentState)['_create_round_games'].func
+        
+        # Profiles, tournament check, INSERT; the match with an unknown player is skipped
+        with CaptureQueriesContext(connection) as queries:
+            games, walkovers = create_round_games(tournament, [[2, 10, 11], [3, 11, 99]])
+        statements = [query['sql'].split()[0] for query in queries.captured_queries]
+        self.assertEqual([verb for verb in statements if verb in ('SELECT', 'INSERT')], ['SELECT', 'SELECT', 'INSERT'])
+        
+        self.assertEqual(len(games), 1)
+        self.assertEqual(walkovers, [11])
+        self.assertEqual(games[0]['slot'], 2)
+        self.assertEqual(games[0]['player_2_username'], "integration_player2")
+        game = Game.objects.get(id=games[0]['game_id'])
+        self.assertEqual((game.player_1_id, game.player_2_id, game.tournament_id_id), (10, 11, 200))
 
 
 if __name__ == '__main__':
@@ -1,5 +1,10 @@
 
-from django.test import TestCase, Client
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from django.test import SimpleTestCase, TestCase, Client, override_settings
 
 class PongAppURLTests(TestCase):
     def setUp(self):
@@ -56,3 +61,1011 @@ class PongAppURLTests(TestCase):
     def test_health_check(self):
         response = self.client.get('/pong/health')
         self.assertIn(response.status_code, [200, 401, 403])
+
+
+class FakeGame:
+    def __init__(self, game_id, ticks_to_play):
+        self.game_id = game_id
+        self.running = True
+        self.ticks_to_play = ticks_to_play
+        self.ticks = 0
+        self.updates = 0
+        self.ended = False
+        self.physics = SimpleNamespace(batch=None)
+
+    def tick(self):
+        self.ticks += 1
+        if self.ticks >= self.ticks_to_play:
+            self.running = False
+
+    async def update(self):
+        self.updates += 1
+
+    async def game_end(self):
+        self.ended = True
+
+
+class GameLoopSchedulerTests(SimpleTestCase):
+    def test_steps_all_games_from_one_task(self):
+        from .game_loop import GameLoopScheduler
+
+        async def run():
+            scheduler = GameLoopScheduler(tick_rate=200)
+            short_game = FakeGame(1, ticks_to_play=3)
+            long_game = FakeGame(2, ticks_to_play=10)
+            scheduler.add(short_game)
+            scheduler.add(long_game)
+            await asyncio.wait_for(scheduler._task, timeout=5)
+            await asyncio.sleep(0)
+            return scheduler, short_game, long_game
+
+        scheduler, short_game, long_game = asyncio.run(run())
+        self.assertEqual(short_game.ticks, 3)
+        self.assertEqual(long_game.ticks, 10)
+        self.assertTrue(short_game.ended and long_game.ended)
+        self.assertGreaterEqual(long_game.updates, 1)
+        self.assertEqual(len(scheduler.games), 0)
+        self.assertGreater(scheduler.get_metrics()['ticks'], 0)
+
+
+class VectorizedPhysicsTests(SimpleTestCase):
+    def test_batch_step_matches_modern_engine_bit_for_bit(self):
+        from physics_engines.modern_physics import ModernPhysicsEngine
+        from physics_engines.vectorized_physics import VectorizedPhysicsEngine
+
+        rng = random.Random(42)
+        batch = VectorizedPhysicsEngine(capacity=2)  # Forces growth while allocating
+        pairs = []
+        for _ in range(5):
+            reference = ModernPhysicsEngine()
+            match = batch.allocate()
+            angle = rng.uniform(-70, 70)
+            reference.angle = angle
+            match.angle = angle
+            pairs.append((reference, match))
+
+        for step in range(3000):
+            for reference, match in pairs:
+                paddle_y = rng.uniform(-35, 35)
+                reference.player_1_pos.y = match.player_1_pos.y = paddle_y
+                reference.player_2_pos.y = match.player_2_pos.y = -paddle_y
+                match.schedule()
+            batch.step()
+
+            for reference, match in pairs:
+                expected = reference.physics_step()
+                self.assertEqual(match.last_result, expected)
+                self.assertEqual(
+                    (match.ball_pos.x, match.ball_pos.y, match.angle, match.ball_speed, match.wall_hit_pos),
+                    (reference.ball_pos.x, reference.ball_pos.y, reference.angle, reference.ball_speed, reference.wall_hit_pos),
+                    f"diverged at step {step}"
+                )
+                if expected:
+                    angle = rng.uniform(110, 250)
+                    reference.reset_ball(angle)
+                    match.reset_ball(angle)
+
+    def play_match(self, engine_type, seed):
+        """Ball state after every tick of a whole match, stepped by a game loop"""
+        from .game_loop import GameLoopScheduler
+        from .signals import GameState
+
+        scheduler = GameLoopScheduler()
+        game = GameState(SimpleNamespace(user_id=1), SimpleNamespace(user_id=2), seed, 20, None, seed=seed, engine_type=engine_type)
+        game.reset_ball(game.initial_angle())
+        game.running = True
+        scheduler.games[game.game_id] = game
+        moves = random.Random(seed)
+        states = []
+        try:
+            while game.running:
+                game.player_1_move = moves.choice((-1, 0, 1))
+                game.player_2_move = moves.choice((-1, 0, 1))
+                scheduler._step_all({})
+                states.append((*game.ball_pos, game.angle, game.player_1_score, game.player_2_score))
+        finally:
+            game.physics.release()
+        return states
+
+    def test_whole_matches_match_the_modern_engine(self):
+        for seed in (3, 11, 2024):
+            modern = self.play_match('modern', seed)
+            vectorized = self.play_match('vectorized', seed)
+            self.assertIn(5, modern[-1][3:])
+            for tick, (expected, state) in enumerate(zip(modern, vectorized)):
+                self.assertEqual(state, expected, f"seed {seed} diverged at tick {tick}")
+            self.assertEqual(len(vectorized), len(modern))
+
+    def test_released_rows_are_reused(self):
+        from physics_engines.vectorized_physics import VectorizedPhysicsEngine
+
+        batch = VectorizedPhysicsEngine(capacity=4)
+        first = batch.allocate()
+        second = batch.allocate()
+        first.release()
+        first.release()
+        third = batch.allocate()
+        self.assertEqual(third.row, first.row)
+        self.assertEqual(batch.active_matches, 2)
+        self.assertEqual(second.ball_pos.x, 0)
+
+
+class ContinuousCollisionTests(SimpleTestCase):
+    def shoot(self, engine, speed, paddle_offset):
+        """Fire the ball at player 1's paddle and report bounce or score"""
+        engine.ball_pos.x, engine.ball_pos.y = 0, 10
+        engine.player_1_pos.y = 10 + paddle_offset
+        engine.angle = 180
+        engine.ball_speed = speed
+        for _ in range(100):
+            if engine.physics_step(ball_acc=0):
+                return 'scored'
+            if -90 < engine.angle < 90:
+                return 'bounced'
+        return None
+
+    def test_fast_balls_do_not_tunnel_through_paddles(self):
+        from physics_engines.modern_physics import ModernPhysicsEngine
+
+        tunnelled = 0
+        for speed in (3, 7, 13, 40, 100):
+            for offset in (-11, -5, 0, 6, 11):
+                self.assertEqual(self.shoot(ModernPhysicsEngine(ccd=True), speed, offset), 'bounced', (speed, offset))
+                tunnelled += self.shoot(ModernPhysicsEngine(), speed, offset) == 'scored'
+        self.assertGreater(tunnelled, 0)  # The discrete step misses some of these
+        self.assertEqual(self.shoot(ModernPhysicsEngine(ccd=True), 40, 20), 'scored')
+
+    def test_slow_balls_use_the_discrete_step(self):
+        from physics_engines.modern_physics import ModernPhysicsEngine
+
+        rng = random.Random(7)
+        discrete, ccd = ModernPhysicsEngine(), ModernPhysicsEngine(ccd=True)
+        for engine in (discrete, ccd):
+            engine.angle = 30
+        for _ in range(2000):
+            paddle_y = rng.uniform(-35, 35)
+            for engine in (discrete, ccd):
+                engine.player_1_pos.y = engine.player_2_pos.y = paddle_y
+            self.assertEqual(discrete.physics_step(ball_acc=0), ccd.physics_step(ball_acc=0))
+            self.assertEqual((discrete.ball_pos, discrete.angle), (ccd.ball_pos, ccd.angle))
+
+
+class PhysicsBenchmarkTests(SimpleTestCase):
+    def report(self, us_per_step, matches_per_core, bytes_per_match=400, checksum='a'):
+        return {
+            'version': 1,
+            'meta': {'calibration_us': 1000.0},
+            'micro': {'modern': {'rally': {'min_us_per_step': us_per_step, 'checksum': checksum}}},
+            'throughput': {'modern': {'matches_per_core': matches_per_core}},
+            'memory': {'modern': {'bytes_per_match': bytes_per_match}},
+        }
+
+    def test_compare_flags_cpu_regressions_above_threshold(self):
+        from physics_engines.benchmark_physics import compare_reports
+
+        baseline = self.report(4.0, 9000)
+        noise = compare_reports(baseline, self.report(4.2, 8700), threshold=0.10)
+        self.assertEqual(noise['regressions'], [])
+
+        slower = compare_reports(baseline, self.report(4.8, 7500, checksum='b'), threshold=0.10)
+        self.assertEqual(slower['regressions'], ['micro.modern.rally', 'throughput.modern'])
+        self.assertEqual(slower['behaviour_changes'], ['modern.rally'])
+
+    def test_scenarios_are_deterministic_across_engines(self):
+        from physics_engines.benchmark_physics import SCENARIOS, engine_factories, micro_benchmark
+
+        factories = engine_factories(['modern', 'vectorized'])
+        for scenario in SCENARIOS.values():
+            modern, vectorized = (micro_benchmark(factories[name], scenario, 300, 2) for name in ('modern', 'vectorized'))
+            self.assertEqual(modern['checksum'], vectorized['checksum'], scenario.name)
+            self.assertGreater(modern['bounces'] + modern['scores'], 0)
+
+
+class WireProtocolTests(SimpleTestCase):
+    def state(self, **overrides):
+        state = {
+            'player_1_score': 2,
+            'player_2_score': 3,
+            'player_1_pos': [-60, 41.25],
+            'player_2_pos': [60, 58.5],
+            'ball_pos': [12.345, -7.5],
+            'ball_speed': 1.3,
+            'angle': 200.0,
+        }
+        state.update(overrides)
+        return state
+
+    def test_keyframe_round_trip(self):
+        from . import wire_protocol
+
+        snapshot = wire_protocol.quantize(self.state())
+        frame = wire_protocol.encode(10, snapshot)
+        self.assertEqual(len(frame), wire_protocol.HEADER.size + 2 * len(wire_protocol.FIELDS))
+        self.assertEqual(wire_protocol.decode(frame), (10, snapshot))
+
+        values = wire_protocol.dequantize(snapshot)
+        self.assertEqual(values['player_2_score'], 3)
+        self.assertAlmostEqual(values['ball_x'], 12.34)
+        self.assertAlmostEqual(values['angle'], -160.0)
+
+    def test_stream_sends_deltas_against_acked_snapshot(self):
+        from . import wire_protocol
+
+        stream = wire_protocol.BinaryStateStream()
+        client = {}
+
+        first = wire_protocol.quantize(self.state())
+        seq, decoded = wire_protocol.decode(stream.encode(2, first))
+        client[seq] = decoded
+        self.assertTrue(stream.ack(seq))
+
+        # Only the ball moved: the delta carries two fields
+        second = wire_protocol.quantize(self.state(ball_pos=[13.0, -8.0]))
+        frame = stream.encode(4, second)
+        self.assertEqual(len(frame), wire_protocol.HEADER.size + 4)
+        self.assertEqual(wire_protocol.decode(frame, client), (4, second))
+
+        # Unknown and stale acks are ignored
+        self.assertFalse(stream.ack(99))
+        self.assertTrue(stream.ack(4))
+        self.assertFalse(stream.ack(2))
+        self.assertEqual(stream.acked_seq, 4)
+
+    def test_connections_share_pre_encoded_frames(self):
+        from . import wire_protocol
+
+        first = wire_protocol.quantize(self.state())
+        second = wire_protocol.quantize(self.state(angle=10.0))
+        keyframe = wire_protocol.encode(2, first)
+        streams = [wire_protocol.BinaryStateStream() for _ in range(3)]
+
+        for stream in streams:
+            self.assertIs(stream.encode(2, first, keyframe=keyframe, cache_key='match'), keyframe)
+            stream.ack(2)
+
+        misses = wire_protocol.delta_frames.misses
+        frames = [stream.encode(4, second, keyframe=keyframe, cache_key='match') for stream in streams]
+        self.assertTrue(all(frame is frames[0] for frame in frames))
+        self.assertEqual(wire_protocol.delta_frames.misses, misses + 1)
+
+
+class FakeChannelLayer:
+    def __init__(self):
+        self.sent = []
+
+    async def group_send(self, group, message):
+        self.sent.append((group, message))
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class SpectatorTests(SimpleTestCase):
+    def state(self, paddle_y=50):
+        return {
+            'player_1_score': 0,
+            'player_2_score': 1,
+            'player_1_pos': [-60, paddle_y],
+            'player_2_pos': [60, 50],
+            'ball_pos': [0, 0],
+            'ball_speed': 1.0,
+            'angle': 0,
+        }
+
+    def test_fan_out_sends_changed_matches_once_with_hints(self):
+        from .spectator import SpectatorBroadcaster
+
+        broadcaster = SpectatorBroadcaster(rate=10, tick_rate=30)
+        layer = FakeChannelLayer()
+
+        async def run():
+            # Drive fan_out() by hand instead of the background task
+            broadcaster._task = asyncio.get_running_loop().create_future()
+            broadcaster.publish(1, self.state())
+            broadcaster.publish(2, self.state())
+            await broadcaster.fan_out(layer)
+            broadcaster.publish(1, self.state(paddle_y=60))
+            broadcaster.buffers[1].published_at = broadcaster.buffers[1].sent_at + 0.5
+            await broadcaster.fan_out(layer)
+
+        asyncio.run(run())
+        self.assertEqual([group for group, _ in layer.sent], ['spectate_1', 'spectate_2', 'spectate_1'])
+        frame = json.loads(layer.sent[-1][1]['text'])
+        self.assertEqual(frame['type'], 'spectator_frame')
+        self.assertEqual(frame['interpolation']['interval_ms'], 100)
+        self.assertEqual(frame['interpolation']['ball_velocity'], [30.0, -0.0])
+        self.assertAlmostEqual(frame['interpolation']['paddle_velocity'][0], 20.0)
+
+    def test_ball_velocity_follows_the_engine(self):
+        from .signals import GameState
+        from .spectator import MatchBuffer, SpectatorBroadcaster
+
+        game = GameState(SimpleNamespace(user_id=1), SimpleNamespace(user_id=2), 1, 20, None)
+        game.angle = 0
+        game.physics.engine.ball_speed = 2.0  # Sped up by paddle hits
+        buffer = MatchBuffer()
+        buffer.state = game.to_dict()
+        frame = SpectatorBroadcaster(rate=10, tick_rate=30).build_frame(1, buffer)
+        self.assertEqual(frame['interpolation']['ball_velocity'], [60.0, -0.0])
+
+    def test_spectator_is_read_only(self):
+        from channels.testing import WebsocketCommunicator
+        from channels.layers import get_channel_layer
+        from .consumers import SpectatorConsumer, active_games, player_ready
+
+        async def run():
+            communicator = WebsocketCommunicator(SpectatorConsumer.as_asgi(), '/pong/ws/pong/7/spectate/')
+            communicator.scope['url_route'] = {'kwargs': {'room_id': '7'}}
+            communicator.scope['user'] = SimpleNamespace(user_id=42)
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            welcome = await communicator.receive_json_from()
+
+            await communicator.send_json_to({'type': 'player_ready'})
+            await get_channel_layer().group_send('spectate_7', {'type': 'spectator_frame', 'text': '{"type": "spectator_frame"}'})
+            frame = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return welcome, frame
+
+        welcome, frame = asyncio.run(run())
+        self.assertEqual(welcome['type'], 'spectator_connection_success')
+        self.assertEqual(frame['type'], 'spectator_frame')
+        self.assertNotIn('7', player_ready)
+        self.assertNotIn('7', active_games)
+
+
+class InputSequenceTests(SimpleTestCase):
+    def make_game(self):
+        from .signals import GameState
+        return GameState(SimpleNamespace(user_id=1), SimpleNamespace(user_id=2), 1, 20, None)
+
+    def test_tagged_inputs_are_applied_one_per_tick_and_acked(self):
+        game = self.make_game()
+        game.up(1, seq=1)
+        game.stop(1, seq=2)
+        game.up(1, seq=2)  # Duplicate
+        game.down(2)  # Legacy client: applied immediately, no ack
+        self.assertEqual(game.player_2_move, 1)
+        self.assertEqual(game.player_1_move, 0)
+
+        game.tick()
+        self.assertEqual((game.player_1_move, game.player_1_input_seq), (-1, 1))
+        game.tick()
+        self.assertEqual((game.player_1_move, game.player_1_input_seq), (0, 2))
+
+        state = game.to_dict()
+        self.assertEqual(state['tick'], 2)
+        self.assertEqual(state['player_1_input_seq'], 2)
+        self.assertIsNone(state['player_2_input_seq'])
+
+    def test_input_backlog_is_caught_up(self):
+        from .signals import max_input_backlog
+
+        game = self.make_game()
+        for seq in range(1, max_input_backlog + 4):
+            game.up(1, seq=seq)
+        game.tick()
+        self.assertEqual(len(game.input_queues[1]), max_input_backlog - 1)
+        self.assertEqual(game.player_1_input_seq, 4)
+
+    def test_acks_are_in_binary_snapshots(self):
+        from . import wire_protocol
+
+        game = self.make_game()
+        game.stop(2, seq=70000)
+        game.tick()
+        values = wire_protocol.dequantize(wire_protocol.quantize(game.to_dict()))
+        self.assertEqual(values['player_2_input_seq'], 70000 % wire_protocol.SEQ_MODULO)
+        self.assertEqual(values['player_1_input_seq'], 0)
+        self.assertEqual(values['tick'], 1)
+
+
+class ReplayTests(SimpleTestCase):
+    def test_recorded_match_re_simulates_identically(self):
+        import tempfile
+        from .signals import GameState
+        from . import replay
+
+        with tempfile.TemporaryDirectory() as replay_dir, override_settings(PONG_REPLAY_DIR=replay_dir):
+            game = GameState(SimpleNamespace(user_id=1), SimpleNamespace(user_id=2), 9, 20, None, seed=1234)
+            game.angle = game.initial_angle()
+            game.ball_speed = 1.0
+            game.running = True
+            path = game.start_replay()
+
+            moves = random.Random(5)
+            for _ in range(3000):
+                game.player_1_move = moves.choice((-1, 0, 1))
+                game.player_2_move = moves.choice((-1, 0, 1))
+                game.tick()
+                if not game.running:
+                    break
+            final_ball = tuple(game.ball_pos)
+            game.replay.close({'player_1_score': game.player_1_score, 'player_2_score': game.player_2_score})
+            game.physics.release()
+
+            recording = replay.load(path)
+            self.assertEqual(recording.ticks, game.tick_count)
+            self.assertEqual(recording.header['seed'], 1234)
+
+            positions = []
+            result = replay.simulate(recording, on_tick=lambda tick, sim: positions.append(tuple(sim.ball_pos)))
+            self.assertTrue(result['matches_recording'])
+            self.assertGreater(game.player_1_score + game.player_2_score, 0)
+            self.assertEqual(positions[-1], final_ball)
+            self.assertIsNone(replay.find_divergence(recording, 'modern', 'modern'))
+
+
+class MatchRegistryTests(SimpleTestCase):
+    def test_local_mode_keeps_single_process_behaviour(self):
+        from .match_registry import MatchRegistry
+
+        registry = MatchRegistry()
+        self.assertFalse(registry.enabled)  # PONG_MATCH_SHARDING is off under test
+
+        async def run():
+            counts = [await registry.mark_ready('5', 1), await registry.mark_ready('5', 1), await registry.mark_ready('5', 2)]
+            claimed = await registry.claim('5')
+            forwarded = await registry.forward('5', 'up', 1)
+            return counts, claimed, forwarded
+
+        counts, claimed, forwarded = asyncio.run(run())
+        self.assertEqual(counts, [1, 1, 2])
+        self.assertTrue(claimed)
+        self.assertFalse(forwarded)
+        self.assertNotIn('5', registry.local_ready)
+        self.assertTrue(registry.owns('5'))
+
+    def test_actions_apply_to_local_matches_only(self):
+        from .match_registry import MatchRegistry
+        from .signals import GameState
+
+        registry = MatchRegistry()
+        game = GameState(SimpleNamespace(user_id=1), SimpleNamespace(user_id=2), '6', 20, None)
+        game.running = True
+        registry.local_games['6'] = game
+
+        self.assertTrue(registry.apply_action('6', 'down', 2))
+        self.assertEqual(game.player_2_move, 1)
+        self.assertFalse(registry.apply_action('7', 'down', 2))
+
+        checkpoint = registry.checkpoint(game)
+        self.assertEqual(checkpoint['player_2_score'], 0)
+        json.dumps(checkpoint)
+
+        self.assertTrue(registry.apply_action('6', 'quit_game', 1))
+        self.assertFalse(game.running)
+        self.assertNotIn('6', registry.local_games)
+        game.physics.release()
+
+    def test_resume_restores_the_ball_after_a_bounce(self):
+        from .match_registry import MatchRegistry
+
+        def new_game():
+            from .signals import GameState
+            return GameState(SimpleNamespace(user_id=1), SimpleNamespace(user_id=2), '8', 20, None, seed=8, engine_type='modern')
+
+        game = new_game()
+        game.reset_ball(180)
+        game.player_1_pos[1] = 5
+        game.running = True
+        while game.physics.engine.angle == 180:  # Until player 1 returns the ball
+            game.tick()
+        checkpoint = json.loads(json.dumps(MatchRegistry.checkpoint(game)))
+        self.assertAlmostEqual(checkpoint['angle'], 22.5)
+        self.assertEqual(checkpoint['ball_speed'], 90 / 150 + 0.1)
+
+        resumed = new_game()
+        MatchRegistry.restore(resumed, checkpoint)
+        resumed.running = True
+        for _ in range(60):
+            game.tick()
+            resumed.tick()
+            self.assertEqual(
+                (resumed.ball_pos, resumed.angle, resumed.player_1_score, resumed.player_2_score),
+                (game.ball_pos, game.angle, game.player_1_score, game.player_2_score)
+            )
+        self.assertEqual(resumed.physics.engine.ball_speed, game.physics.engine.ball_speed)
+
+
+
+class FakeRoundState:
+    """Active games of a round, recording the results the tournament registers"""
+    def __init__(self, games):
+        self.tournament_id = 1
+        self.games = games
+        self.results = []
+
+    async def get_active_games(self):
+        return dict(self.games)
+
+    async def record_result(self, game_id, winner, loser=None, forced=False, fence=''):
+        self.results.append((game_id, winner, forced))
+        del self.games[str(game_id)]
+        return {'status': 'recorded', 'remaining': len(self.games)}
+
+    async def get_current_round(self):
+        return 1
+
+    async def _get_data(self):
+        return {}
+
+
+class PresenceTests(SimpleTestCase):
+    def test_local_mode_counts_sockets(self):
+        from .presence import PresenceIndex
+
+        index = PresenceIndex()
+        self.assertFalse(index.enabled)  # PONG_PRESENCE is off under test
+
+        async def run():
+            await index.connect(1)
+            await index.connect(1)  # game and tournament socket
+            await index.connect(2)
+            await index.disconnect(1)
+            await index.disconnect(2)
+            return await index.online([1, 2, 3, 1])
+
+        self.assertEqual(asyncio.run(run()), {1: True, 2: False, 3: False})
+        self.assertEqual(index.local_sessions, {1: 1})
+
+    def test_absent_players_forfeit(self):
+        from .presence import presence
+        from .redis_backed_tournament_manager import RedisBackedTournamentState
+
+        games = {
+            '10': {'player_1': 1, 'player_2': 2},  # both playing
+            '11': {'player_1': 3, 'player_2': 4},  # player 1 gone
+            '12': {'player_1': 5, 'player_2': 6},  # both gone
+        }
+        state = FakeRoundState(games)
+        tournament = RedisBackedTournamentState(state)
+
+        async def run():
+            for player in (1, 2, 4):
+                await presence.connect(player)
+            try:
+                forfeits = await tournament.resolve_forfeits()
+                await tournament.handle_round_timeout()
+            finally:
+                for player in (1, 2, 4):
+                    await presence.disconnect(player)
+            return forfeits
+
+        self.assertEqual(asyncio.run(run()), 2)
+        self.assertEqual(state.results, [(11, 4, True), (12, 5, True), (10, 1, True)])
+
+
+class TournamentSnapshotTests(SimpleTestCase):
+    def test_snapshot_from_raw_replies(self):
+        from .bracket import Bracket
+        from .redis_tournament_manager import TournamentSnapshot
+        from .tournament_codec import decode_record
+
+        data = decode_record({
+            'name': 'Cup', 'max_p': '4', 'creator_id': '1', 'players': '[1, 2, 3]', 'nbr_player': '3',
+            'status': 'active', 'initialized': 'True', 'is_complete': 'False', 'current_round': '1',
+            'winner': 'None', 'round_start_time': '2025-01-01T10:00:00',
+        })
+        snapshot = TournamentSnapshot.from_redis(
+            7, data,
+            {'41': json.dumps({'game_id': 41, 'player_1': 2, 'player_2': 3, 'slot': 3}), 'bad': '{'},
+            Bracket.build([1, 2, 3]).to_bytes(),
+        )
+        self.assertEqual(snapshot.players, (1, 2, 3))
+        self.assertEqual(snapshot.nbr_player, 3)
+        self.assertIsNone(snapshot.winner)
+        self.assertIsNone(snapshot.completion_time)
+        self.assertEqual(list(snapshot.active_games), [41])
+        self.assertEqual(snapshot.next_round_players, (1,))
+        self.assertEqual(snapshot.brackets[1], (1, 2, 3))
+        self.assertTrue(snapshot.is_round_active)
+
+    def test_snapshot_is_immutable(self):
+        from dataclasses import FrozenInstanceError
+        from .redis_tournament_manager import TournamentSnapshot
+
+        snapshot = TournamentSnapshot.from_redis(8, {}, {'5': '{"game_id": 5}'}, None)
+        self.assertEqual(snapshot.status, 'pending')
+        self.assertFalse(snapshot.is_round_active)
+        with self.assertRaises(FrozenInstanceError):
+            snapshot.name = 'other'
+        with self.assertRaises(TypeError):
+            snapshot.active_games[6] = {}
+        with self.assertRaises(TypeError):
+            snapshot.active_games[5]['game_id'] = 6
+
+
+class BracketTests(SimpleTestCase):
+    def test_seeds_meet_as_late_as_possible(self):
+        from .bracket import seed_positions
+
+        self.assertEqual(seed_positions(8), [1, 8, 4, 5, 2, 7, 3, 6])
+        order = seed_positions(64)
+        self.assertEqual(sorted(order), list(range(1, 65)))
+        self.assertLess(order.index(1), 32)
+        self.assertGreaterEqual(order.index(2), 32)
+
+    def test_top_seeds_get_the_byes(self):
+        from .bracket import Bracket, seed
+
+        players = [11, 12, 13, 14, 15]
+        bracket = Bracket.build(seed(players, {15: 1800, 14: 1700, 11: 1500}))
+        self.assertEqual((bracket.size, bracket.depth, bracket.player_count), (8, 3, 5))
+        # Seeds 15, 14, 11 advance on byes, seeds 12 and 13 play
+        self.assertEqual(bracket.advancing(1), [15, 14, 11])
+        round_1 = bracket.matches(1)
+        self.assertEqual([match.is_bye for match in round_1], [True, False, True, True])
+        self.assertEqual((round_1[1].player_1, round_1[1].player_2), (12, 13))
+        self.assertEqual(bracket.entrants(1), [15, 12, 13, 14, 11])
+
+    def test_winners_advance_in_place(self):
+        from .bracket import Bracket
+
+        bracket = Bracket.build(list(range(1, 8)))
+        slots = list(bracket.slots)
+        for slot, winner in ((5, 4), (6, 2), (7, 3), (2, 1), (3, 2), (1, 2)):
+            self.assertIn(winner, (slots[2 * slot], slots[2 * slot + 1]))
+            slots[slot] = winner
+        bracket = Bracket.from_bytes(Bracket(tuple(slots)).to_bytes())
+        self.assertEqual(bracket.champion, 2)
+        self.assertEqual(bracket.advancing(2), [1, 2])
+        rendered = bracket.render()
+        self.assertEqual([len(matches) for matches in rendered['rounds']], [4, 2, 1])
+        json.dumps(rendered)
+
+
+class TournamentCodecTests(SimpleTestCase):
+    RECORD = {
+        'tournament_id': 7, 'name': 'Cup', 'max_p': 8, 'creator_id': 1, 'players': [1, 2, 30000],
+        'nbr_player': 3, 'initialized': True, 'is_complete': False, 'status': 'active', 'current_round': 2,
+        'is_round_active': False, 'partecipants': [1, 2, 30000], 'winner': None,
+        'created_at': datetime(2025, 3, 1, 12, 30, 5, 123456, tzinfo=timezone.utc),
+        'round_start_time': datetime(2025, 3, 1, 14, 0, 0, 42), 'completion_time': None,
+    }
+
+    def test_record_round_trips_exactly(self):
+        from .tournament_codec import decode_record, encode_record
+
+        decoded = decode_record(encode_record(self.RECORD))
+        self.assertEqual(decoded, self.RECORD)
+        self.assertIsNone(decoded['round_start_time'].tzinfo)
+        self.assertEqual(decoded['created_at'].utcoffset(), timedelta(0))
+
+    def test_values_are_coerced_to_the_schema(self):
+        from .tournament_codec import decode_record, encode_fields, encode_record
+
+        decoded = decode_record(encode_record({'players': ['4', 5], 'creator_id': '9', 'completion_time': '2025-03-01T15:00:00'}))
+        self.assertEqual(decoded['players'], [4, 5])
+        self.assertEqual(decoded['creator_id'], 9)
+        self.assertEqual(decoded['completion_time'], datetime(2025, 3, 1, 15))
+        with self.assertRaises(TypeError):
+            encode_fields({'initialized': 'False'})
+        with self.assertRaises(TypeError):
+            encode_fields({'max_p': None})
+
+    def test_unknown_fields_are_skipped(self):
+        import msgpack
+        from .tournament_codec import decode_record, encode_record
+
+        mapping = encode_record({'name': 'Cup'})
+        mapping['99'] = msgpack.packb('added by a newer schema')
+        self.assertEqual(decode_record(mapping), {'name': 'Cup'})
+
+    def test_legacy_records_migrate(self):
+        from .tournament_codec import decode_record, encode_record, is_legacy, migrate_legacy
+
+        legacy = {
+            name: json.dumps(value) if isinstance(value, list) else str(value.replace(tzinfo=None).isoformat() if isinstance(value, datetime) else value)
+            for name, value in self.RECORD.items()
+        }
+        self.assertTrue(is_legacy(legacy))
+        migrated = migrate_legacy(legacy)
+        self.assertFalse(is_legacy(migrated))
+        self.assertEqual(decode_record(migrated), decode_record(legacy))
+        self.assertEqual(decode_record(migrated)['players'], [1, 2, 30000])
+        self.assertLess(
+            sum(len(field) + len(value) for field, value in encode_record(self.RECORD).items()),
+            sum(len(field) + len(value) for field, value in legacy.items())
+        )
+
+
+class PlayersMixin:
+    def setUp(self):
+        from .models import UserProfile
+        self.players = UserProfile.objects.bulk_create([
+            UserProfile(user_id=user_id, username=f'player{user_id}', email=f'p{user_id}@pong.it') for user_id in (1, 2, 3)
+        ])
+
+    def play(self, *results):
+        """Completed games of (winner, loser), recorded the way GameState.game_end does"""
+        from .models import Game
+        from .player_stats import record_game
+
+        games = Game.objects.bulk_create([
+            Game(player_1_id=winner, player_2_id=loser, player_1_score=5, player_2_score=index % 5, status='completed')
+            for index, (winner, loser) in enumerate(results)
+        ])
+        for winner, loser in results:
+            record_game(winner, loser)
+        return games
+
+
+class PlayerStatsTests(PlayersMixin, TestCase):
+    def test_games_update_totals_and_streaks(self):
+        from .models import PlayerStats
+
+        self.play((1, 2), (1, 3), (2, 1), (1, 2), (1, 2), (1, 3))
+        stats = {row.player_id: row for row in PlayerStats.objects.all()}
+        self.assertEqual((stats[1].total_games, stats[1].wins, stats[1].losses), (6, 5, 1))
+        self.assertEqual((stats[1].current_streak, stats[1].best_streak), (3, 3))
+        self.assertEqual((stats[2].wins, stats[2].losses, stats[2].current_streak, stats[2].best_streak), (1, 3, -2, 1))
+        self.assertEqual(stats[3].current_streak, -2)
+        self.assertEqual(stats[1].win_rate, 83.33)
+
+    def test_tournaments_and_rebuild_match_incremental_updates(self):
+        from .models import PlayerStats, Tournament
+        from .player_stats import rebuild, record_tournament
+
+        self.play((1, 2), (3, 1), (3, 2), (2, 1))
+        tournament = Tournament.objects.bulk_create([Tournament(name='Cup', max_partecipants=4, status='completed', winner_id=3)])[0]
+        tournament.player.add(*self.players)
+        record_tournament(tournament.id, 3)
+
+        fields = ('player_id', 'total_games', 'wins', 'losses', 'current_streak', 'best_streak', 'total_tournaments', 'tournament_wins', 'rating')
+        incremental = list(PlayerStats.objects.order_by('player_id').values_list(*fields))
+        self.assertEqual(incremental[2][:-1], (3, 2, 2, 0, 2, 2, 1, 1))
+        self.assertEqual(rebuild(), 3)
+        self.assertEqual(list(PlayerStats.objects.order_by('player_id').values_list(*fields)), incremental)
+
+    def test_history_pages_follow_the_cursor(self):
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        from .models import Game
+        from .views import GameHistoryPagination
+
+        games = self.play(*[(1, 2)] * 7)
+        Game.objects.filter(id__in=[game.id for game in games[2:5]]).update(begin_date=games[2].begin_date)  # Ties on begin_date
+
+        seen, url = [], '/pong/games/history?user_id=1&page_size=3'
+        while url:
+            paginator = GameHistoryPagination()
+            page = paginator.paginate_queryset(Game.objects.filter(player_1_id=1), Request(APIRequestFactory().get(url)))
+            seen += [game.id for game in page]
+            url = paginator.get_next_link()
+        expected = list(Game.objects.order_by('-begin_date', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+
+class MatchOwnershipTests(PlayersMixin, TestCase):
+    @override_settings(PONG_MATCH_SHARDING=True, REDIS_HOST='localhost', REDIS_PORT='1')
+    def test_match_claimed_without_redis_saves_its_result(self):
+        from unittest import mock
+        from asgiref.sync import async_to_sync
+        from .match_registry import MatchRegistry
+        from .models import Game, PlayerStats
+        from .signals import GameState
+
+        row = Game.objects.create(player_1=self.players[0], player_2=self.players[1], status='active')
+        registry = MatchRegistry()
+        registry.owner_channel = 'pong_owner.test'  # Started, without a channel layer
+        self.assertTrue(registry.enabled)
+
+        game = GameState(self.players[0], self.players[1], row.id, 20, None)
+        game.player_1_score = 5
+        with mock.patch('pong_app.signals.match_registry', registry):
+            self.assertTrue(async_to_sync(registry.claim)(row.id))  # Redis is down
+            self.assertTrue(registry.owns(row.id))
+            async_to_sync(game.game_end)()
+
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.player_1_score), ('completed', 5))
+        self.assertEqual(PlayerStats.objects.get(player_id=1).wins, 1)
+        self.assertFalse(registry.owns(row.id))
+
+    def test_handed_over_match_closes_its_replay(self):
+        import tempfile
+        from unittest import mock
+        from asgiref.sync import async_to_sync
+        from . import replay
+        from .game_loop import game_loop
+        from .match_registry import MatchRegistry
+        from .models import Game
+        from .signals import GameState
+
+        with tempfile.TemporaryDirectory() as replay_dir, override_settings(PONG_REPLAY_DIR=replay_dir):
+            game = GameState(self.players[0], self.players[1], 0, 20, None, seed=3)
+            row = Game.objects.create(player_1=self.players[0], player_2=self.players[1], status='active')
+            game.game_id = row.id
+            game.angle = game.initial_angle()
+            game.running = True
+            row.replay_path = game.start_replay()
+            row.save()
+            for _ in range(100):
+                game.tick()
+
+            # The old owner lost the lease: its replay ends where it stopped
+            old_owner = MatchRegistry()
+            old_owner.local_games[row.id] = game
+            checkpoint = json.loads(json.dumps(old_owner.checkpoint(game)))
+            old_owner._drop(row.id)
+            recording = replay.load(row.replay_path)
+            self.assertEqual(recording.footer['ticks'], 100)
+            self.assertTrue(recording.footer['handed_over'])
+            self.assertTrue(replay.simulate(recording)['matches_recording'])
+
+            # The new owner cannot record the rest of it
+            new_owner = MatchRegistry()
+            with mock.patch.object(game_loop, 'add'):
+                async_to_sync(new_owner._resume)(row.id, checkpoint)
+            new_owner.local_games.pop(row.id).physics.release()
+            row.refresh_from_db()
+            self.assertIsNone(row.replay_path)
+
+
+class LeaderboardTests(PlayersMixin, TestCase):
+    def test_elo(self):
+        from .leaderboard import elo_delta
+
+        self.assertEqual(elo_delta(1000, 1000), 16)
+        self.assertEqual(elo_delta(1400, 1000), 3)  # Expected win
+        self.assertEqual(elo_delta(1000, 1400), 29)  # Upset
+        self.assertEqual(elo_delta(3000, 1000), 1)
+
+    def test_games_move_ratings(self):
+        from .leaderboard import leaderboard
+
+        self.assertFalse(leaderboard.enabled)  # PONG_LEADERBOARD is off under test: boards read PlayerStats
+        self.play((1, 2), (1, 3), (2, 3))
+        self.assertEqual(leaderboard.ratings([1, 2, 3, 4]), {1: 1031, 2: 1000, 3: 969})
+        self.assertEqual(leaderboard.page('global', 1, 5), (3, [(2, 1000), (3, 969)]))
+        self.assertEqual(leaderboard.rank('global', 3), (3, 969))
+        self.assertIsNone(leaderboard.rank('global', 4))
+        self.assertEqual(leaderboard.page('weekly', 0, 5), (0, []))
+
+    def test_leaderboard_endpoints(self):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from .views import Leaderboard, LeaderboardRank
+
+        self.play((1, 2), (1, 3), (2, 3))
+        factory = APIRequestFactory()
+
+        request = factory.get('/pong/leaderboard', {'page': 1, 'page_size': 2})
+        force_authenticate(request, user=self.players[2])
+        response = Leaderboard.as_view()(request)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([(entry['rank'], entry['username']) for entry in response.data['results']], [(1, 'player1'), (2, 'player2')])
+
+        request = factory.get('/pong/leaderboard/rank')
+        force_authenticate(request, user=self.players[2])
+        response = LeaderboardRank.as_view()(request)
+        self.assertEqual((response.data['rank'], response.data['score']), (3, 969))
+
+        request = factory.get('/pong/leaderboard', {'board': 'monthly'})
+        force_authenticate(request, user=self.players[2])
+        self.assertEqual(Leaderboard.as_view()(request).status_code, 400)
+
+
+
+class MatchmakingTests(PlayersMixin, TestCase):
+    def test_window_widens_with_wait(self):
+        from .matchmaking import pair_waiting
+
+        waiting = [(1, 1000, 0), (2, 1040, 0), (3, 1200, 0), (4, 1500, 0)]
+        self.assertEqual(pair_waiting(waiting, 50, 10, 800, 100), [(1, 2, 0, 0)])
+        # 3 and 4 are 300 points apart: matched once one of them waited 25 s
+        waiting[3] = (4, 1500, 25)
+        self.assertEqual(pair_waiting(waiting, 50, 10, 800, 100), [(1, 2, 0, 0), (3, 4, 0, 25)])
+        self.assertEqual(pair_waiting(waiting, 50, 10, 200, 100), [(1, 2, 0, 0)])  # Capped window
+        self.assertEqual(pair_waiting(waiting, 50, 10, 800, 1), [(1, 2, 0, 0)])
+
+    def test_queue_creates_games(self):
+        from unittest import mock
+        from .matchmaking import Matchmaker
+        from .models import Game
+
+        matchmaker = Matchmaker(worker=False)
+        self.assertFalse(matchmaker.enabled)  # PONG_MATCHMAKING is off under test: the queue is local
+        self.assertEqual(matchmaker.join(1, 1000), 1)
+        self.assertIsNone(matchmaker.join(1, 1000))
+        self.assertEqual(matchmaker.join(2, 1600), 2)
+        self.assertEqual(matchmaker.join(3, 1030), 3)
+
+        with mock.patch('pong_app.signals.notify_game_created') as notify:
+            self.assertEqual(matchmaker.match(), 1)
+        game = Game.objects.get()
+        self.assertEqual((game.player_1_id, game.player_2_id, game.status), (1, 3, 'pending'))
+        notify.assert_called_once_with(game)
+        self.assertEqual(matchmaker.status(1), {'queued': False, 'waiting_seconds': None, 'game_id': game.id})
+        self.assertTrue(matchmaker.status(2)['queued'])
+
+        self.assertTrue(matchmaker.leave(2))
+        self.assertFalse(matchmaker.leave(2))
+        self.assertEqual(matchmaker.match(), 0)
+
+    def test_players_wait_again_when_their_game_is_not_created(self):
+        from unittest import mock
+        from .matchmaking import Matchmaker
+        from .models import Game
+
+        matchmaker = Matchmaker(worker=False)
+        matchmaker.join(1, 1000)
+        matchmaker.join(2, 1020)
+        joined = matchmaker.local_queue[1][1]
+        with mock.patch.object(Game.objects, 'bulk_create', side_effect=RuntimeError('database down')):
+            self.assertEqual(matchmaker.match(), 2)
+        self.assertEqual(matchmaker.local_queue[1], (1000, mock.ANY))
+        self.assertAlmostEqual(matchmaker.local_queue[1][1], joined, places=2)  # The wait is kept
+        self.assertTrue(matchmaker.status(2)['queued'])
+
+        with mock.patch('pong_app.signals.notify_game_created'):
+            self.assertEqual(matchmaker.match(), 0)
+        self.assertEqual(Game.objects.values_list('player_1_id', 'player_2_id').get(), (1, 2))
+
+        # A player without a profile is dropped, their opponent waits again
+        matchmaker.join(3, 1000)
+        matchmaker.join(99, 1000)
+        with mock.patch('pong_app.signals.notify_game_created') as notify:
+            self.assertEqual(matchmaker.match(), 1)
+        notify.assert_not_called()
+        self.assertEqual(list(matchmaker.local_queue), [3])
+
+    def test_players_waiting_in_redis_start_the_worker(self):
+        from unittest import mock
+        from .matchmaking import Matchmaker
+
+        matchmaker = Matchmaker(worker=False)
+        matchmaker.enabled = True
+        matchmaker.redis_client = mock.Mock()
+        with mock.patch.object(matchmaker, '_start_worker') as start_worker:
+            matchmaker.redis_client.zcard.return_value = 0
+            matchmaker.resume()
+            start_worker.assert_not_called()
+
+            # Left waiting by the pods of a previous deploy
+            matchmaker.redis_client.zcard.return_value = 2
+            matchmaker.resume()
+            start_worker.assert_called_once_with()
+
+            start_worker.reset_mock()
+            matchmaker.redis_client.pipeline.return_value.execute.return_value = ['100000', None, (130, 0)]
+            self.assertEqual(matchmaker.status(1), {'queued': True, 'waiting_seconds': 30, 'game_id': None})
+            start_worker.assert_called_once_with()
+
+    @override_settings(PONG_MATCHMAKING=True, REDIS_HOST='localhost', REDIS_PORT='1')
+    def test_queue_works_in_process_when_redis_is_down(self):
+        from unittest import mock
+        from .matchmaking import Matchmaker
+        from .models import Game
+
+        matchmaker = Matchmaker(worker=False)
+        self.assertTrue(matchmaker.enabled)
+        self.assertEqual(matchmaker.join(1, 1000), 1)
+        self.assertIsNone(matchmaker.join(1, 1000))
+        self.assertTrue(matchmaker.status(1)['queued'])
+        self.assertTrue(matchmaker.leave(1))
+        self.assertFalse(matchmaker.leave(1))
+
+        matchmaker.join(1, 1000)
+        matchmaker.join(3, 1030)
+        with mock.patch('pong_app.signals.notify_game_created'):
+            self.assertEqual(matchmaker.match(), -1)  # The Redis queue may still hold players
+        game = Game.objects.get()
+        self.assertEqual(matchmaker.status(3), {'queued': False, 'waiting_seconds': None, 'game_id': game.id})
+
+class QueryAuditTests(TestCase):
+    def test_scans_are_detected(self):
+        from .management.commands.audit_queries import SEQ_SCAN
+
+        self.assertEqual(SEQ_SCAN.findall('SCAN pong_app_game'), ['pong_app_game'])
+        self.assertEqual(SEQ_SCAN.findall('SCAN pong_app_game USING INDEX game_player_1_recent_idx'), [])
+        self.assertEqual(SEQ_SCAN.findall('SEARCH pong_app_game USING INDEX game_player_1_recent_idx (player_1_id=?)'), [])
+        self.assertEqual(SEQ_SCAN.findall('  ->  Seq Scan on pong_app_tournament  (cost=0.00..1.01 rows=1 width=8)'), ['pong_app_tournament'])
+
+    def test_pong_views_use_indexes(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import Game
+
+        output = StringIO()
+        call_command('audit_queries', players=40, games=2000, tournaments=40, strict=True, stdout=output)
+        self.assertIn('No sequential scans', output.getvalue())
+        self.assertFalse(Game.objects.exists())  # The seed is rolled back
@@ -0,0 +1,186 @@
+"""
+Tournament record codec
+
+The tournament hash (tournament:{id}) keeps one hash field per attribute so
+the Lua scripts can read and write single attributes atomically. Fields are
+named by a numeric field ID and hold a msgpack value; field 'v' holds the
+schema version:
+
+    v    1                   schema version
+    1    tournament_id       int
+    5    players             [int, ...]
+    15   round_start_time    timestamp
+    ...                      (see FIELDS)
+
+Field IDs are never reused or retyped: a new attribute gets a new ID, and
+readers skip IDs they don't know, so records stay readable across deploys.
+The Lua scripts use the same IDs through LUA_FIELDS and cmsgpack.
+
+Timestamps round-trip exactly: aware datetimes as msgpack Timestamps
+(decoded in UTC), naive ones (datetime.now()) as NAIVE_TIMESTAMP_EXT with
+the same payload, read back as the same wall-clock time.
+
+Records written before the codec (JSON lists and str() scalars under the
+attribute names) have no 'v' field; decode_record() still reads them with
+the old type guessing and RedisTournamentManager migrates them on first
+read (or all at once with `manage.py migrate_tournament_records`).
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Mapping, Union
+
+import msgpack
+
+SCHEMA_VERSION = 1
+VERSION_FIELD = 'v'
+
+NAIVE_TIMESTAMP_EXT = 1
+
+# name -> (field ID, kind)
+FIELDS = {
+    'tournament_id': (1, 'int'),
+    'name': (2, 'str'),
+    'max_p': (3, 'int'),
+    'creator_id': (4, 'optional_int'),
+    'players': (5, 'int_list'),
+    'nbr_player': (6, 'int'),
+    'initialized': (7, 'bool'),
+    'is_complete': (8, 'bool'),
+    'status': (9, 'str'),
+    'current_round': (10, 'int'),
+    'is_round_active': (11, 'bool'),
+    'partecipants': (12, 'int_list'),
+    'winner': (13, 'optional_int'),
+    'created_at': (14, 'timestamp'),
+    'round_start_time': (15, 'timestamp'),
+    'completion_time': (16, 'timestamp'),
+}
+FIELD_NAMES = {str(field_id): name for name, (field_id, _) in FIELDS.items()}
+
+# Prepended to the tournament scripts: F.players == '5'
+LUA_FIELDS = 'local F = {' + ', '.join(
+    f"{name} = '{field_id}'" for name, (field_id, _) in FIELDS.items()
+) + '}\n'
+
+RawHash = Mapping[Union[str, bytes], Union[str, bytes]]
+
+
+def _to_int(name: str, value: Any) -> int:
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise TypeError(f"{name} expects an int, got {value!r}")
+    return int(value)
+
+
+def _to_bool(name: str, value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if value in (0, 1):
+        return bool(value)
+    raise TypeError(f"{name} expects a bool, got {value!r}")
+
+
+def _to_timestamp(name: str, value: Any):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        raise TypeError(f"{name} expects a datetime, got {value!r}")
+    if value.tzinfo is None:
+        payload = msgpack.Timestamp.from_datetime(value.replace(tzinfo=timezone.utc)).to_bytes()
+        return msgpack.ExtType(NAIVE_TIMESTAMP_EXT, payload)
+    return msgpack.Timestamp.from_datetime(value)
+
+
+ENCODERS = {
+    'int': _to_int,
+    'optional_int': lambda name, value: None if value is None else _to_int(name, value),
+    'bool': _to_bool,
+    'str': lambda name, value: str(value),
+    'int_list': lambda name, value: [_to_int(name, item) for item in value],
+    'timestamp': lambda name, value: None if value is None else _to_timestamp(name, value),
+}
+
+
+def encode_value(name: str, value: Any) -> bytes:
+    """msgpack bytes of one attribute, coerced to its schema type (TypeError if it can't be)"""
+    _, kind = FIELDS[name]
+    return msgpack.packb(ENCODERS[kind](name, value))
+
+
+def encode_fields(values: Mapping[str, Any]) -> Dict[str, bytes]:
+    """Hash mapping for a partial update (the record must already be versioned)"""
+    return {str(FIELDS[name][0]): encode_value(name, value) for name, value in values.items()}
+
+
+def encode_record(values: Mapping[str, Any]) -> Dict[str, bytes]:
+    """Hash mapping for a whole record, with its schema version"""
+    mapping = encode_fields(values)
+    mapping[VERSION_FIELD] = msgpack.packb(SCHEMA_VERSION)
+    return mapping
+
+
+def _ext_hook(code: int, data: bytes):
+    if code == NAIVE_TIMESTAMP_EXT:
+        return msgpack.Timestamp.from_bytes(data).to_datetime().replace(tzinfo=None)
+    return msgpack.ExtType(code, data)
+
+
+def decode_value(name: str, data: bytes) -> Any:
+    value = msgpack.unpackb(data, timestamp=3, ext_hook=_ext_hook)
+    if FIELDS[name][1] == 'int_list':
+        # cmsgpack packs an empty Lua table as an empty array or map
+        return list(value or [])
+    return value
+
+
+def _key(field: Union[str, bytes]) -> str:
+    return field.decode() if isinstance(field, bytes) else field
+
+
+def is_legacy(raw: RawHash) -> bool:
+    """A non-empty hash written before the codec"""
+    return bool(raw) and not any(_key(field) == VERSION_FIELD for field in raw)
+
+
+def decode_record(raw: RawHash) -> Dict[str, Any]:
+    """Attributes of a tournament hash (as returned by HGETALL), legacy or versioned"""
+    if is_legacy(raw):
+        return decode_legacy({_key(k): v.decode() if isinstance(v, bytes) else v for k, v in raw.items()})
+    record = {}
+    for field, data in raw.items():
+        name = FIELD_NAMES.get(_key(field))
+        if name is not None:  # Skips the version and IDs added by newer schemas
+            record[name] = decode_value(name, data.encode() if isinstance(data, str) else data)
+    return record
+
+
+def decode_legacy(data: Dict[str, str]) -> Dict[str, Any]:
+    """Pre-codec records: JSON lists/dicts, 'True'/'False', digits, 'None'"""
+    parsed_data = {}
+    for key, value in data.items():
+        try:
+            # Try to parse as JSON for lists/dicts
+            if value.startswith('[') or value.startswith('{'):
+                parsed_data[key] = json.loads(value)
+            else:
+                # Handle primitives
+                if value.lower() in ('true', 'false'):
+                    parsed_data[key] = value.lower() == 'true'
+                elif value.isdigit():
+                    parsed_data[key] = int(value)
+                elif value in ('None', ''):
+                    parsed_data[key] = None
+                else:
+                    parsed_data[key] = value
+        except json.JSONDecodeError:
+            parsed_data[key] = value
+    for name in ('created_at', 'round_start_time', 'completion_time'):
+        if isinstance(parsed_data.get(name), str):
+            parsed_data[name] = datetime.fromisoformat(parsed_data[name])
+    return parsed_data
+
+
+def migrate_legacy(raw: RawHash) -> Dict[str, bytes]:
+    """Versioned hash mapping equivalent to a legacy record (unknown attributes are dropped)"""
+    record = decode_record(raw)
+    return encode_record({name: value for name, value in record.items() if name in FIELDS})
@@ -571,12 +571,16 @@ class TournamentState:
 						
 						def update_tournament():
 								tournament_obj = Tournament.objects.get(id=self.tournament_id)
+								newly_completed = self.status == 'completed' and tournament_obj.status != 'completed'
 								tournament_obj.status = self.status
 								if hasattr(self, 'winner') and self.winner:
 										from .models import UserProfile
 										winner_obj = UserProfile.objects.get(user_id=self.winner)
 										tournament_obj.winner = winner_obj
 								tournament_obj.save()
+								if newly_completed:
+										from .player_stats import record_tournament
+										record_tournament(self.tournament_id, tournament_obj.winner_id)
 								return tournament_obj
 						
 						tournament_obj = await database_sync_to_async(update_tournament)()
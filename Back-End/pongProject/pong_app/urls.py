@@ -26,6 +26,12 @@ urlpatterns = [
 		path('player/<int:user_id>/', views.PlayerManage.as_view(), name='player_manage'),
 		path('player/stats', views.UserStatistics.as_view(), name='user_statistics'),
 		
+		# Leaderboard endpoints
+		path('leaderboard', views.Leaderboard.as_view(), name='leaderboard'),
+		path('leaderboard/rank', views.LeaderboardRank.as_view(), name='leaderboard_rank'),
+		path('leaderboard/friends', views.FriendsLeaderboard.as_view(), name='friends_leaderboard'),
+		path('matchmaking', views.Matchmaking.as_view(), name='matchmaking'),
+		
 		# Health check
 		path('health', views.health_check, name='health_check'),
 ]
\ No newline at end of file
@@ -1,16 +1,21 @@
 from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404
 from django.db import models
-from django.db.models import Q, Count, Case, When, IntegerField
+from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
 from psycopg import logger
 from rest_framework import permissions, status, generics, filters
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 from .serializer import *
-from .models import UserProfile , Game, Tournament
+from .models import UserProfile , Game, Tournament, PlayerStats
+from . import player_stats
+from .leaderboard import BOARDS, INITIAL_RATING, leaderboard
+from .matchmaking import matchmaker
+from pongProject.settings import Microservices
+import requests
 from .middleware import ServiceAuthentication , JWTAuth
 from django.contrib.auth.models import AnonymousUser
 from django_filters.rest_framework import DjangoFilterBackend
@@ -149,13 +154,13 @@ class TournamentGen(generics.ListCreateAPIView):
 	When creating a tournament:
 	- The authenticated user is automatically set as the creator
 	- The creator is automatically joined to the tournament
-	- max_partecipants is automatically adjusted to the nearest power of 2 (4, 8, 16, 32, 64)
+	- max_partecipants can be any size from 2 to 128: brackets are padded with byes
 	- partecipants count starts at 1 (the creator)
 	
 	Example request body for creation:
 	{
 		"name": "Summer Championship",
-		"max_partecipants": 12,	// Will be adjusted to 16
+		"max_partecipants": 12,
 	}
 	"""
 	permission_classes = (IsAuthenticatedUserProfile,)
@@ -169,30 +174,8 @@ class TournamentGen(generics.ListCreateAPIView):
 		"""Override to include participants for efficient loading"""
 		return Tournament.objects.select_related('creator', 'winner').prefetch_related('player').order_by('-begin_date')
 	
-	def get_nearest_power_of_2(self, num):
-		"""Get the nearest power of 2 for tournament partecipants"""
-		if num <= 0:
-			return 4	# Minimum tournament size
-		
-		# Find the nearest power of 2
-		import math
-		if num <= 4:
-			return 4
-		elif num <= 8:
-			return 8
-		elif num <= 16:
-			return 16
-		elif num <= 32:
-			return 32
-		elif num <= 64:
-			return 64
-		elif num <= 128:
-			return 128
-		else:
-			return 128 # Maximum tournament size
-	
 	def perform_create(self, serializer):
-		"""Override to auto-set creator and adjust max_partecipants to nearest power of 2"""
+		"""Override to auto-set creator and initial participant count"""
 		# Get or create the user profile for the creator
 		creator = self.request.user
 		if not isinstance(creator, UserProfile):
@@ -202,9 +185,7 @@ class TournamentGen(generics.ListCreateAPIView):
 			except UserProfile.DoesNotExist:
 				logger.error(f"UserProfile not found for user_id {creator}, creating new profile")
 				return Response({'error': 'You don\'t exists lmao'}, status=status.HTTP_404_NOT_FOUND)
-		# Get the requested max_partecipants and adjust to nearest power of 2
 		max_partecipants = serializer.validated_data.get('max_partecipants', 8)
-		adjusted_max_partecipants = self.get_nearest_power_of_2(max_partecipants)
 		
 		# Get initial partecipants from request data (if any)
 		initial_partecipants = self.request.data.get('partecipants', [])
@@ -214,10 +195,10 @@ class TournamentGen(generics.ListCreateAPIView):
 		if initial_partecipants:
 			participant_count += len(initial_partecipants)
 		
-		# Save the tournament with auto-set creator and adjusted max partecipants
+		# Save the tournament with auto-set creator
 		tournament = serializer.save(
 			creator=creator,
-			max_partecipants=adjusted_max_partecipants,
+			max_partecipants=max_partecipants,
 			partecipants=participant_count
 		)
 		
@@ -432,6 +413,7 @@ class EndTournament(APIView):
 		tournament.winner = winner
 		tournament.status = 'completed'
 		tournament.save()
+		player_stats.record_tournament(tournament.id, winner.user_id)
 		
 		return Response({
 			'message': 'tournament ended',
@@ -451,16 +433,23 @@ class GamePagination(PageNumberPagination):
 		page_size_query_param = 'page_size'
 		max_page_size = 50
 
+class GameHistoryPagination(CursorPagination):
+		"""Keyset pagination, most recent first: pages cost the same at any depth"""
+		page_size = 10
+		page_size_query_param = 'page_size'
+		max_page_size = 50
+		ordering = ('-begin_date', '-id')
+
 class PlayerMatchHistory(generics.ListAPIView):
 		""" Use this endpoint to get the match history of a player.
 		
 		URL: /api/player-match-history/?user_id=123
-		Optional params: ?page=2&page_size=20
+		Optional params: ?page_size=20, ?cursor=<from the next/previous links>
 		"""
 		permission_classes = (IsAuthenticatedUserProfile,)
 		authentication_classes = [JWTAuth]
 		serializer_class = GameHistorySerializer
-		pagination_class = GamePagination
+		pagination_class = GameHistoryPagination
 		
 		def get_queryset(self):
 				user_id = self.request.query_params.get('user_id')
@@ -468,10 +457,10 @@ class PlayerMatchHistory(generics.ListAPIView):
 						return Game.objects.none()
 				
 				# Get games where user is either player_1 or player_2
-				# Order by most recent first
+				# (ordered most recent first by the pagination)
 				return Game.objects.filter(
 						models.Q(player_1__user_id=user_id) | models.Q(player_2__user_id=user_id)
-				).select_related('player_1', 'player_2', 'tournament_id').order_by('-begin_date')
+				).select_related('player_1', 'player_2', 'tournament_id')
 
 
 class TournamentMatchHistory(APIView):
@@ -641,43 +630,24 @@ class UserStatistics(APIView):
 		# elif not isinstance(user_id, int):
 		# 	return Response({'error': 'user_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
 		try:
-			user = get_object_or_404(UserProfile, user_id=int(user_id))
-			games_stats = Game.objects.filter(
-						Q(player_1__user_id=user_id) | Q(player_2__user_id=user_id)
-				).aggregate(
-						total_games=Count('id'),
-						total_wins=Count(Case(
-								When(Q(player_1__user_id=user_id) & Q(player_1_score__gt=models.F('player_2_score')), then=1),
-								When(Q(player_2__user_id=user_id) & Q(player_2_score__gt=models.F('player_1_score')), then=1),
-								output_field=IntegerField()
-						)),
-						total_losses=Count(Case(
-								When(Q(player_1__user_id=user_id) & Q(player_1_score__lt=models.F('player_2_score')), then=1),
-								When(Q(player_2__user_id=user_id) & Q(player_2_score__lt=models.F('player_1_score')), then=1),
-								output_field=IntegerField()
-						))
-				)
-						
-			# Tournament statistics
-			tournament_stats = user.tournaments.aggregate(
-				total_tournaments=Count('id'),
-				total_tournament_wins=Count('id', filter=Q(winner__user_id=user_id))
-			)
-						
-			# Calculate win rate
-			total_games = games_stats['total_games'] or 0
-			total_wins = games_stats['total_wins'] or 0
-			win_rate = (total_wins / total_games * 100) if total_games > 0 else 0
-						
+			# Totals are kept up to date as games end (see player_stats.py): one lookup
+			user = get_object_or_404(UserProfile.objects.select_related('stats'), user_id=int(user_id))
+			try:
+				stats = user.stats
+			except PlayerStats.DoesNotExist:
+				stats = PlayerStats(player=user)	# No finished game yet
+
 			stats_data = {
 				'user_id': user.user_id,
 				'username': user.username,
-				'total_games': total_games,
-				'total_wins': total_wins,
-				'total_losses': games_stats['total_losses'] or 0,
-				'win_rate': round(win_rate, 2),
-				'total_tournaments': tournament_stats['total_tournaments'] or 0,
-				'total_tournament_wins': tournament_stats['total_tournament_wins'] or 0
+				'total_games': stats.total_games,
+				'total_wins': stats.wins,
+				'total_losses': stats.losses,
+				'win_rate': stats.win_rate,
+				'current_streak': stats.current_streak,
+				'best_streak': stats.best_streak,
+				'total_tournaments': stats.total_tournaments,
+				'total_tournament_wins': stats.tournament_wins
 			}
 						
 			return Response(stats_data, status=status.HTTP_200_OK)
@@ -686,6 +656,128 @@ class UserStatistics(APIView):
 			return Response({'error': 'An internal error occurred.'}, status=status.HTTP_400_BAD_REQUEST)
 
 
+def leaderboard_entries(rows, first_rank):
+	"""Rank, user and score of (player id, score) rows, usernames in one query"""
+	profiles = UserProfile.objects.in_bulk([player_id for player_id, _ in rows])
+	return [{
+		'rank': rank,
+		'user_id': player_id,
+		'username': profiles[player_id].username if player_id in profiles else None,
+		'score': score
+	} for rank, (player_id, score) in enumerate(rows, start=first_rank)]
+
+
+class Leaderboard(APIView):
+	""" Use this endpoint to get a page of a leaderboard.
+
+		args:
+			board (str): 'global' (Elo rating, default) or 'weekly' (rating gained this week)
+			page (int), page_size (int): optional, 1 and 20 by default (at most 100)
+	"""
+	permission_classes = (IsAuthenticatedUserProfile,)
+	authentication_classes = [JWTAuth]
+
+	def get(self, request, *args, **kwargs):
+		board = request.query_params.get('board', 'global')
+		if board not in BOARDS:
+			return Response({'error': f"board must be one of {', '.join(BOARDS)}"}, status=status.HTTP_400_BAD_REQUEST)
+		try:
+			page = max(int(request.query_params.get('page', 1)), 1)
+			page_size = min(max(int(request.query_params.get('page_size', 20)), 1), 100)
+		except ValueError:
+			return Response({'error': 'page and page_size must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+		offset = (page - 1) * page_size
+		count, rows = leaderboard.page(board, offset, page_size)
+		return Response({
+			'board': board,
+			'count': count,
+			'page': page,
+			'page_size': page_size,
+			'results': leaderboard_entries(rows, offset + 1)
+		}, status=status.HTTP_200_OK)
+
+
+class LeaderboardRank(APIView):
+	""" Use this endpoint to get the rank of a user on a leaderboard.
+
+		args:
+			user_id (int): The id of the user. (optional, if not provided, the authenticated user will be used)
+			board (str): 'global' (default) or 'weekly'
+	"""
+	permission_classes = (IsAuthenticatedUserProfile,)
+	authentication_classes = [JWTAuth]
+
+	def get(self, request, *args, **kwargs):
+		board = request.query_params.get('board', 'global')
+		if board not in BOARDS:
+			return Response({'error': f"board must be one of {', '.join(BOARDS)}"}, status=status.HTTP_400_BAD_REQUEST)
+		try:
+			user_id = int(request.query_params.get('user_id', request.user.user_id))
+		except ValueError:
+			return Response({'error': 'user_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+		ranked = leaderboard.rank(board, user_id)
+		if ranked is None:
+			return Response({'error': 'user is not ranked on this board'}, status=status.HTTP_404_NOT_FOUND)
+		rank, score = ranked
+		return Response({'board': board, 'user_id': user_id, 'rank': rank, 'score': score}, status=status.HTTP_200_OK)
+
+
+class FriendsLeaderboard(APIView):
+	""" Use this endpoint to rank the authenticated user among their accepted friends (Elo rating).
+	"""
+	permission_classes = (IsAuthenticatedUserProfile,)
+	authentication_classes = [JWTAuth]
+
+	def get(self, request, *args, **kwargs):
+		try:
+			# Friendships live in the Users service: ask it with the caller's token
+			response = requests.get(
+				Microservices['Users'] + '/user/friend',
+				params={'status': 'accepted'},
+				headers={'Authorization': request.headers.get('Authorization', '')},
+				timeout=3
+			)
+			response.raise_for_status()
+			friend_ids = [friendship['friend_info']['user_id'] for friendship in response.json() if friendship.get('friend_info')]
+		except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+			logging.error(f"Failed to fetch friends of user {request.user.user_id}: {e}")
+			return Response({'error': 'Friends are unavailable'}, status=status.HTTP_502_BAD_GATEWAY)
+
+		ratings = leaderboard.ratings([request.user.user_id, *friend_ids])
+		rows = sorted(ratings.items(), key=lambda item: (-item[1], item[0]))
+		return Response({'board': 'friends', 'count': len(rows), 'results': leaderboard_entries(rows, 1)}, status=status.HTTP_200_OK)
+
+
+
+class Matchmaking(APIView):
+	""" Use this endpoint to queue the authenticated user for a quick play game.
+
+		POST joins the queue: players are matched by Elo rating, the window widening the longer they wait.
+		The game is announced with a 'game_created' notification; GET also tells its id.
+		GET tells whether the user is waiting, for how long, and the game they were matched into.
+		DELETE leaves the queue.
+	"""
+	permission_classes = (IsAuthenticatedUserProfile,)
+	authentication_classes = [JWTAuth]
+
+	def post(self, request, *args, **kwargs):
+		user_id = request.user.user_id
+		rating = leaderboard.ratings([user_id]).get(user_id, INITIAL_RATING)
+		depth = matchmaker.join(user_id, rating)
+		if depth is None:
+			return Response({'error': 'Already in the queue'}, status=status.HTTP_409_CONFLICT)
+		return Response({'queued': True, 'rating': rating, 'queue_depth': depth}, status=status.HTTP_202_ACCEPTED)
+
+	def get(self, request, *args, **kwargs):
+		return Response(matchmaker.status(request.user.user_id), status=status.HTTP_200_OK)
+
+	def delete(self, request, *args, **kwargs):
+		if not matchmaker.leave(request.user.user_id):
+			return Response({'error': 'Not in the queue'}, status=status.HTTP_404_NOT_FOUND)
+		return Response(status=status.HTTP_204_NO_CONTENT)
+
 @csrf_exempt
 def health_check(request):
 	return JsonResponse({'status': 'ok'})
\ No newline at end of file
@@ -0,0 +1,201 @@
+"""
+Binary game-state wire protocol
+
+Opt-in alternative to the JSON `game_state` messages, negotiated by connecting
+to the game WebSocket with `?protocol=binary`. Frames are sent as binary
+WebSocket messages (`bytes_data`), little endian:
+
+	header	<BBHHH	version, flags, seq, baseline_seq, field mask
+	fields	<h * n	one int16 per bit set in the mask, in FIELDS order
+
+`seq` is the match frame number (mod 2**16). A keyframe (FLAG_KEYFRAME) carries
+every field. A delta frame only carries the fields that changed since snapshot
+`baseline_seq`, which is always one the client acknowledged by sending
+`{"type": "ack", "seq": <seq>}`; the client keeps the snapshots it acked
+(at most HISTORY_SIZE) and copies the missing fields from the baseline.
+
+Quantization (value * scale, rounded):
+	scores		as is
+	paddle_y	percentage of ring height, * 100 (0..10000)
+	ball x/y	ring units, * 100
+	angle		degrees normalized to [-180, 180), * 100
+	ball_speed	ring units per frame, * 1000
+	tick, player_N_input_seq	counters mod 2**16, sent as int16 (read as uint16);
+			input seq is 0 until the player's first tagged input
+"""
+import struct
+from collections import OrderedDict
+
+PROTOCOL_VERSION = 2
+FLAG_KEYFRAME = 0x01
+
+HEADER = struct.Struct('<BBHHH')
+SEQ_MODULO = 1 << 16
+HISTORY_SIZE = 64	# Oldest baseline a delta frame can refer to
+
+FIELDS = (
+	# (name, scale)
+	('player_1_score', 1),
+	('player_2_score', 1),
+	('player_1_y', 100),
+	('player_2_y', 100),
+	('ball_x', 100),
+	('ball_y', 100),
+	('angle', 100),
+	('ball_speed', 1000),
+	# Prediction / reconciliation
+	('tick', 1),
+	('player_1_input_seq', 1),
+	('player_2_input_seq', 1),
+)
+COUNTER_FIELDS = ('tick', 'player_1_input_seq', 'player_2_input_seq')
+FULL_MASK = (1 << len(FIELDS)) - 1
+INT16_MIN, INT16_MAX = -32768, 32767
+
+_field_structs = [struct.Struct('<' + 'h' * n) for n in range(len(FIELDS) + 1)]
+
+
+def _clamp(value):
+	return max(INT16_MIN, min(INT16_MAX, int(round(value))))
+
+
+def _wrap16(counter):
+	"""Counter mod 2**16 stored in an int16"""
+	return ((counter or 0) + 32768) % 65536 - 32768
+
+
+def normalize_angle(angle):
+	"""Degrees in [-180, 180)"""
+	return (angle + 180) % 360 - 180
+
+
+def quantize(state):
+	"""Snapshot tuple of int16 values from a GameState.to_dict() dict"""
+	values = (
+		state['player_1_score'],
+		state['player_2_score'],
+		state['player_1_pos'][1],
+		state['player_2_pos'][1],
+		state['ball_pos'][0],
+		state['ball_pos'][1],
+		normalize_angle(state['angle']),
+		state['ball_speed'],
+	)
+	counters = (state.get(name) for name in COUNTER_FIELDS)
+	return tuple(_clamp(value * scale) for value, (_, scale) in zip(values, FIELDS)) + tuple(_wrap16(counter) for counter in counters)
+
+
+def dequantize(snapshot):
+	"""Field name -> value dict of a snapshot tuple"""
+	return {
+		name: value % SEQ_MODULO if name in COUNTER_FIELDS else value / scale
+		for value, (name, scale) in zip(snapshot, FIELDS)
+	}
+
+
+def encode(seq, snapshot, baseline_seq=None, baseline=None):
+	"""Keyframe when no baseline is given, delta against `baseline` otherwise"""
+	if baseline is None:
+		return HEADER.pack(PROTOCOL_VERSION, FLAG_KEYFRAME, seq, seq, FULL_MASK) + _field_structs[len(FIELDS)].pack(*snapshot)
+
+	mask = 0
+	values = []
+	for bit, (value, old) in enumerate(zip(snapshot, baseline)):
+		if value != old:
+			mask |= 1 << bit
+			values.append(value)
+	return HEADER.pack(PROTOCOL_VERSION, 0, seq, baseline_seq, mask) + _field_structs[len(values)].pack(*values)
+
+
+def decode(frame, baselines=None):
+	"""
+	Reference decoder (what a client does): returns (seq, snapshot).
+	`baselines` maps acked seq -> snapshot and is required for delta frames.
+	"""
+	version, flags, seq, baseline_seq, mask = HEADER.unpack_from(frame)
+	if version != PROTOCOL_VERSION:
+		raise ValueError(f"Unsupported protocol version {version}")
+
+	count = bin(mask).count('1')
+	values = iter(_field_structs[count].unpack_from(frame, HEADER.size))
+	if flags & FLAG_KEYFRAME:
+		return seq, tuple(values)
+
+	if not baselines or baseline_seq not in baselines:
+		raise ValueError(f"Unknown baseline {baseline_seq} for frame {seq}")
+	baseline = baselines[baseline_seq]
+	snapshot = tuple(
+		next(values) if mask & (1 << bit) else old
+		for bit, old in enumerate(baseline)
+	)
+	return seq, snapshot
+
+
+def seq_distance(newer, older):
+	"""Frames between two seq numbers, handling wrap-around"""
+	return (newer - older) % SEQ_MODULO
+
+
+class DeltaFrameCache:
+	"""
+	Encoded delta frames shared by every connection of this process: sockets
+	that acked the same baseline get the same bytes, encoded once.
+	"""
+
+	def __init__(self, max_size=1024):
+		self.max_size = max_size
+		self.frames = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, key, seq, snapshot, baseline_seq, baseline):
+		cache_key = (key, seq, baseline_seq)
+		frame = self.frames.get(cache_key)
+		if frame is not None:
+			self.hits += 1
+			return frame
+
+		self.misses += 1
+		frame = encode(seq, snapshot, baseline_seq, baseline)
+		self.frames[cache_key] = frame
+		if len(self.frames) > self.max_size:
+			self.frames.popitem(last=False)
+		return frame
+
+
+delta_frames = DeltaFrameCache()
+
+
+class BinaryStateStream:
+	"""Per-connection encoder state: sent history and last acked snapshot"""
+
+	def __init__(self):
+		self.sent = {}			# seq -> snapshot, last HISTORY_SIZE frames
+		self.acked_seq = None
+		self.acked_snapshot = None
+
+	def encode(self, seq, snapshot, keyframe=None, cache_key=None):
+		"""
+		Frame for this connection. `keyframe` is the match's pre-encoded
+		keyframe; with a `cache_key` (the match id) deltas are shared too.
+		"""
+		self.sent[seq] = snapshot
+		if len(self.sent) > HISTORY_SIZE:
+			del self.sent[next(iter(self.sent))]
+
+		if self.acked_snapshot is None or seq_distance(seq, self.acked_seq) >= HISTORY_SIZE:
+			return keyframe if keyframe is not None else encode(seq, snapshot)
+		if cache_key is None:
+			return encode(seq, snapshot, self.acked_seq, self.acked_snapshot)
+		return delta_frames.get(cache_key, seq, snapshot, self.acked_seq, self.acked_snapshot)
+
+	def ack(self, seq):
+		"""Client confirmed it holds snapshot `seq`; ignores stale or unknown acks"""
+		snapshot = self.sent.get(seq)
+		if snapshot is None:
+			return False
+		if self.acked_seq is not None and seq_distance(seq, self.acked_seq) >= SEQ_MODULO // 2:
+			return False
+		self.acked_seq = seq
+		self.acked_snapshot = snapshot
+		return True
@@ -341,7 +341,8 @@ function renderChatItem(chat) {
 				if (response.ok) {
 					const data = await response.json();
 					const chatContent = chatItem.querySelector(".scrollable-content");
-					data.forEach((msg) => {
+					// Latest page of the history, oldest message first
+					data.results.forEach((msg) => {
 						// Filtra i messaggi degli utenti bloccati anche dai messaggi storici
 						if (isUserBlocked(msg.sender)) {
 							console.log(
@@ -27,14 +27,15 @@ export function renderMatchHistory() {
 		matchHistory();
 }
 
-async function matchHistory(page = 1) {
+async function matchHistory(cursor = null) {
 	let matchHistory = [];
 	const { token, url_api, userId } = getVariables();
 	const pageSize = 5;
 	try {
-		console.log("[PongHistory] Fetching game history for user_id:", userId, "page:", page);
+		console.log("[PongHistory] Fetching game history for user_id:", userId, "cursor:", cursor);
+		const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : "";
 		const response = await fetch(
-			`${url_api}/pong/games/history?user_id=${userId}&page_size=${pageSize}&page=${page}`,
+			`${url_api}/pong/games/history?user_id=${userId}&page_size=${pageSize}${cursorParam}`,
 			{
 				method: "GET",
 				headers: {
@@ -107,16 +108,12 @@ async function matchHistory(page = 1) {
 			// Event listeners
 			document.getElementById("prevPageBtn").onclick = () => {
 				if (data.previous) {
-					let prevPage = new URL(data.previous).searchParams.get("page");
-					prevPage = prevPage ? Number(prevPage) : 1;
-					if (prevPage < 1) prevPage = 1;
-					window.matchHistory(prevPage);
+					window.matchHistory(new URL(data.previous).searchParams.get("cursor"));
 				}
 			};
 			document.getElementById("nextPageBtn").onclick = () => {
 				if (data.next) {
-					const nextPage = new URL(data.next).searchParams.get("page");
-					window.matchHistory(Number(nextPage));
+					window.matchHistory(new URL(data.next).searchParams.get("cursor"));
 				}
 			};
 		}